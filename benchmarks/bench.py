@@ -0,0 +1,440 @@
+"""
+Micro-benchmarks for the engine's hot paths.
+
+    python benchmarks/bench.py                       # run everything
+    python benchmarks/bench.py -k billing            # only cases whose name contains "billing"
+    python benchmarks/bench.py --save benchmarks/baseline.json  # store a baseline
+    python benchmarks/bench.py --compare benchmarks/baseline.json [--threshold 0.2]
+
+Each case reports ops/sec (best of several timed rounds) and, from tracemalloc around a
+single call, the memory blocks the call leaves allocated when it returns (the result and
+anything it keeps) and the peak bytes during the call. Cold import time and RSS growth of
+the public modules are measured in fresh interpreters (median of --import-runs). --compare
+exits non-zero when a case is slower than the baseline, or an import slower or larger, by
+more than --threshold, or retains more blocks per call.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from spendguard_engine.billing import compute_cost_breakdown, compute_cost_totals
+from spendguard_engine.pricing import RateCard, copy_rates, estimate_tokens_text, merge_rates
+from spendguard_engine.providers.anthropic_provider import extract_anthropic_completion, extract_anthropic_usage
+from spendguard_engine.providers.gemini_provider import extract_gemini_completion, extract_gemini_usage
+from spendguard_engine.providers.openai_provider import extract_openai_usage, normalize_openai_usage
+
+
+@dataclass(frozen=True)
+class Case:
+    name: str
+    fn: Callable[[], Any]
+
+
+@dataclass(frozen=True)
+class Result:
+    name: str
+    ops_per_sec: float
+    retained_blocks_per_call: int
+    peak_bytes_per_call: int
+
+
+@dataclass(frozen=True)
+class ImportResult:
+    module: str
+    seconds: float
+    rss_bytes: int | None
+
+
+IMPORT_TARGETS = (
+    "spendguard_engine",
+    "spendguard_engine.providers",
+    "spendguard_engine.schemas",
+    "spendguard_engine.providers.anthropic_provider",
+    "spendguard_engine.providers.gemini_provider",
+    "spendguard_engine.providers.openai_provider",
+)
+
+# Runs in a fresh interpreter. Resident size comes from /proc where available, else the
+# ru_maxrss high-water mark (KiB on Linux, bytes on macOS).
+_IMPORT_PROBE = """
+import importlib, json, os, sys, time
+def rss():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+before = rss()
+start = time.perf_counter()
+importlib.import_module(sys.argv[1])
+elapsed = time.perf_counter() - start
+after = rss()
+print(json.dumps({"seconds": elapsed, "rss_bytes": None if before is None else after - before}))
+"""
+
+
+PLAIN = RateCard(input_cents_per_1m=30, output_cents_per_1m=120)
+CACHED = RateCard(input_cents_per_1m=175, output_cents_per_1m=1400, cached_input_cents_per_1m=18)
+CACHE_WRITE_READ = RateCard(
+    input_cents_per_1m=300,
+    output_cents_per_1m=1500,
+    cache_write_input_cents_per_1m=375,
+    cache_read_input_cents_per_1m=30,
+)
+REASONING = RateCard(input_cents_per_1m=200, output_cents_per_1m=800, reasoning_output_cents_per_1m=800)
+CLIFF = RateCard(
+    input_cents_per_1m=300,
+    output_cents_per_1m=1500,
+    context_cliff_threshold_tokens=200_000,
+    context_cliff_input_multiplier=2.0,
+    context_cliff_output_multiplier=1.5,
+)
+GROUNDING = RateCard(input_cents_per_1m=50, output_cents_per_1m=200, grounding_cents_per_1k_queries=1400)
+TOOLS = RateCard(
+    input_cents_per_1m=30, output_cents_per_1m=120, web_search_cents_per_call=2, file_search_cents_per_call=7
+)
+
+CHARGE_SHAPES: dict[str, dict[str, Any]] = {
+    "plain": {"rate_card": PLAIN, "input_tokens": 1200, "output_tokens": 300},
+    "cached_split": {"rate_card": CACHED, "input_tokens": 12_000, "output_tokens": 300, "cached_input_tokens": 8_000},
+    "cache_write_read": {
+        "rate_card": CACHE_WRITE_READ,
+        "input_tokens": 12_000,
+        "output_tokens": 300,
+        "cache_write_input_tokens": 2_000,
+        "cache_read_input_tokens": 8_000,
+    },
+    "reasoning": {"rate_card": REASONING, "input_tokens": 1200, "output_tokens": 4000, "reasoning_tokens": 3000},
+    "cliff": {"rate_card": CLIFF, "input_tokens": 250_000, "output_tokens": 300},
+    "grounding": {"rate_card": GROUNDING, "input_tokens": 1200, "output_tokens": 300, "grounding_queries": 3},
+    "tools": {
+        "rate_card": TOOLS,
+        "input_tokens": 1200,
+        "output_tokens": 300,
+        "tool_calls": {"web_search_call": 2, "file_search_call": 1},
+    },
+}
+
+
+def _large_rates(providers: int, models: int) -> dict[str, dict[str, RateCard]]:
+    return {
+        f"provider-{p}": {
+            f"model-{m}": RateCard(input_cents_per_1m=m, output_cents_per_1m=4 * m) for m in range(models)
+        }
+        for p in range(providers)
+    }
+
+
+class _Usage:
+    def __init__(self, prompt_tokens: int, completion_tokens: int) -> None:
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+
+
+class _Response:
+    def __init__(self, usage: Any, choices: list[Any] | None = None) -> None:
+        self.usage = usage
+        self.choices = choices or []
+
+
+def _openai_chat_payload(choices: int) -> _Response:
+    message = {"role": "assistant", "content": "lorem ipsum dolor sit amet " * 20}
+    return _Response(
+        _Usage(1200, 300 * choices),
+        [{"index": i, "message": dict(message), "finish_reason": "stop"} for i in range(choices)],
+    )
+
+
+def _openai_responses_payload(items: int) -> dict[str, Any]:
+    text = {"type": "output_text", "text": "lorem ipsum dolor sit amet " * 20}
+    output: list[dict[str, Any]] = [{"type": "web_search_call", "status": "completed"}]
+    output += [{"type": "message", "role": "assistant", "content": [dict(text)]} for _ in range(items)]
+    return {
+        "output": output,
+        "usage": {
+            "input_tokens": 1200,
+            "output_tokens": 300 * items,
+            "input_tokens_details": {"cached_tokens": 800},
+            "output_tokens_details": {"reasoning_tokens": 100},
+        },
+    }
+
+
+def _anthropic_payload(blocks: int) -> dict[str, Any]:
+    return {
+        "content": [{"type": "text", "text": "lorem ipsum dolor sit amet " * 20} for _ in range(blocks)],
+        "usage": {"input_tokens": 1200, "output_tokens": 300 * blocks},
+    }
+
+
+def _gemini_payload(parts: int) -> dict[str, Any]:
+    return {
+        "candidates": [{"content": {"parts": [{"text": "lorem ipsum dolor sit amet " * 20} for _ in range(parts)]}}],
+        "usageMetadata": {"promptTokenCount": 1200, "candidatesTokenCount": 300 * parts},
+    }
+
+
+def build_cases() -> list[Case]:
+    cases: list[Case] = []
+    for shape, kwargs in CHARGE_SHAPES.items():
+        cases.append(
+            Case(
+                f"billing.compute_cost_breakdown[{shape}]",
+                lambda kw=kwargs: compute_cost_breakdown(provider="p", model="m", **kw),
+            )
+        )
+        cases.append(Case(f"billing.compute_cost_totals[{shape}]", lambda kw=kwargs: compute_cost_totals(**kw)))
+
+    small_text = "Summarize the attached ticket."
+    large_text = "The quick brown fox jumps over the lazy dog. " * 20_000
+    cases.append(Case("pricing.estimate_tokens_text[small]", lambda: estimate_tokens_text(small_text)))
+    cases.append(Case("pricing.estimate_tokens_text[large]", lambda: estimate_tokens_text(large_text)))
+
+    table = _large_rates(20, 2_000)
+    overlay = _large_rates(5, 500)
+    cases.append(Case("pricing.copy_rates[20x2000]", lambda: copy_rates(table)))
+
+    def merge() -> None:
+        merge_rates(copy_rates(table), overlay)
+
+    cases.append(Case("pricing.merge_rates[20x2000+5x500]", merge))
+
+    obj_response = _Response(_Usage(1200, 300))
+    dict_response = _Response({"prompt_tokens": 1200, "completion_tokens": 300})
+    cases.append(Case("providers.extract_openai_usage[object]", lambda: extract_openai_usage(obj_response)))
+    cases.append(Case("providers.extract_openai_usage[dict]", lambda: extract_openai_usage(dict_response)))
+    for size in (1, 100):
+        chat = _openai_chat_payload(size)
+        responses = _openai_responses_payload(size)
+        anthropic = _anthropic_payload(size)
+        gemini = _gemini_payload(size)
+        cases.append(Case(f"providers.extract_openai_usage[chat-{size}]", lambda p=chat: extract_openai_usage(p)))
+        cases.append(Case(f"providers.normalize_openai_usage[chat-{size}]", lambda p=chat: normalize_openai_usage(p)))
+        cases.append(
+            Case(
+                f"providers.normalize_openai_usage[responses-{size}]",
+                lambda p=responses: normalize_openai_usage(p),
+            )
+        )
+        cases.append(Case(f"providers.extract_anthropic_usage[{size}]", lambda p=anthropic: extract_anthropic_usage(p)))
+        cases.append(
+            Case(f"providers.extract_anthropic_completion[{size}]", lambda p=anthropic: extract_anthropic_completion(p))
+        )
+        cases.append(Case(f"providers.extract_gemini_usage[{size}]", lambda p=gemini: extract_gemini_usage(p)))
+        cases.append(
+            Case(f"providers.extract_gemini_completion[{size}]", lambda p=gemini: extract_gemini_completion(p))
+        )
+    return cases
+
+
+def _ops_per_sec(fn: Callable[[], Any], min_time: float, rounds: int) -> float:
+    # Calibrate the loop count so one round takes roughly min_time.
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time / 10 or loops >= 1 << 24:
+            break
+        loops *= 4
+    loops = max(1, int(loops * (min_time / max(elapsed, 1e-9))))
+
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        best = min(best, (time.perf_counter() - start) / loops)
+    return 1.0 / best if best > 0 else float("inf")
+
+
+# Ignore the snapshots' own bookkeeping.
+_SNAPSHOT_FILTERS = [tracemalloc.Filter(False, tracemalloc.__file__)]
+
+
+def _retained_blocks(fn: Callable[[], Any]) -> tuple[int, int]:
+    """(blocks allocated by one call and still alive when it returns, peak bytes during the call)."""
+    fn()  # warm caches so only steady-state allocations are measured
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        result = fn()
+        _, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+    finally:
+        tracemalloc.stop()
+    del result
+    blocks = sum(max(0, stat.count_diff) for stat in after.compare_to(before, "traceback"))
+    return blocks, max(0, peak - base)
+
+
+def run(cases: list[Case], *, min_time: float, rounds: int) -> list[Result]:
+    results = []
+    for case in cases:
+        blocks, peak = _retained_blocks(case.fn)
+        results.append(
+            Result(
+                name=case.name,
+                ops_per_sec=_ops_per_sec(case.fn, min_time, rounds),
+                retained_blocks_per_call=blocks,
+                peak_bytes_per_call=peak,
+            )
+        )
+    return results
+
+
+def measure_import(module: str, runs: int) -> ImportResult:
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", _IMPORT_PROBE, module], check=True, capture_output=True, text=True
+        ).stdout
+        samples.append(json.loads(out))
+    rss = [s["rss_bytes"] for s in samples if s["rss_bytes"] is not None]
+    return ImportResult(
+        module=module,
+        seconds=statistics.median(s["seconds"] for s in samples),
+        rss_bytes=int(statistics.median(rss)) if rss else None,
+    )
+
+
+def _format_imports(results: list[ImportResult], baseline: dict[str, Any] | None) -> str:
+    width = max((len(r.module) for r in results), default=10)
+    header = f"{'import':<{width}}  {'ms':>10}  {'RSS KiB':>10}"
+    if baseline is not None:
+        header += f"  {'vs baseline':>12}"
+    lines = [header, "-" * len(header)]
+    for r in results:
+        rss = "n/a" if r.rss_bytes is None else f"{r.rss_bytes // 1024:,}"
+        line = f"{r.module:<{width}}  {r.seconds * 1000:>10.1f}  {rss:>10}"
+        if baseline is not None:
+            prev = (baseline.get("imports") or {}).get(r.module)
+            if prev:
+                line += f"  {(r.seconds / prev['seconds'] - 1) * 100:>+11.1f}%"
+            else:
+                line += f"  {'new':>12}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def _format_table(results: list[Result], baseline: dict[str, Any] | None) -> str:
+    width = max((len(r.name) for r in results), default=10)
+    header = f"{'case':<{width}}  {'ops/sec':>14}  {'retained blocks':>15}  {'peak B/call':>12}"
+    if baseline is not None:
+        header += f"  {'vs baseline':>12}"
+    lines = [header, "-" * len(header)]
+    for r in results:
+        line = f"{r.name:<{width}}  {r.ops_per_sec:>14,.0f}  {r.retained_blocks_per_call:>15,}"
+        line += f"  {r.peak_bytes_per_call:>12,}"
+        if baseline is not None:
+            prev = (baseline.get("results") or {}).get(r.name)
+            if prev:
+                line += f"  {(r.ops_per_sec / prev['ops_per_sec'] - 1) * 100:>+11.1f}%"
+            else:
+                line += f"  {'new':>12}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def _regressions(results: list[Result], baseline: dict[str, Any], threshold: float) -> list[str]:
+    out = []
+    for r in results:
+        prev = (baseline.get("results") or {}).get(r.name)
+        if not prev:
+            continue
+        if r.ops_per_sec < prev["ops_per_sec"] * (1 - threshold):
+            out.append(r.name)
+        blocks = prev.get("retained_blocks_per_call")
+        if blocks is not None and r.retained_blocks_per_call > max(blocks * (1 + threshold), blocks + 1):
+            out.append(f"{r.name} (retained blocks)")
+    return out
+
+
+def _import_regressions(results: list[ImportResult], baseline: dict[str, Any], threshold: float) -> list[str]:
+    out = []
+    for r in results:
+        prev = (baseline.get("imports") or {}).get(r.module)
+        if not prev:
+            continue
+        if r.seconds > prev["seconds"] * (1 + threshold):
+            out.append(f"import {r.module} (time)")
+        if r.rss_bytes is not None and prev.get("rss_bytes") and r.rss_bytes > prev["rss_bytes"] * (1 + threshold):
+            out.append(f"import {r.module} (RSS)")
+    return out
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-k", "--filter", default="", help="only run cases whose name contains this substring")
+    parser.add_argument("--min-time", type=float, default=0.2, help="target seconds per timed round")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--save", metavar="PATH", help="write results as a baseline JSON file")
+    parser.add_argument("--compare", metavar="PATH", help="compare against a baseline JSON file")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed ops/sec drop before failing --compare")
+    parser.add_argument("--import-runs", type=int, default=5, help="fresh interpreters per import measurement")
+    args = parser.parse_args(argv)
+
+    cases = [c for c in build_cases() if args.filter in c.name]
+    results = run(cases, min_time=args.min_time, rounds=args.rounds)
+    imports = [measure_import(m, max(1, args.import_runs)) for m in IMPORT_TARGETS if args.filter in f"import {m}"]
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print(_format_table(results, baseline))
+    if imports:
+        print()
+        print(_format_imports(imports, baseline))
+
+    if args.save:
+        doc = {
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "results": {
+                r.name: {
+                    "ops_per_sec": r.ops_per_sec,
+                    "retained_blocks_per_call": r.retained_blocks_per_call,
+                    "peak_bytes_per_call": r.peak_bytes_per_call,
+                }
+                for r in results
+            },
+            "imports": {r.module: {"seconds": r.seconds, "rss_bytes": r.rss_bytes} for r in imports},
+        }
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(doc, f, indent=2, sort_keys=True)
+            f.write("\n")
+
+    if baseline is not None:
+        regressed = _regressions(results, baseline, args.threshold) + _import_regressions(
+            imports, baseline, args.threshold
+        )
+        if regressed:
+            print(f"\n{len(regressed)} case(s) regressed by more than {args.threshold:.0%}:", file=sys.stderr)
+            for name in regressed:
+                print(f"  {name}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
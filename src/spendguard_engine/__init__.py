@@ -1,11 +1,55 @@
+from __future__ import annotations
+
+import importlib
+from typing import TYPE_CHECKING, Any
+
 from spendguard_engine.billing import (
     MICROCENTS_PER_CENT,
+    BatchTotals,
+    CostTotals,
+    LazyCostBreakdown,
+    PricingPlan,
     apply_context_cliff_to_rates,
     cents_ceiled_from_microcents,
+    compile_rate_card,
     compute_cost_breakdown,
+    compute_cost_totals,
+    compute_cost_totals_batch,
 )
 from spendguard_engine.pricing import DEFAULT_RATES, RateCard, copy_rates, cost_cents, estimate_tokens_text, merge_rates
 
+if TYPE_CHECKING:
+    from spendguard_engine.aggregation import SpendAggregator
+    from spendguard_engine.compact_rates import CompactRateTable, RateRow
+    from spendguard_engine.ledger import BudgetLedger, BudgetSnapshot, Reservation
+    from spendguard_engine.metering import StreamingCostMeter
+    from spendguard_engine.preflight import OutputAllowance, max_affordable_output_tokens
+    from spendguard_engine.prompt_cache import (
+        CACHE_PROFILES,
+        CacheProfile,
+        PrefixEstimate,
+        PromptBlock,
+        PromptPrefixIndex,
+        prompt_blocks,
+    )
+    from spendguard_engine.rate_file import MappedRateTable, encode_rate_table, load_rate_file, write_rate_file
+    from spendguard_engine.rate_index import RateIndex, ResolvedRate, normalize_model_name
+    from spendguard_engine.rate_table import RateTable, RateTableRef
+    from spendguard_engine.tokenizers import (
+        BPETokenizer,
+        HeuristicTokenizer,
+        Tokenizer,
+        get_default_tokenizer,
+        set_default_tokenizer,
+    )
+    from spendguard_engine.token_estimation import (
+        TokenEstimator,
+        estimate_tokens_anthropic,
+        estimate_tokens_messages,
+        estimate_tokens_responses,
+    )
+    from spendguard_engine.usage import NormalizedUsage
+
 __version__ = "0.1.0"
 
 __all__ = [
@@ -20,4 +64,97 @@ __all__ = [
     "cents_ceiled_from_microcents",
     "apply_context_cliff_to_rates",
     "compute_cost_breakdown",
+    "BatchTotals",
+    "compute_cost_totals_batch",
+    "PricingPlan",
+    "compile_rate_card",
+    "CostTotals",
+    "compute_cost_totals",
+    "LazyCostBreakdown",
+    "StreamingCostMeter",
+    "OutputAllowance",
+    "max_affordable_output_tokens",
+    "BudgetLedger",
+    "BudgetSnapshot",
+    "Reservation",
+    "SpendAggregator",
+    "RateIndex",
+    "ResolvedRate",
+    "normalize_model_name",
+    "RateTable",
+    "RateTableRef",
+    "TokenEstimator",
+    "estimate_tokens_messages",
+    "estimate_tokens_responses",
+    "estimate_tokens_anthropic",
+    "Tokenizer",
+    "BPETokenizer",
+    "HeuristicTokenizer",
+    "get_default_tokenizer",
+    "set_default_tokenizer",
+    "CompactRateTable",
+    "RateRow",
+    "MappedRateTable",
+    "encode_rate_table",
+    "write_rate_file",
+    "load_rate_file",
+    "NormalizedUsage",
+    "CACHE_PROFILES",
+    "CacheProfile",
+    "PrefixEstimate",
+    "PromptBlock",
+    "PromptPrefixIndex",
+    "prompt_blocks",
 ]
+
+# Subsystems beyond pricing/billing are imported on first attribute access, so importing
+# the package does not load the ledger, rate files, tokenizers, etc. until they are used.
+_LAZY = {
+    "StreamingCostMeter": "metering",
+    "OutputAllowance": "preflight",
+    "max_affordable_output_tokens": "preflight",
+    "BudgetLedger": "ledger",
+    "BudgetSnapshot": "ledger",
+    "Reservation": "ledger",
+    "SpendAggregator": "aggregation",
+    "RateIndex": "rate_index",
+    "ResolvedRate": "rate_index",
+    "normalize_model_name": "rate_index",
+    "RateTable": "rate_table",
+    "RateTableRef": "rate_table",
+    "TokenEstimator": "token_estimation",
+    "estimate_tokens_messages": "token_estimation",
+    "estimate_tokens_responses": "token_estimation",
+    "estimate_tokens_anthropic": "token_estimation",
+    "Tokenizer": "tokenizers",
+    "BPETokenizer": "tokenizers",
+    "HeuristicTokenizer": "tokenizers",
+    "get_default_tokenizer": "tokenizers",
+    "set_default_tokenizer": "tokenizers",
+    "CompactRateTable": "compact_rates",
+    "RateRow": "compact_rates",
+    "MappedRateTable": "rate_file",
+    "encode_rate_table": "rate_file",
+    "write_rate_file": "rate_file",
+    "load_rate_file": "rate_file",
+    "NormalizedUsage": "usage",
+    "CACHE_PROFILES": "prompt_cache",
+    "CacheProfile": "prompt_cache",
+    "PrefixEstimate": "prompt_cache",
+    "PromptBlock": "prompt_cache",
+    "PromptPrefixIndex": "prompt_cache",
+    "prompt_blocks": "prompt_cache",
+}
+
+
+def __getattr__(name: str) -> Any:
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f"{__name__}.{module}"), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
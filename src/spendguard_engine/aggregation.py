@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import sys
+import time
+from typing import Any, Callable, Iterator
+
+from spendguard_engine.billing import compute_cost_breakdown
+from spendguard_engine.pricing import RateCard
+
+
+STATE_VERSION = 1
+
+# (agent_id, provider, model, charge name)
+SpendKey = tuple[str, str, str, str]
+
+
+class SpendAggregator:
+    """
+    Streaming roll-up of realized microcents per (agent, provider, model, charge, window).
+
+    Counters are plain ints grouped by window bucket, so expiring old windows drops whole
+    buckets and memory stays bounded by retention_windows. Partial states from different
+    worker processes can be serialized with state() and combined with merge().
+    """
+
+    def __init__(
+        self,
+        *,
+        window_seconds: int = 60,
+        retention_windows: int = 60,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        if window_seconds <= 0:
+            raise ValueError("window_seconds must be > 0")
+        if retention_windows <= 0:
+            raise ValueError("retention_windows must be > 0")
+        self.window_seconds = int(window_seconds)
+        self.retention_windows = int(retention_windows)
+        self._clock = clock
+        # bucket -> key -> [microcents, quantity]
+        self._buckets: dict[int, dict[SpendKey, list[int]]] = {}
+        self._newest: int | None = None
+        # Charge rows that arrived for windows already out of retention.
+        self.dropped_late = 0
+
+    def _bucket(self, timestamp: float | None) -> int:
+        return int((self._clock() if timestamp is None else timestamp) // self.window_seconds)
+
+    def _add(self, bucket: int, key: SpendKey, microcents: int, quantity: int) -> None:
+        if self._newest is None or bucket > self._newest:
+            self._newest = bucket
+            self._expire_before(bucket - self.retention_windows + 1)
+        elif bucket <= self._newest - self.retention_windows:
+            self.dropped_late += 1
+            return
+        counters = self._buckets.get(bucket)
+        if counters is None:
+            counters = self._buckets[bucket] = {}
+        slot = counters.get(key)
+        if slot is None:
+            agent_id, provider, model, charge = key
+            key = (sys.intern(agent_id), sys.intern(provider), sys.intern(model), sys.intern(charge))
+            counters[key] = [microcents, quantity]
+        else:
+            slot[0] += microcents
+            slot[1] += quantity
+
+    def _expire_before(self, oldest: int) -> None:
+        for bucket in [b for b in self._buckets if b < oldest]:
+            del self._buckets[bucket]
+
+    def expire(self, now: float | None = None) -> None:
+        """Drop windows that fell out of retention relative to now (defaults to the clock)."""
+        bucket = self._bucket(now)
+        if self._newest is None or bucket > self._newest:
+            self._newest = bucket
+        self._expire_before(self._newest - self.retention_windows + 1)
+
+    def add_breakdown(self, breakdown: dict[str, Any], *, agent_id: str, timestamp: float | None = None) -> None:
+        bucket = self._bucket(timestamp)
+        provider = str(breakdown.get("provider") or "")
+        model = str(breakdown.get("model") or "")
+        for charge in breakdown.get("charges") or ():
+            self._add(
+                bucket,
+                (agent_id, provider, model, str(charge["name"])),
+                int(charge.get("cost_microcents") or 0),
+                int(charge.get("quantity") or 0),
+            )
+
+    def add_usage(
+        self,
+        *,
+        agent_id: str,
+        provider: str,
+        model: str,
+        rate_card: RateCard,
+        timestamp: float | None = None,
+        **usage: Any,
+    ) -> None:
+        breakdown = compute_cost_breakdown(provider=provider, model=model, rate_card=rate_card, **usage)
+        self.add_breakdown(breakdown, agent_id=agent_id, timestamp=timestamp)
+
+    def items(self) -> Iterator[tuple[SpendKey, int, int, int]]:
+        """Yield (key, window_start_epoch_seconds, microcents, quantity)."""
+        for bucket in sorted(self._buckets):
+            for key, (microcents, quantity) in self._buckets[bucket].items():
+                yield key, bucket * self.window_seconds, microcents, quantity
+
+    def total_microcents(
+        self,
+        *,
+        agent_id: str | None = None,
+        provider: str | None = None,
+        model: str | None = None,
+        charge: str | None = None,
+        since: float | None = None,
+    ) -> int:
+        since_bucket = None if since is None else int(since // self.window_seconds)
+        total = 0
+        for bucket, counters in self._buckets.items():
+            if since_bucket is not None and bucket < since_bucket:
+                continue
+            for (a, p, m, c), (microcents, _) in counters.items():
+                if agent_id is not None and a != agent_id:
+                    continue
+                if provider is not None and p != provider:
+                    continue
+                if model is not None and m != model:
+                    continue
+                if charge is not None and c != charge:
+                    continue
+                total += microcents
+        return total
+
+    def state(self) -> dict[str, Any]:
+        """JSON-serializable partial state; combine states with merge()."""
+        return {
+            "version": STATE_VERSION,
+            "window_seconds": self.window_seconds,
+            "rows": [
+                [*key, bucket, microcents, quantity]
+                for bucket, counters in sorted(self._buckets.items())
+                for key, (microcents, quantity) in counters.items()
+            ],
+        }
+
+    def merge(self, other: SpendAggregator | dict[str, Any]) -> None:
+        state = other.state() if isinstance(other, SpendAggregator) else other
+        if state.get("version") != STATE_VERSION:
+            raise ValueError(f"unsupported aggregator state version: {state.get('version')}")
+        if int(state.get("window_seconds") or 0) != self.window_seconds:
+            raise ValueError("cannot merge aggregators with different window_seconds")
+        rows = sorted(state.get("rows") or (), key=lambda row: row[4])
+        for agent_id, provider, model, charge, bucket, microcents, quantity in rows:
+            self._add(int(bucket), (agent_id, provider, model, charge), int(microcents), int(quantity))
+
+    @classmethod
+    def from_state(cls, state: dict[str, Any], *, retention_windows: int = 60) -> SpendAggregator:
+        agg = cls(window_seconds=int(state["window_seconds"]), retention_windows=retention_windows)
+        agg.merge(state)
+        return agg
+
+    def __len__(self) -> int:
+        return sum(len(counters) for counters in self._buckets.values())
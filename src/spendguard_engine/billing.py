@@ -1,11 +1,11 @@
 from __future__ import annotations
 
+import functools
 from dataclasses import dataclass
-from typing import Any
+from typing import Any, NamedTuple, Sequence
 
 from spendguard_engine.pricing import RateCard
 
-
 MICROCENTS_PER_CENT = 1_000_000
 
 
@@ -35,6 +35,13 @@ def _per_call_cost_microcents(calls: int, cents_per_call: int) -> int:
     return int(calls) * int(cents_per_call) * MICROCENTS_PER_CENT
 
 
+def _batch_discounted_microcents(microcents: int, discount_percent: int | None) -> int:
+    # Round the discounted total up so a batch record never settles below the discounted price.
+    if not discount_percent:
+        return microcents
+    return _ceil_div(microcents * (100 - discount_percent), 100)
+
+
 def _per_1k_cost_microcents(count: int, cents_per_1k: int) -> int:
     if count <= 0 or cents_per_1k <= 0:
         return 0
@@ -51,6 +58,14 @@ class LineItem:
     cost_microcents: int
 
 
+def _cliff_configured(rate_card: RateCard) -> dict[str, Any]:
+    return {
+        "threshold_tokens": rate_card.context_cliff_threshold_tokens,
+        "input_multiplier": rate_card.context_cliff_input_multiplier,
+        "output_multiplier": rate_card.context_cliff_output_multiplier,
+    }
+
+
 def apply_context_cliff_to_rates(rate_card: RateCard, input_tokens: int) -> tuple[int, int, bool, dict[str, Any]]:
     """
     Return (input_rate_cents_per_1m, output_rate_cents_per_1m, applied, configured_dict).
@@ -61,14 +76,9 @@ def apply_context_cliff_to_rates(rate_card: RateCard, input_tokens: int) -> tupl
     inp_rate = int(rate_card.input_cents_per_1m)
     out_rate = int(rate_card.output_cents_per_1m)
     cliff_applied = False
-    cliff = {
-        "threshold_tokens": rate_card.context_cliff_threshold_tokens,
-        "input_multiplier": rate_card.context_cliff_input_multiplier,
-        "output_multiplier": rate_card.context_cliff_output_multiplier,
-    }
-    if (
-        rate_card.context_cliff_threshold_tokens is not None
-        and input_tokens > int(rate_card.context_cliff_threshold_tokens)
+    cliff = _cliff_configured(rate_card)
+    if rate_card.context_cliff_threshold_tokens is not None and input_tokens > int(
+        rate_card.context_cliff_threshold_tokens
     ):
         if rate_card.context_cliff_input_multiplier is not None:
             inp_rate = int((inp_rate * float(rate_card.context_cliff_input_multiplier) + 0.9999999))
@@ -79,6 +89,212 @@ def apply_context_cliff_to_rates(rate_card: RateCard, input_tokens: int) -> tupl
     return inp_rate, out_rate, cliff_applied, cliff
 
 
+class PlanRates(NamedTuple):
+    input: int
+    output: int
+    cached_input: int
+    uncached_input: int
+    cache_write_input: int
+    cache_read_input: int
+
+
+def _plan_rates(rate_card: RateCard, input_tokens: int) -> PlanRates:
+    inp_rate, out_rate, _, _ = apply_context_cliff_to_rates(rate_card, input_tokens)
+    cached_rate = rate_card.cached_input_cents_per_1m
+    uncached_rate = rate_card.uncached_input_cents_per_1m
+    if cached_rate is None:
+        cached_rate = inp_rate
+    if uncached_rate is None:
+        uncached_rate = inp_rate
+    write_rate = rate_card.cache_write_input_cents_per_1m or inp_rate
+    read_rate = rate_card.cache_read_input_cents_per_1m or inp_rate
+    return PlanRates(
+        input=int(inp_rate),
+        output=int(out_rate),
+        cached_input=int(cached_rate),
+        uncached_input=int(uncached_rate),
+        cache_write_input=int(write_rate),
+        cache_read_input=int(read_rate),
+    )
+
+
+def _optional_int(value: int | None) -> int | None:
+    return None if value is None else int(value)
+
+
+def _clamp_usage(
+    input_tokens: int,
+    output_tokens: int,
+    cached_input_tokens: int | None,
+    reasoning_tokens: int | None,
+    cache_write_input_tokens: int | None,
+    cache_read_input_tokens: int | None,
+    grounding_queries: int | None,
+) -> tuple[int, int, int, int, int, int, int]:
+    # Clamp provider category counts so odd payloads can't overcharge.
+    input_tokens = max(0, int(input_tokens))
+    output_tokens = max(0, int(output_tokens))
+    cached_input_tokens = max(0, min(int(cached_input_tokens or 0), input_tokens))
+    cache_write_input_tokens = max(0, int(cache_write_input_tokens or 0))
+    cache_read_input_tokens = max(0, int(cache_read_input_tokens or 0))
+    if cache_write_input_tokens > input_tokens:
+        cache_write_input_tokens = input_tokens
+    if cache_read_input_tokens > (input_tokens - cache_write_input_tokens):
+        cache_read_input_tokens = max(0, input_tokens - cache_write_input_tokens)
+    reasoning_tokens = max(0, min(int(reasoning_tokens or 0), output_tokens))
+    grounding_queries = max(0, int(grounding_queries or 0))
+    return (
+        input_tokens,
+        output_tokens,
+        cached_input_tokens,
+        reasoning_tokens,
+        cache_write_input_tokens,
+        cache_read_input_tokens,
+        grounding_queries,
+    )
+
+
+@dataclass(frozen=True)
+class PricingPlan:
+    """
+    Precomputed pricing for one RateCard (see compile_rate_card).
+
+    Fallback rates are resolved and context-cliff rates pre-multiplied, so settling usage
+    against a plan is straight-line integer arithmetic.
+    """
+
+    rate_card: RateCard
+    base_rates: PlanRates
+    cliff_rates: PlanRates
+    # None when the card has no effective cliff (no threshold or no multipliers).
+    cliff_threshold_tokens: int | None
+    reasoning_output_cents_per_1m: int | None
+    grounding_cents_per_1k_queries: int | None
+    web_search_cents_per_call: int | None
+    file_search_cents_per_call: int | None
+    batch_discount_percent: int | None
+    # Optional charge components this card can produce beyond input/output tokens.
+    components: tuple[str, ...]
+
+    def rates_for(self, input_tokens: int) -> tuple[PlanRates, bool]:
+        threshold = self.cliff_threshold_tokens
+        if threshold is not None and input_tokens > threshold:
+            return self.cliff_rates, True
+        return self.base_rates, False
+
+    def realized_microcents(
+        self,
+        input_tokens: int,
+        output_tokens: int,
+        cached_input_tokens: int | None = None,
+        reasoning_tokens: int | None = None,
+        cache_write_input_tokens: int | None = None,
+        cache_read_input_tokens: int | None = None,
+        grounding_queries: int | None = None,
+        web_search_calls: int | None = None,
+        file_search_calls: int | None = None,
+        batch_api: bool = False,
+    ) -> int:
+        inp, out, cached, reasoning, cw, cr, gq = _clamp_usage(
+            input_tokens,
+            output_tokens,
+            cached_input_tokens,
+            reasoning_tokens,
+            cache_write_input_tokens,
+            cache_read_input_tokens,
+            grounding_queries,
+        )
+        threshold = self.cliff_threshold_tokens
+        rates = self.cliff_rates if threshold is not None and inp > threshold else self.base_rates
+
+        if cached > 0:
+            total = _token_cost_microcents(inp - cached, rates.uncached_input) + _token_cost_microcents(
+                cached, rates.cached_input
+            )
+        elif cw > 0 or cr > 0:
+            total = (
+                _token_cost_microcents(max(0, inp - cw - cr), rates.input)
+                + _token_cost_microcents(cw, rates.cache_write_input)
+                + _token_cost_microcents(cr, rates.cache_read_input)
+            )
+        else:
+            total = _token_cost_microcents(inp, rates.input)
+
+        reasoning_rate = self.reasoning_output_cents_per_1m
+        if reasoning > 0 and reasoning_rate is not None:
+            total += _token_cost_microcents(out - reasoning, rates.output)
+            total += _token_cost_microcents(reasoning, reasoning_rate)
+        else:
+            total += _token_cost_microcents(out, rates.output)
+
+        if gq > 0 and self.grounding_cents_per_1k_queries is not None:
+            total += _per_1k_cost_microcents(gq, self.grounding_cents_per_1k_queries)
+        ws = int(web_search_calls or 0)
+        if ws > 0 and self.web_search_cents_per_call is not None:
+            total += _per_call_cost_microcents(ws, self.web_search_cents_per_call)
+        fs = int(file_search_calls or 0)
+        if fs > 0 and self.file_search_cents_per_call is not None:
+            total += _per_call_cost_microcents(fs, self.file_search_cents_per_call)
+        if batch_api:
+            total = _batch_discounted_microcents(total, self.batch_discount_percent)
+        return total
+
+
+def compile_rate_card(rate_card: RateCard) -> PricingPlan:
+    """
+    Return the (cached) PricingPlan for rate_card.
+
+    Plans are keyed by the frozen RateCard value, so a pricing refresh that produces new
+    cards gets new plans without explicit invalidation. Row views (RateRow from a compact
+    table or mapped rate file) are materialized first: caching the view itself would pin
+    its backing buffer and alias a row that can later be overwritten.
+    """
+    if not isinstance(rate_card, RateCard):
+        rate_card = rate_card.to_rate_card()
+    return _compile_rate_card(rate_card)
+
+
+@functools.lru_cache(maxsize=4096)
+def _compile_rate_card(rate_card: RateCard) -> PricingPlan:
+    threshold = rate_card.context_cliff_threshold_tokens
+    has_cliff = threshold is not None and (
+        rate_card.context_cliff_input_multiplier is not None or rate_card.context_cliff_output_multiplier is not None
+    )
+    base_rates = _plan_rates(rate_card, 0)
+    cliff_rates = _plan_rates(rate_card, int(threshold) + 1) if has_cliff else base_rates
+
+    reasoning_rate = _optional_int(rate_card.reasoning_output_cents_per_1m)
+    grounding_rate = _optional_int(rate_card.grounding_cents_per_1k_queries)
+    web_rate = _optional_int(rate_card.web_search_cents_per_call)
+    file_rate = _optional_int(rate_card.file_search_cents_per_call)
+    batch_discount = _optional_int(rate_card.batch_discount_percent)
+    if batch_discount is not None and not 0 <= batch_discount <= 100:
+        raise ValueError(f"batch_discount_percent must be between 0 and 100, got {batch_discount}")
+    components = tuple(
+        name
+        for name, rate in (
+            ("output_tokens_reasoning", reasoning_rate),
+            ("grounding_queries", grounding_rate),
+            ("tool_web_search_call", web_rate),
+            ("tool_file_search_call", file_rate),
+            ("batch_discount", batch_discount),
+        )
+        if rate is not None
+    )
+    return PricingPlan(
+        rate_card=rate_card,
+        base_rates=base_rates,
+        cliff_rates=cliff_rates,
+        cliff_threshold_tokens=int(threshold) if has_cliff else None,
+        reasoning_output_cents_per_1m=reasoning_rate,
+        grounding_cents_per_1k_queries=grounding_rate,
+        web_search_cents_per_call=web_rate,
+        file_search_cents_per_call=file_rate,
+        batch_discount_percent=batch_discount,
+        components=components,
+    )
+
+
 def compute_cost_breakdown(
     *,
     provider: str,
@@ -92,50 +308,50 @@ def compute_cost_breakdown(
     cache_read_input_tokens: int | None = None,
     grounding_queries: int | None = None,
     tool_calls: dict[str, int] | None = None,
+    rate_version: str | None = None,
+    batch_api: bool = False,
+    response_cache_hit: bool = False,
 ) -> dict[str, Any]:
-    cached_input_tokens = int(cached_input_tokens or 0)
-    reasoning_tokens = int(reasoning_tokens or 0)
-    cache_write_input_tokens = int(cache_write_input_tokens or 0)
-    cache_read_input_tokens = int(cache_read_input_tokens or 0)
-    grounding_queries = int(grounding_queries or 0)
     tool_calls = tool_calls or {}
-
-    input_tokens = max(0, int(input_tokens))
-    output_tokens = max(0, int(output_tokens))
-
-    # Clamp provider category counts so odd payloads can't overcharge.
-    cached_input_tokens = max(0, min(int(cached_input_tokens), int(input_tokens)))
-    cache_write_input_tokens = max(0, int(cache_write_input_tokens))
-    cache_read_input_tokens = max(0, int(cache_read_input_tokens))
-    if cache_write_input_tokens > input_tokens:
-        cache_write_input_tokens = input_tokens
-    if cache_read_input_tokens > (input_tokens - cache_write_input_tokens):
-        cache_read_input_tokens = max(0, input_tokens - cache_write_input_tokens)
-    reasoning_tokens = max(0, min(int(reasoning_tokens), int(output_tokens)))
-    grounding_queries = max(0, int(grounding_queries))
+    (
+        input_tokens,
+        output_tokens,
+        cached_input_tokens,
+        reasoning_tokens,
+        cache_write_input_tokens,
+        cache_read_input_tokens,
+        grounding_queries,
+    ) = _clamp_usage(
+        input_tokens,
+        output_tokens,
+        cached_input_tokens,
+        reasoning_tokens,
+        cache_write_input_tokens,
+        cache_read_input_tokens,
+        grounding_queries,
+    )
 
     # Apply optional context cliff by adjusting rates (conservatively: round up to whole cents/1m).
-    inp_rate, out_rate, cliff_applied, cliff = apply_context_cliff_to_rates(rate_card, input_tokens)
+    plan = compile_rate_card(rate_card)
+    rates, cliff_applied = plan.rates_for(input_tokens)
+    inp_rate = rates.input
+    out_rate = rates.output
 
     items: list[LineItem] = []
 
     # Provider-agnostic default: price total input and output, then optionally refine.
     # Input refinements:
     if cached_input_tokens > 0:
-        cached_rate = rate_card.cached_input_cents_per_1m
-        uncached_rate = rate_card.uncached_input_cents_per_1m
-        if cached_rate is None:
-            cached_rate = inp_rate
-        if uncached_rate is None:
-            uncached_rate = inp_rate
+        cached_rate = rates.cached_input
+        uncached_rate = rates.uncached_input
         uncached_tokens = max(0, input_tokens - cached_input_tokens)
         items.append(
             LineItem(
                 name="input_tokens_uncached",
                 quantity=uncached_tokens,
                 unit="tokens",
-                rate={"cents_per_1m": int(uncached_rate)},
-                cost_microcents=_token_cost_microcents(uncached_tokens, int(uncached_rate)),
+                rate={"cents_per_1m": uncached_rate},
+                cost_microcents=_token_cost_microcents(uncached_tokens, uncached_rate),
             )
         )
         items.append(
@@ -143,21 +359,21 @@ def compute_cost_breakdown(
                 name="input_tokens_cached",
                 quantity=cached_input_tokens,
                 unit="tokens",
-                rate={"cents_per_1m": int(cached_rate)},
-                cost_microcents=_token_cost_microcents(cached_input_tokens, int(cached_rate)),
+                rate={"cents_per_1m": cached_rate},
+                cost_microcents=_token_cost_microcents(cached_input_tokens, cached_rate),
             )
         )
     elif cache_write_input_tokens > 0 or cache_read_input_tokens > 0:
-        write_rate = rate_card.cache_write_input_cents_per_1m or inp_rate
-        read_rate = rate_card.cache_read_input_cents_per_1m or inp_rate
+        write_rate = rates.cache_write_input
+        read_rate = rates.cache_read_input
         base_tokens = max(0, input_tokens - cache_write_input_tokens - cache_read_input_tokens)
         items.append(
             LineItem(
                 name="input_tokens_base",
                 quantity=base_tokens,
                 unit="tokens",
-                rate={"cents_per_1m": int(inp_rate)},
-                cost_microcents=_token_cost_microcents(base_tokens, int(inp_rate)),
+                rate={"cents_per_1m": inp_rate},
+                cost_microcents=_token_cost_microcents(base_tokens, inp_rate),
             )
         )
         items.append(
@@ -165,8 +381,8 @@ def compute_cost_breakdown(
                 name="input_tokens_cache_write",
                 quantity=cache_write_input_tokens,
                 unit="tokens",
-                rate={"cents_per_1m": int(write_rate)},
-                cost_microcents=_token_cost_microcents(cache_write_input_tokens, int(write_rate)),
+                rate={"cents_per_1m": write_rate},
+                cost_microcents=_token_cost_microcents(cache_write_input_tokens, write_rate),
             )
         )
         items.append(
@@ -174,8 +390,8 @@ def compute_cost_breakdown(
                 name="input_tokens_cache_read",
                 quantity=cache_read_input_tokens,
                 unit="tokens",
-                rate={"cents_per_1m": int(read_rate)},
-                cost_microcents=_token_cost_microcents(cache_read_input_tokens, int(read_rate)),
+                rate={"cents_per_1m": read_rate},
+                cost_microcents=_token_cost_microcents(cache_read_input_tokens, read_rate),
             )
         )
     else:
@@ -184,22 +400,22 @@ def compute_cost_breakdown(
                 name="input_tokens",
                 quantity=input_tokens,
                 unit="tokens",
-                rate={"cents_per_1m": int(inp_rate)},
-                cost_microcents=_token_cost_microcents(input_tokens, int(inp_rate)),
+                rate={"cents_per_1m": inp_rate},
+                cost_microcents=_token_cost_microcents(input_tokens, inp_rate),
             )
         )
 
     # Output refinements:
-    if reasoning_tokens > 0 and rate_card.reasoning_output_cents_per_1m is not None:
-        reasoning_rate = int(rate_card.reasoning_output_cents_per_1m)
+    if reasoning_tokens > 0 and plan.reasoning_output_cents_per_1m is not None:
+        reasoning_rate = plan.reasoning_output_cents_per_1m
         non_reasoning = max(0, output_tokens - reasoning_tokens)
         items.append(
             LineItem(
                 name="output_tokens_non_reasoning",
                 quantity=non_reasoning,
                 unit="tokens",
-                rate={"cents_per_1m": int(out_rate)},
-                cost_microcents=_token_cost_microcents(non_reasoning, int(out_rate)),
+                rate={"cents_per_1m": out_rate},
+                cost_microcents=_token_cost_microcents(non_reasoning, out_rate),
             )
         )
         items.append(
@@ -207,8 +423,8 @@ def compute_cost_breakdown(
                 name="output_tokens_reasoning",
                 quantity=reasoning_tokens,
                 unit="tokens",
-                rate={"cents_per_1m": int(reasoning_rate)},
-                cost_microcents=_token_cost_microcents(reasoning_tokens, int(reasoning_rate)),
+                rate={"cents_per_1m": reasoning_rate},
+                cost_microcents=_token_cost_microcents(reasoning_tokens, reasoning_rate),
             )
         )
     else:
@@ -217,50 +433,67 @@ def compute_cost_breakdown(
                 name="output_tokens",
                 quantity=output_tokens,
                 unit="tokens",
-                rate={"cents_per_1m": int(out_rate)},
-                cost_microcents=_token_cost_microcents(output_tokens, int(out_rate)),
+                rate={"cents_per_1m": out_rate},
+                cost_microcents=_token_cost_microcents(output_tokens, out_rate),
             )
         )
 
     # Grounding fees (Gemini-style).
-    if grounding_queries > 0 and rate_card.grounding_cents_per_1k_queries is not None:
+    if grounding_queries > 0 and plan.grounding_cents_per_1k_queries is not None:
         items.append(
             LineItem(
                 name="grounding_queries",
                 quantity=grounding_queries,
                 unit="queries",
-                rate={"cents_per_1k": int(rate_card.grounding_cents_per_1k_queries)},
-                cost_microcents=_per_1k_cost_microcents(grounding_queries, int(rate_card.grounding_cents_per_1k_queries)),
+                rate={"cents_per_1k": plan.grounding_cents_per_1k_queries},
+                cost_microcents=_per_1k_cost_microcents(grounding_queries, plan.grounding_cents_per_1k_queries),
             )
         )
 
     # Tool fees (OpenAI Responses-style; only when we can observe counts).
     web_search_calls = int(tool_calls.get("web_search_call") or 0)
-    if web_search_calls > 0 and rate_card.web_search_cents_per_call is not None:
+    if web_search_calls > 0 and plan.web_search_cents_per_call is not None:
         items.append(
             LineItem(
                 name="tool_web_search_call",
                 quantity=web_search_calls,
                 unit="calls",
-                rate={"cents_per_call": int(rate_card.web_search_cents_per_call)},
-                cost_microcents=_per_call_cost_microcents(web_search_calls, int(rate_card.web_search_cents_per_call)),
+                rate={"cents_per_call": plan.web_search_cents_per_call},
+                cost_microcents=_per_call_cost_microcents(web_search_calls, plan.web_search_cents_per_call),
             )
         )
 
     file_search_calls = int(tool_calls.get("file_search_call") or 0)
-    if file_search_calls > 0 and rate_card.file_search_cents_per_call is not None:
+    if file_search_calls > 0 and plan.file_search_cents_per_call is not None:
         items.append(
             LineItem(
                 name="tool_file_search_call",
                 quantity=file_search_calls,
                 unit="calls",
-                rate={"cents_per_call": int(rate_card.file_search_cents_per_call)},
-                cost_microcents=_per_call_cost_microcents(file_search_calls, int(rate_card.file_search_cents_per_call)),
+                rate={"cents_per_call": plan.file_search_cents_per_call},
+                cost_microcents=_per_call_cost_microcents(file_search_calls, plan.file_search_cents_per_call),
             )
         )
 
+    if response_cache_hit:
+        # Served from a ResponseCache: no provider call was made, so nothing is charged.
+        items = []
     realized_microcents = sum(it.cost_microcents for it in items)
-    return {
+    # Batch API discount, as a negative line item so charges still sum to the total.
+    batch_discount = plan.batch_discount_percent
+    if batch_api and batch_discount and items:
+        discount = realized_microcents - _batch_discounted_microcents(realized_microcents, batch_discount)
+        items.append(
+            LineItem(
+                name="batch_discount",
+                quantity=batch_discount,
+                unit="percent",
+                rate={"percent": batch_discount},
+                cost_microcents=-discount,
+            )
+        )
+        realized_microcents -= discount
+    breakdown: dict[str, Any] = {
         "provider": provider,
         "model": model,
         "usage": {
@@ -273,7 +506,7 @@ def compute_cost_breakdown(
             "grounding_queries": grounding_queries or 0,
             "tool_calls": tool_calls,
         },
-        "cliff": {"configured": cliff, "applied": bool(cliff_applied)},
+        "cliff": {"configured": _cliff_configured(rate_card), "applied": bool(cliff_applied)},
         "charges": [
             {
                 "name": it.name,
@@ -289,3 +522,205 @@ def compute_cost_breakdown(
             "realized_cents_ceiled": int(cents_ceiled_from_microcents(realized_microcents)),
         },
     }
+    if rate_version is not None:
+        # Audit stamp: which rate-table snapshot (RateTable.version) priced this record.
+        breakdown["rate_version"] = rate_version
+    if batch_api:
+        breakdown["batch_api"] = True
+    if response_cache_hit:
+        breakdown["response_cache_hit"] = True
+    return breakdown
+
+
+class CostTotals(NamedTuple):
+    realized_microcents: int
+    realized_cents_ceiled: int
+
+
+def compute_cost_totals(
+    *,
+    rate_card: RateCard,
+    input_tokens: int,
+    output_tokens: int,
+    cached_input_tokens: int | None = None,
+    reasoning_tokens: int | None = None,
+    cache_write_input_tokens: int | None = None,
+    cache_read_input_tokens: int | None = None,
+    grounding_queries: int | None = None,
+    tool_calls: dict[str, int] | None = None,
+    batch_api: bool = False,
+    response_cache_hit: bool = False,
+) -> CostTotals:
+    """
+    Totals-only settlement: same clamping, cliff and rounding as compute_cost_breakdown,
+    without building line items, charges, usage or cliff dicts.
+    """
+    if response_cache_hit:
+        return CostTotals(0, 0)
+    web_search_calls = file_search_calls = None
+    if tool_calls:
+        web_search_calls = tool_calls.get("web_search_call")
+        file_search_calls = tool_calls.get("file_search_call")
+    realized = compile_rate_card(rate_card).realized_microcents(
+        input_tokens,
+        output_tokens,
+        cached_input_tokens,
+        reasoning_tokens,
+        cache_write_input_tokens,
+        cache_read_input_tokens,
+        grounding_queries,
+        web_search_calls,
+        file_search_calls,
+        batch_api,
+    )
+    return CostTotals(realized, cents_ceiled_from_microcents(realized))
+
+
+class LazyCostBreakdown:
+    """
+    Settlement result whose totals are computed up front and whose full
+    compute_cost_breakdown dict is only built (once) when asked for, e.g. for audit.
+
+    Indexing behaves like the breakdown dict; ["totals"] does not force the full build.
+    """
+
+    __slots__ = ("_kwargs", "_breakdown", "realized_microcents", "realized_cents_ceiled")
+
+    def __init__(
+        self,
+        *,
+        provider: str,
+        model: str,
+        rate_card: RateCard,
+        input_tokens: int,
+        output_tokens: int,
+        cached_input_tokens: int | None = None,
+        reasoning_tokens: int | None = None,
+        cache_write_input_tokens: int | None = None,
+        cache_read_input_tokens: int | None = None,
+        grounding_queries: int | None = None,
+        tool_calls: dict[str, int] | None = None,
+        rate_version: str | None = None,
+        batch_api: bool = False,
+        response_cache_hit: bool = False,
+    ) -> None:
+        self._kwargs: dict[str, Any] = {
+            "provider": provider,
+            "model": model,
+            "rate_card": rate_card,
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "cached_input_tokens": cached_input_tokens,
+            "reasoning_tokens": reasoning_tokens,
+            "cache_write_input_tokens": cache_write_input_tokens,
+            "cache_read_input_tokens": cache_read_input_tokens,
+            "grounding_queries": grounding_queries,
+            "tool_calls": tool_calls,
+            "rate_version": rate_version,
+            "batch_api": batch_api,
+            "response_cache_hit": response_cache_hit,
+        }
+        self._breakdown: dict[str, Any] | None = None
+        self.realized_microcents, self.realized_cents_ceiled = compute_cost_totals(
+            rate_card=rate_card,
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            cached_input_tokens=cached_input_tokens,
+            reasoning_tokens=reasoning_tokens,
+            cache_write_input_tokens=cache_write_input_tokens,
+            cache_read_input_tokens=cache_read_input_tokens,
+            grounding_queries=grounding_queries,
+            tool_calls=tool_calls,
+            batch_api=batch_api,
+            response_cache_hit=response_cache_hit,
+        )
+
+    @property
+    def totals(self) -> dict[str, int]:
+        return {
+            "realized_microcents": self.realized_microcents,
+            "realized_cents_ceiled": self.realized_cents_ceiled,
+        }
+
+    @property
+    def materialized(self) -> bool:
+        return self._breakdown is not None
+
+    def to_dict(self) -> dict[str, Any]:
+        if self._breakdown is None:
+            self._breakdown = compute_cost_breakdown(**self._kwargs)
+        return self._breakdown
+
+    def __getitem__(self, key: str) -> Any:
+        if key == "totals" and self._breakdown is None:
+            return self.totals
+        return self.to_dict()[key]
+
+    def __repr__(self) -> str:
+        return (
+            f"LazyCostBreakdown(provider={self._kwargs['provider']!r}, model={self._kwargs['model']!r}, "
+            f"realized_microcents={self.realized_microcents})"
+        )
+
+
+@dataclass(frozen=True)
+class BatchTotals:
+    realized_microcents: list[int]
+    realized_cents_ceiled: list[int]
+
+
+def _column(values: Sequence[int | None] | None, rows: int, name: str) -> Sequence[int | None]:
+    if values is None:
+        return (0,) * rows
+    if len(values) != rows:
+        raise ValueError(f"{name} has {len(values)} rows, expected {rows}")
+    return values
+
+
+def compute_cost_totals_batch(
+    *,
+    rate_cards: Sequence[RateCard],
+    rate_card_index: Sequence[int],
+    input_tokens: Sequence[int],
+    output_tokens: Sequence[int],
+    cached_input_tokens: Sequence[int | None] | None = None,
+    reasoning_tokens: Sequence[int | None] | None = None,
+    cache_write_input_tokens: Sequence[int | None] | None = None,
+    cache_read_input_tokens: Sequence[int | None] | None = None,
+    grounding_queries: Sequence[int | None] | None = None,
+    web_search_calls: Sequence[int | None] | None = None,
+    file_search_calls: Sequence[int | None] | None = None,
+    batch_api: Sequence[bool] | None = None,
+) -> BatchTotals:
+    """
+    Settle columnar usage: row i is priced with rate_cards[rate_card_index[i]].
+
+    Totals are bit-identical to compute_cost_breakdown for the same row (same clamping,
+    same context-cliff rates); only the per-charge breakdown is skipped. Each card is
+    compiled to a PricingPlan once rather than re-resolved per row.
+    """
+    rows = len(rate_card_index)
+    cols = (
+        _column(input_tokens, rows, "input_tokens"),
+        _column(output_tokens, rows, "output_tokens"),
+        _column(cached_input_tokens, rows, "cached_input_tokens"),
+        _column(reasoning_tokens, rows, "reasoning_tokens"),
+        _column(cache_write_input_tokens, rows, "cache_write_input_tokens"),
+        _column(cache_read_input_tokens, rows, "cache_read_input_tokens"),
+        _column(grounding_queries, rows, "grounding_queries"),
+        _column(web_search_calls, rows, "web_search_calls"),
+        _column(file_search_calls, rows, "file_search_calls"),
+        _column(batch_api, rows, "batch_api"),
+    )
+
+    plans: dict[int, PricingPlan] = {}
+    totals: list[int] = [0] * rows
+    ceiled: list[int] = [0] * rows
+    for i, (card_idx, *usage) in enumerate(zip(rate_card_index, *cols)):
+        plan = plans.get(card_idx)
+        if plan is None:
+            plan = plans[card_idx] = compile_rate_card(rate_cards[card_idx])
+        total = plan.realized_microcents(*usage)
+        totals[i] = total
+        ceiled[i] = cents_ceiled_from_microcents(total)
+    return BatchTotals(realized_microcents=totals, realized_cents_ceiled=ceiled)
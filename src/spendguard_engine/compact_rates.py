@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import dataclasses
+import sys
+from array import array
+from typing import Any, Iterator
+
+from spendguard_engine.pricing import RateCard
+
+# Column order follows the RateCard field order.
+COLUMNS: tuple[str, ...] = tuple(f.name for f in dataclasses.fields(RateCard))
+# Float knobs are stored as integers scaled by MULTIPLIER_SCALE.
+SCALED_COLUMNS = frozenset({"context_cliff_input_multiplier", "context_cliff_output_multiplier"})
+MULTIPLIER_SCALE = 1_000_000
+# Marks an unset (None) optional field.
+NONE_SENTINEL = -(2**63)
+
+_NCOLS = len(COLUMNS)
+_SCALED_FLAGS = tuple(name in SCALED_COLUMNS for name in COLUMNS)
+
+TableKey = tuple[str, str, str]
+
+
+def _encode(name: str, value: Any) -> int:
+    if value is None:
+        return NONE_SENTINEL
+    if name in SCALED_COLUMNS:
+        scaled = round(float(value) * MULTIPLIER_SCALE)
+        # Only accept multipliers that decode back to the same float, so cliff math is unchanged.
+        if scaled / MULTIPLIER_SCALE != float(value):
+            raise ValueError(f"{name}={value!r} is not representable with scale {MULTIPLIER_SCALE}")
+        return scaled
+    return int(value)
+
+
+def _decode(scaled: bool, raw: int) -> Any:
+    if raw == NONE_SENTINEL:
+        return None
+    return raw / MULTIPLIER_SCALE if scaled else raw
+
+
+class RateRow:
+    """
+    Read-only view of one row of a CompactRateTable with the RateCard attribute surface,
+    so compute_cost_breakdown / compute_cost_totals / compile_rate_card accept it directly.
+    Fields are decoded from the backing array on access; nothing is copied.
+    """
+
+    __slots__ = ("_data", "_base")
+
+    def __init__(self, data: array, row: int) -> None:
+        self._data = data
+        self._base = row * _NCOLS
+
+    def values(self) -> tuple[Any, ...]:
+        base = self._base
+        data = self._data
+        return tuple(_decode(_SCALED_FLAGS[i], data[base + i]) for i in range(_NCOLS))
+
+    def to_rate_card(self) -> RateCard:
+        return RateCard(*self.values())
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, RateRow):
+            return self.values() == other.values()
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(self.values())
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={value!r}" for name, value in zip(COLUMNS, self.values()) if value is not None)
+        return f"RateRow({fields})"
+
+
+def _column_property(index: int, scaled: bool) -> property:
+    def get(self: RateRow) -> Any:
+        return _decode(scaled, self._data[self._base + index])
+
+    return property(get)
+
+
+for _i, _name in enumerate(COLUMNS):
+    setattr(RateRow, _name, _column_property(_i, _SCALED_FLAGS[_i]))
+
+
+class CompactRateTable:
+    """
+    Rate table for very large (tenant, provider, model) catalogs.
+
+    Every row is a fixed-width run of int64 values in a single array (None stored as
+    NONE_SENTINEL, cliff multipliers scaled by MULTIPLIER_SCALE), and key strings are
+    interned, so per-entry cost is a few hundred bytes of dict/array space instead of a
+    RateCard instance per entry. Lookups return RateRow views over the array.
+    """
+
+    def __init__(self) -> None:
+        self._data = array("q")
+        self._rows: dict[TableKey, int] = {}
+
+    @classmethod
+    def from_rates(cls, rates: dict[str, dict[str, RateCard]], *, tenant: str = "") -> CompactRateTable:
+        table = cls()
+        table.update(rates, tenant=tenant)
+        return table
+
+    def update(self, rates: dict[str, dict[str, RateCard]], *, tenant: str = "") -> None:
+        for provider, models in rates.items():
+            for model, card in models.items():
+                self.set(tenant, provider, model, card)
+
+    def set(self, tenant: str, provider: str, model: str, rate_card: RateCard) -> int:
+        encoded = [_encode(name, getattr(rate_card, name)) for name in COLUMNS]
+        key = (sys.intern(tenant), sys.intern(provider), sys.intern(model))
+        row = self._rows.get(key)
+        if row is None:
+            row = len(self._rows)
+            self._data.extend(encoded)
+            self._rows[key] = row
+        else:
+            base = row * _NCOLS
+            self._data[base : base + _NCOLS] = array("q", encoded)
+        return row
+
+    def row_index(self, tenant: str, provider: str, model: str) -> int | None:
+        return self._rows.get((tenant, provider, model))
+
+    def row(self, index: int) -> RateRow:
+        if not 0 <= index < len(self._rows):
+            raise IndexError(index)
+        return RateRow(self._data, index)
+
+    def get(self, tenant: str, provider: str, model: str) -> RateRow | None:
+        index = self._rows.get((tenant, provider, model))
+        return None if index is None else RateRow(self._data, index)
+
+    def keys(self) -> Iterator[TableKey]:
+        return iter(self._rows)
+
+    def to_rates(self, *, tenant: str = "") -> dict[str, dict[str, RateCard]]:
+        out: dict[str, dict[str, RateCard]] = {}
+        for (t, provider, model), index in self._rows.items():
+            if t == tenant:
+                out.setdefault(provider, {})[model] = RateRow(self._data, index).to_rate_card()
+        return out
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._rows
+
+    def memory_footprint(self) -> dict[str, int]:
+        """Approximate bytes held by the table: row array, key index and (unique) key strings."""
+        rows_bytes = self._data.buffer_info()[1] * self._data.itemsize
+        index_bytes = sys.getsizeof(self._rows) + sum(sys.getsizeof(key) for key in self._rows)
+        strings: dict[int, str] = {}
+        for key in self._rows:
+            for part in key:
+                strings[id(part)] = part
+        string_bytes = sum(sys.getsizeof(s) for s in strings.values())
+        return {
+            "rows": rows_bytes,
+            "index": index_bytes,
+            "strings": string_bytes,
+            "total": rows_bytes + index_bytes + string_bytes,
+        }
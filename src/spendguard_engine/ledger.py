@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import itertools
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Callable
+
+from spendguard_engine.billing import MICROCENTS_PER_CENT, cents_ceiled_from_microcents
+
+if TYPE_CHECKING:
+    from spendguard_engine.schemas import BudgetResponse
+
+# Settled reservations remembered per account, so a repeated settle() is not charged twice.
+SETTLED_HISTORY = 1024
+
+
+@dataclass(frozen=True)
+class Reservation:
+    agent_id: str
+    run_id: str
+    amount_microcents: int
+    # Epoch seconds; None means the reservation never expires on its own.
+    expires_at: float | None = None
+
+
+@dataclass(frozen=True)
+class BudgetSnapshot:
+    agent_id: str
+    hard_limit_microcents: int
+    spent_microcents: int
+    locked_microcents: int
+    locked_run_id: str | None
+    locked_expires_at: float | None
+
+    @property
+    def remaining_microcents(self) -> int:
+        return self.hard_limit_microcents - self.spent_microcents - self.locked_microcents
+
+
+class _Account:
+    __slots__ = ("hard_limit", "spent", "locked", "reservations", "settled", "next_expiry")
+
+    def __init__(self, hard_limit: int) -> None:
+        self.hard_limit = hard_limit
+        self.spent = 0
+        self.locked = 0
+        self.reservations: dict[str, Reservation] = {}
+        # run_id -> the Reservation settled under it (insertion order, oldest first).
+        self.settled: dict[str, Reservation] = {}
+        self.next_expiry: float | None = None
+
+    def unlock(self, reservation: Reservation) -> bool:
+        # Only the reservation actually held under run_id; a stale one for a reused run_id is ignored.
+        if self.reservations.get(reservation.run_id) is not reservation:
+            return False
+        del self.reservations[reservation.run_id]
+        self.locked -= reservation.amount_microcents
+        return True
+
+    def expire(self, now: float) -> None:
+        if self.next_expiry is None or self.next_expiry > now:
+            return
+        next_expiry = None
+        for run_id, res in list(self.reservations.items()):
+            if res.expires_at is None:
+                continue
+            if res.expires_at <= now:
+                del self.reservations[run_id]
+                self.locked -= res.amount_microcents
+            elif next_expiry is None or res.expires_at < next_expiry:
+                next_expiry = res.expires_at
+        self.next_expiry = next_expiry
+
+
+class BudgetLedger:
+    """
+    Thread-safe in-process budget ledger keyed by agent_id, in integer microcents.
+
+    Accounts are spread over lock-striped shards, so operations on different agents
+    rarely contend. Semantics follow schemas.BudgetResponse: reserve() locks a preflight
+    amount, settle() replaces it with the realized cost (e.g. compute_cost_breakdown's
+    totals.realized_microcents), release() drops it unspent. Expired reservations are
+    released lazily on the next access to the account.
+    """
+
+    def __init__(self, *, shards: int = 64, clock: Callable[[], float] = time.time) -> None:
+        if shards <= 0:
+            raise ValueError("shards must be > 0")
+        self._locks = [threading.Lock() for _ in range(shards)]
+        self._accounts: list[dict[str, _Account]] = [{} for _ in range(shards)]
+        self._clock = clock
+        self._run_ids = itertools.count(1)
+
+    def _shard(self, agent_id: str) -> int:
+        return hash(agent_id) % len(self._locks)
+
+    def _account(self, shard: int, agent_id: str) -> _Account:
+        account = self._accounts[shard].get(agent_id)
+        if account is None:
+            raise KeyError(f"unknown agent_id: {agent_id}")
+        account.expire(self._clock())
+        return account
+
+    def set_budget(self, agent_id: str, hard_limit_cents: int) -> None:
+        hard_limit = int(hard_limit_cents) * MICROCENTS_PER_CENT
+        shard = self._shard(agent_id)
+        with self._locks[shard]:
+            account = self._accounts[shard].get(agent_id)
+            if account is None:
+                self._accounts[shard][agent_id] = _Account(hard_limit)
+            else:
+                account.hard_limit = hard_limit
+
+    def top_up(self, agent_id: str, cents: int) -> None:
+        shard = self._shard(agent_id)
+        with self._locks[shard]:
+            self._account(shard, agent_id).hard_limit += max(0, int(cents)) * MICROCENTS_PER_CENT
+
+    def reserve(
+        self,
+        agent_id: str,
+        amount_microcents: int,
+        *,
+        run_id: str | None = None,
+        ttl_seconds: float | None = None,
+    ) -> Reservation | None:
+        """Lock amount_microcents for a run; returns None if the remaining budget is too small."""
+        amount = max(0, int(amount_microcents))
+        shard = self._shard(agent_id)
+        with self._locks[shard]:
+            account = self._account(shard, agent_id)
+            if amount > account.hard_limit - account.spent - account.locked:
+                return None
+            if run_id is None:
+                # Skip ids a caller already chose explicitly, so a live reservation is never replaced.
+                run_id = f"run-{next(self._run_ids)}"
+                while run_id in account.reservations:
+                    run_id = f"run-{next(self._run_ids)}"
+            elif run_id in account.reservations:
+                raise ValueError(f"run_id already has a reservation: {run_id}")
+            expires_at = None if ttl_seconds is None else self._clock() + float(ttl_seconds)
+            res = Reservation(agent_id=agent_id, run_id=run_id, amount_microcents=amount, expires_at=expires_at)
+            account.reservations[run_id] = res
+            account.locked += amount
+            if expires_at is not None and (account.next_expiry is None or expires_at < account.next_expiry):
+                account.next_expiry = expires_at
+            return res
+
+    def settle(self, reservation: Reservation, realized_microcents: int) -> int:
+        """
+        Release the reservation and record the realized cost; returns remaining microcents.
+
+        The realized cost is recorded even if the reservation already expired, since the
+        provider has charged for it. Settling the same Reservation again is a no-op.
+        """
+        shard = self._shard(reservation.agent_id)
+        with self._locks[shard]:
+            account = self._account(shard, reservation.agent_id)
+            if account.settled.get(reservation.run_id) is not reservation:
+                account.unlock(reservation)
+                account.spent += max(0, int(realized_microcents))
+                account.settled.pop(reservation.run_id, None)
+                account.settled[reservation.run_id] = reservation
+                if len(account.settled) > SETTLED_HISTORY:
+                    del account.settled[next(iter(account.settled))]
+            return account.hard_limit - account.spent - account.locked
+
+    def release(self, reservation: Reservation) -> bool:
+        shard = self._shard(reservation.agent_id)
+        with self._locks[shard]:
+            return self._account(shard, reservation.agent_id).unlock(reservation)
+
+    def snapshot(self, agent_id: str) -> BudgetSnapshot:
+        shard = self._shard(agent_id)
+        with self._locks[shard]:
+            account = self._account(shard, agent_id)
+            latest = next(reversed(account.reservations.values()), None)
+            return BudgetSnapshot(
+                agent_id=agent_id,
+                hard_limit_microcents=account.hard_limit,
+                spent_microcents=account.spent,
+                locked_microcents=account.locked,
+                locked_run_id=latest.run_id if latest else None,
+                locked_expires_at=latest.expires_at if latest else None,
+            )
+
+    def budget_response(self, agent_id: str) -> BudgetResponse:
+        from spendguard_engine.schemas import BudgetResponse
+
+        snap = self.snapshot(agent_id)
+        expires_at = None
+        if snap.locked_expires_at is not None:
+            expires_at = datetime.fromtimestamp(snap.locked_expires_at, tz=timezone.utc).isoformat()
+        return BudgetResponse(
+            agent_id=agent_id,
+            hard_limit_cents=snap.hard_limit_microcents // MICROCENTS_PER_CENT,
+            # Whole cents only: a partially consumed cent is not spendable.
+            remaining_cents=max(0, snap.remaining_microcents) // MICROCENTS_PER_CENT,
+            locked_cents=cents_ceiled_from_microcents(snap.locked_microcents),
+            locked_run_id=snap.locked_run_id,
+            locked_expires_at=expires_at,
+        )
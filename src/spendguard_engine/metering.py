@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+from spendguard_engine.billing import compile_rate_card
+from spendguard_engine.pricing import RateCard
+
+
+class StreamingCostMeter:
+    """
+    Running upper bound on the cost of a streamed response, for mid-stream budget enforcement.
+
+    Input is priced once up front (with the same clamping and context cliff as
+    compute_cost_breakdown); each chunk then adds its output tokens at the card's output
+    rate, or reasoning rate for reasoning tokens. Updates are O(1): the stream is never
+    repriced. Final settlement should still use compute_cost_breakdown on provider usage.
+    """
+
+    __slots__ = (
+        "reserved_microcents",
+        "input_microcents",
+        "_output_rate",
+        "_reasoning_rate",
+        "_tokens",
+        "_text_chars",
+        "_text_tokens",
+        "_output_microcents",
+        "_exceeded_at",
+    )
+
+    def __init__(
+        self,
+        *,
+        rate_card: RateCard,
+        input_tokens: int,
+        reserved_microcents: int,
+        cached_input_tokens: int | None = None,
+        cache_write_input_tokens: int | None = None,
+        cache_read_input_tokens: int | None = None,
+    ) -> None:
+        plan = compile_rate_card(rate_card)
+        input_tokens = max(0, int(input_tokens))
+        rates, _ = plan.rates_for(input_tokens)
+        self.reserved_microcents = int(reserved_microcents)
+        self.input_microcents = plan.realized_microcents(
+            input_tokens,
+            0,
+            cached_input_tokens=cached_input_tokens,
+            cache_write_input_tokens=cache_write_input_tokens,
+            cache_read_input_tokens=cache_read_input_tokens,
+        )
+        self._output_rate = max(0, rates.output)
+        reasoning_rate = plan.reasoning_output_cents_per_1m
+        self._reasoning_rate = self._output_rate if reasoning_rate is None else max(0, reasoning_rate)
+        self._tokens = 0
+        self._text_chars = 0
+        self._text_tokens = 0
+        self._output_microcents = 0
+        self._exceeded_at: int | None = None
+        self._check()
+
+    @property
+    def output_tokens(self) -> int:
+        return self._tokens + self._text_tokens
+
+    @property
+    def upper_bound_microcents(self) -> int:
+        return self.input_microcents + self._output_microcents
+
+    @property
+    def remaining_microcents(self) -> int:
+        return self.reserved_microcents - self.upper_bound_microcents
+
+    @property
+    def exceeded(self) -> bool:
+        return self._exceeded_at is not None
+
+    @property
+    def exceeded_at_output_tokens(self) -> int | None:
+        """Output token count of the chunk that first pushed the bound past the reservation."""
+        return self._exceeded_at
+
+    def tokens_remaining(self, *, reasoning: bool = False) -> int | None:
+        """Additional output tokens that still fit the reservation (None if they are free)."""
+        rate = self._reasoning_rate if reasoning else self._output_rate
+        if rate <= 0:
+            return None
+        return max(0, self.remaining_microcents // rate)
+
+    def would_exceed(self, tokens: int, *, reasoning: bool = False) -> bool:
+        rate = self._reasoning_rate if reasoning else self._output_rate
+        return self.upper_bound_microcents + max(0, int(tokens)) * rate > self.reserved_microcents
+
+    def add_tokens(self, tokens: int, *, reasoning: bool = False) -> bool:
+        """Account for a chunk of observed output tokens; returns False once over the reservation."""
+        tokens = max(0, int(tokens))
+        self._tokens += tokens
+        self._output_microcents += tokens * (self._reasoning_rate if reasoning else self._output_rate)
+        return self._check()
+
+    def add_text(self, delta: str) -> bool:
+        """
+        Account for a streamed text delta using the estimate_tokens_text heuristic over the
+        running character count (not per chunk, so small deltas are not each rounded up).
+        """
+        if not delta:
+            return not self.exceeded
+        self._text_chars += len(delta)
+        text_tokens = max(1, (self._text_chars + 2) // 3)
+        self._output_microcents += (text_tokens - self._text_tokens) * self._output_rate
+        self._text_tokens = text_tokens
+        return self._check()
+
+    def _check(self) -> bool:
+        if self._exceeded_at is None and self.upper_bound_microcents > self.reserved_microcents:
+            self._exceeded_at = self.output_tokens
+        return self._exceeded_at is None
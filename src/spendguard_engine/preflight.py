@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from spendguard_engine.billing import MICROCENTS_PER_CENT, compile_rate_card
+from spendguard_engine.pricing import RateCard
+
+
+@dataclass(frozen=True)
+class OutputAllowance:
+    max_output_tokens: int
+    # How many of max_output_tokens may be reasoning tokens.
+    max_reasoning_tokens: int
+    input_microcents: int
+    budget_microcents: int
+    cliff_applied: bool
+
+
+def _budget_microcents(budget_cents: int | None, budget_microcents: int | None) -> int:
+    if (budget_cents is None) == (budget_microcents is None):
+        raise ValueError("pass exactly one of budget_cents or budget_microcents")
+    if budget_microcents is not None:
+        return int(budget_microcents)
+    # Settlement ceils microcents to cents, so a cent budget allows exactly budget_cents * 1e6 microcents.
+    return int(budget_cents) * MICROCENTS_PER_CENT
+
+
+def max_affordable_output_tokens(
+    *,
+    rate_card: RateCard,
+    input_tokens: int,
+    budget_cents: int | None = None,
+    budget_microcents: int | None = None,
+    cached_input_tokens: int | None = None,
+    cache_write_input_tokens: int | None = None,
+    cache_read_input_tokens: int | None = None,
+    reasoning_tokens: int | None = None,
+    limit: int | None = None,
+) -> OutputAllowance:
+    """
+    Largest output-token count whose settled cost fits the remaining budget, solved in O(1).
+
+    Uses the same clamping, context cliff and rounding as compute_cost_breakdown. Without
+    reasoning_tokens the allowance is safe for any reasoning/visible split (priced at the
+    higher of the output and reasoning rates); with it (e.g. a fixed thinking budget) the
+    reasoning part is priced at the reasoning rate and the rest at the output rate.
+
+    The result feeds clamp_openai_max_tokens / clamp_openai_max_output_tokens directly.
+    limit caps the result (e.g. a model's max output); it is required when output is free.
+    """
+    budget = _budget_microcents(budget_cents, budget_microcents)
+    plan = compile_rate_card(rate_card)
+    input_tokens = max(0, int(input_tokens))
+    rates, cliff_applied = plan.rates_for(input_tokens)
+    input_microcents = plan.realized_microcents(
+        input_tokens,
+        0,
+        cached_input_tokens=cached_input_tokens,
+        cache_write_input_tokens=cache_write_input_tokens,
+        cache_read_input_tokens=cache_read_input_tokens,
+    )
+    available = max(0, budget - input_microcents)
+
+    out_rate = max(0, rates.output)
+    reasoning_rate = (
+        out_rate if plan.reasoning_output_cents_per_1m is None else max(0, plan.reasoning_output_cents_per_1m)
+    )
+
+    if reasoning_tokens is None:
+        worst_rate = max(out_rate, reasoning_rate)
+        if worst_rate == 0:
+            if limit is None:
+                raise ValueError("output is free under this rate card; pass limit")
+            max_output = max(0, int(limit))
+        else:
+            max_output = available // worst_rate
+            if limit is not None:
+                max_output = min(max_output, max(0, int(limit)))
+        return OutputAllowance(
+            max_output_tokens=max_output,
+            max_reasoning_tokens=max_output,
+            input_microcents=input_microcents,
+            budget_microcents=budget,
+            cliff_applied=cliff_applied,
+        )
+
+    reasoning = max(0, int(reasoning_tokens))
+    if limit is not None:
+        reasoning = min(reasoning, max(0, int(limit)))
+    if reasoning_rate > 0:
+        reasoning = min(reasoning, available // reasoning_rate)
+    available -= reasoning * reasoning_rate
+    if out_rate == 0:
+        if limit is None:
+            raise ValueError("output is free under this rate card; pass limit")
+        max_output = max(0, int(limit))
+    else:
+        max_output = reasoning + available // out_rate
+        if limit is not None:
+            max_output = min(max_output, max(0, int(limit)))
+    return OutputAllowance(
+        max_output_tokens=max_output,
+        max_reasoning_tokens=reasoning,
+        input_microcents=input_microcents,
+        budget_microcents=budget,
+        cliff_applied=cliff_applied,
+    )
@@ -27,6 +27,9 @@ class RateCard:
     context_cliff_input_multiplier: float | None = None
     context_cliff_output_multiplier: float | None = None
 
+    # Batch API discount in percent (e.g. 50), applied only to records settled with batch_api=True.
+    batch_discount_percent: int | None = None
+
 
 DEFAULT_RATES: dict[str, dict[str, RateCard]] = {
     # Conservative defaults. Wrapper services should override these in production.
@@ -82,10 +85,16 @@ def merge_rates(base: dict[str, dict[str, RateCard]], overlay: dict[str, dict[st
 
 
 def estimate_tokens_text(text: str) -> int:
-    # Simple, conservative estimate; avoids adding tokenizer deps.
-    # Typical English is ~4 chars/token; we overestimate a bit.
     if not text:
         return 0
+    # A configured local BPE vocabulary (see spendguard_engine.tokenizers) gives tighter counts.
+    from spendguard_engine.tokenizers import get_default_tokenizer
+
+    tokenizer = get_default_tokenizer()
+    if tokenizer is not None:
+        return tokenizer.count(text)
+    # Simple, conservative estimate; avoids adding tokenizer deps.
+    # Typical English is ~4 chars/token; we overestimate a bit.
     return max(1, (len(text) + 2) // 3)
 
 
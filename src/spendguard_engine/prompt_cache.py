@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable
+
+from spendguard_engine.token_estimation import MESSAGE_OVERHEAD_TOKENS, REPLY_PRIMING_TOKENS, TokenEstimator
+
+_ROOT = b"\0" * 8
+_default_estimator = TokenEstimator()
+
+
+@dataclass(frozen=True)
+class CacheProfile:
+    # Seconds an unused prefix stays cached; every hit refreshes it.
+    ttl: float
+    # Prompts shorter than this are never cached.
+    min_tokens: int
+    # Cached prefixes are counted in multiples of this many tokens.
+    granularity: int
+    # Only prefixes ending at a cache_control breakpoint are cached (Anthropic).
+    explicit_breakpoints: bool
+    # compute_cost_breakdown / preflight argument that carries the cached tokens.
+    usage_field: str
+
+
+# Approximations of each provider's prompt cache; override with profile= when they change.
+CACHE_PROFILES: dict[str, CacheProfile] = {
+    "openai": CacheProfile(
+        ttl=300.0, min_tokens=1024, granularity=128, explicit_breakpoints=False, usage_field="cached_input_tokens"
+    ),
+    "anthropic": CacheProfile(
+        ttl=300.0, min_tokens=1024, granularity=1, explicit_breakpoints=True, usage_field="cache_read_input_tokens"
+    ),
+    "gemini": CacheProfile(
+        ttl=300.0, min_tokens=1024, granularity=1, explicit_breakpoints=False, usage_field="cached_input_tokens"
+    ),
+}
+
+
+@dataclass(frozen=True)
+class PromptBlock:
+    # Chained hash of this block and every block before it.
+    digest: bytes
+    tokens: int
+    breakpoint: bool = False
+
+
+@dataclass(frozen=True)
+class PrefixEstimate:
+    input_tokens: int
+    cached_tokens: int
+    usage_field: str
+
+    @property
+    def uncached_tokens(self) -> int:
+        return self.input_tokens - self.cached_tokens
+
+    def usage(self) -> dict[str, int]:
+        """Keyword arguments for max_affordable_output_tokens / compute_cost_breakdown."""
+        return {"input_tokens": self.input_tokens, self.usage_field: self.cached_tokens}
+
+
+def _has_cache_control(node: Any) -> bool:
+    if isinstance(node, dict):
+        return "cache_control" in node or any(_has_cache_control(v) for v in node.values())
+    if isinstance(node, list):
+        return any(_has_cache_control(v) for v in node)
+    return False
+
+
+def _strip_cache_control(node: Any) -> Any:
+    if isinstance(node, dict):
+        return {k: _strip_cache_control(v) for k, v in node.items() if k != "cache_control"}
+    if isinstance(node, list):
+        return [_strip_cache_control(v) for v in node]
+    return node
+
+
+def prompt_blocks(
+    messages: Iterable[Any],
+    *,
+    system: Any = None,
+    tools: Any = None,
+    estimator: TokenEstimator | None = None,
+) -> list[PromptBlock]:
+    """
+    Split a prompt into hashed prefix blocks in the order providers cache them: tools, then
+    the system prompt (Anthropic `system`, Responses `instructions`), then one block per
+    message / input item. Token counts use the same rules as TokenEstimator. Digests ignore
+    cache_control markers, so a block hashes the same whether or not it carries the breakpoint.
+    """
+    estimator = estimator or _default_estimator
+    parts: list[tuple[Any, int]] = []
+    if tools:
+        parts.append((tools, estimator.text(json.dumps(tools, ensure_ascii=False, separators=(",", ":")))))
+    if system:
+        parts.append((system, MESSAGE_OVERHEAD_TOKENS + estimator.walk(system)))
+    for message in messages:
+        overhead = MESSAGE_OVERHEAD_TOKENS if not isinstance(message, dict) or "role" in message else 0
+        parts.append((message, overhead + estimator.walk(message)))
+
+    blocks: list[PromptBlock] = []
+    digest = _ROOT
+    for node, tokens in parts:
+        breakpoint = _has_cache_control(node)
+        if breakpoint:
+            node = _strip_cache_control(node)
+        encoded = json.dumps(node, sort_keys=True, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        digest = hashlib.blake2b(digest + encoded, digest_size=16).digest()
+        blocks.append(PromptBlock(digest, tokens, breakpoint))
+    return blocks
+
+
+class PromptPrefixIndex:
+    """
+    Per-agent rolling index of recently sent prompt prefixes, used to predict how much of
+    the next prompt a provider will serve from its prompt cache, so preflight can reserve
+    at cached-input rates instead of assuming zero hits.
+
+    Entries expire after the provider profile's TTL (refreshed on reuse, like provider
+    caches). Memory is bounded: at most max_blocks_per_agent prefixes for each of
+    max_agents agents, least recently used evicted first. This is a prediction: settlement
+    still uses the usage the provider reports.
+    """
+
+    def __init__(
+        self,
+        provider: str = "openai",
+        *,
+        profile: CacheProfile | None = None,
+        max_agents: int = 10_000,
+        max_blocks_per_agent: int = 512,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if profile is None:
+            profile = CACHE_PROFILES.get(provider)
+            if profile is None:
+                raise ValueError(f"no prompt cache profile for provider {provider!r}; pass profile=")
+        if max_agents <= 0 or max_blocks_per_agent <= 0:
+            raise ValueError("max_agents and max_blocks_per_agent must be positive")
+        self.profile = profile
+        self.max_agents = int(max_agents)
+        self.max_blocks_per_agent = int(max_blocks_per_agent)
+        self._clock = clock
+        # agent_id -> digest -> (expires_at, whether a sent prompt had a breakpoint there)
+        self._agents: OrderedDict[str, OrderedDict[bytes, tuple[float, bool]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def estimate(self, agent_id: str, blocks: list[PromptBlock]) -> PrefixEstimate:
+        """
+        Expected cached/uncached split for a prompt, from the longest live prefix already sent.
+        With explicit breakpoints (Anthropic) that prefix must have ended at a breakpoint when
+        it was sent, and the new prompt must carry a breakpoint of its own to read the cache.
+        """
+        profile = self.profile
+        input_tokens = REPLY_PRIMING_TOKENS + sum(block.tokens for block in blocks)
+        cached = 0
+        now = self._clock()
+        explicit = profile.explicit_breakpoints
+        with self._lock:
+            entries = self._agents.get(agent_id)
+            if entries and (not explicit or any(block.breakpoint for block in blocks)):
+                prefix = 0
+                for block in blocks:
+                    entry = entries.get(block.digest)
+                    if entry is None or entry[0] <= now:
+                        break
+                    prefix += block.tokens
+                    if entry[1] or not explicit:
+                        cached = prefix
+        if cached < profile.min_tokens:
+            cached = 0
+        cached -= cached % profile.granularity
+        return PrefixEstimate(input_tokens, cached, profile.usage_field)
+
+    def record(self, agent_id: str, blocks: list[PromptBlock]) -> None:
+        """Note that a prompt was sent (call after the request goes out)."""
+        now = self._clock()
+        expires_at = now + self.profile.ttl
+        with self._lock:
+            entries = self._agents.get(agent_id)
+            if entries is None:
+                entries = self._agents[agent_id] = OrderedDict()
+                while len(self._agents) > self.max_agents:
+                    self._agents.popitem(last=False)
+            else:
+                self._agents.move_to_end(agent_id)
+            # Shortest prefix last, so eviction drops the tails of long prompts before their shared heads.
+            for block in reversed(blocks):
+                previous = entries.get(block.digest)
+                # A breakpoint written by an earlier prompt stays cached until it expires.
+                breakpoint = block.breakpoint or (previous is not None and previous[1] and previous[0] > now)
+                entries[block.digest] = (expires_at, breakpoint)
+                entries.move_to_end(block.digest)
+            while len(entries) > self.max_blocks_per_agent:
+                entries.popitem(last=False)
+
+    def forget(self, agent_id: str) -> None:
+        with self._lock:
+            self._agents.pop(agent_id, None)
+
+    def __len__(self) -> int:
+        """Prefixes currently held across all agents."""
+        with self._lock:
+            return sum(len(entries) for entries in self._agents.values())
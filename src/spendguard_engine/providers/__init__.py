@@ -1,20 +1,62 @@
-from spendguard_engine.providers.anthropic_provider import (
-    call_anthropic_messages,
-    extract_anthropic_completion,
-    extract_anthropic_usage,
-)
-from spendguard_engine.providers.gemini_provider import (
-    call_gemini_generate_content,
-    extract_gemini_completion,
-    extract_gemini_usage,
-)
-from spendguard_engine.providers.openai_provider import (
-    call_openai_chat,
-    call_openai_responses,
-    clamp_openai_max_output_tokens,
-    clamp_openai_max_tokens,
-    extract_openai_usage,
-)
+from __future__ import annotations
+
+import importlib
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from spendguard_engine.providers.anthropic_provider import (
+        AnthropicMessageStream,
+        acall_anthropic_messages,
+        call_anthropic_messages,
+        extract_anthropic_completion,
+        extract_anthropic_usage,
+        iter_anthropic_batch_results,
+        normalize_anthropic_usage,
+        run_anthropic_batch,
+        stream_anthropic_messages,
+        submit_anthropic_batch,
+        wait_anthropic_batch,
+    )
+    from spendguard_engine.providers.async_transport import AsyncHTTPTransport, get_default_async_transport
+    from spendguard_engine.providers.batch import BatchRequest, BatchResult
+    from spendguard_engine.providers.cache import CachedResponse, ResponseCache, request_fingerprint
+    from spendguard_engine.providers.decoding import loads, loads_member
+    from spendguard_engine.providers.errors import ProviderConnectionError, ProviderHTTPError
+    from spendguard_engine.providers.gemini_provider import (
+        GeminiContentStream,
+        acall_gemini_generate_content,
+        call_gemini_generate_content,
+        extract_gemini_completion,
+        extract_gemini_usage,
+        normalize_gemini_usage,
+        stream_gemini_generate_content,
+    )
+    from spendguard_engine.providers.openai_provider import (
+        acall_openai_chat,
+        acall_openai_responses,
+        call_openai_chat,
+        call_openai_responses,
+        clamp_openai_max_output_tokens,
+        clamp_openai_max_tokens,
+        encode_openai_batch_file,
+        extract_openai_usage,
+        iter_openai_batch_results,
+        normalize_openai_usage,
+        run_openai_batch,
+        submit_openai_batch,
+        wait_openai_batch,
+    )
+    from spendguard_engine.providers.rate_limit import RateLimit, RateLimiter, RateReservation
+    from spendguard_engine.providers.retry import (
+        Hedger,
+        RetryPolicy,
+        acall_with_retry,
+        call_with_retry,
+        error_headers,
+        retry_after_seconds,
+        worst_case_request_microcents,
+    )
+    from spendguard_engine.providers.transport import HTTPTransport, get_default_transport, set_default_transport
 
 __all__ = [
     "call_openai_chat",
@@ -28,4 +70,121 @@ __all__ = [
     "call_anthropic_messages",
     "extract_anthropic_completion",
     "extract_anthropic_usage",
+    "HTTPTransport",
+    "get_default_transport",
+    "set_default_transport",
+    "acall_openai_chat",
+    "acall_openai_responses",
+    "acall_gemini_generate_content",
+    "acall_anthropic_messages",
+    "AsyncHTTPTransport",
+    "get_default_async_transport",
+    "stream_anthropic_messages",
+    "stream_gemini_generate_content",
+    "AnthropicMessageStream",
+    "GeminiContentStream",
+    "ProviderHTTPError",
+    "ProviderConnectionError",
+    "RetryPolicy",
+    "call_with_retry",
+    "acall_with_retry",
+    "retry_after_seconds",
+    "error_headers",
+    "Hedger",
+    "worst_case_request_microcents",
+    "loads",
+    "loads_member",
+    "normalize_openai_usage",
+    "normalize_anthropic_usage",
+    "normalize_gemini_usage",
+    "BatchRequest",
+    "BatchResult",
+    "encode_openai_batch_file",
+    "submit_openai_batch",
+    "wait_openai_batch",
+    "iter_openai_batch_results",
+    "run_openai_batch",
+    "submit_anthropic_batch",
+    "wait_anthropic_batch",
+    "iter_anthropic_batch_results",
+    "run_anthropic_batch",
+    "ResponseCache",
+    "CachedResponse",
+    "request_fingerprint",
+    "RateLimiter",
+    "RateLimit",
+    "RateReservation",
 ]
+
+# Provider modules are imported on first attribute access, so a process that only talks
+# to one provider never loads the others (or their SDKs).
+_LAZY = {
+    "call_openai_chat": "openai_provider",
+    "call_openai_responses": "openai_provider",
+    "clamp_openai_max_output_tokens": "openai_provider",
+    "clamp_openai_max_tokens": "openai_provider",
+    "extract_openai_usage": "openai_provider",
+    "call_gemini_generate_content": "gemini_provider",
+    "extract_gemini_completion": "gemini_provider",
+    "extract_gemini_usage": "gemini_provider",
+    "call_anthropic_messages": "anthropic_provider",
+    "extract_anthropic_completion": "anthropic_provider",
+    "extract_anthropic_usage": "anthropic_provider",
+    "HTTPTransport": "transport",
+    "get_default_transport": "transport",
+    "set_default_transport": "transport",
+    "acall_openai_chat": "openai_provider",
+    "acall_openai_responses": "openai_provider",
+    "acall_gemini_generate_content": "gemini_provider",
+    "acall_anthropic_messages": "anthropic_provider",
+    "AsyncHTTPTransport": "async_transport",
+    "get_default_async_transport": "async_transport",
+    "stream_anthropic_messages": "anthropic_provider",
+    "stream_gemini_generate_content": "gemini_provider",
+    "AnthropicMessageStream": "anthropic_provider",
+    "GeminiContentStream": "gemini_provider",
+    "ProviderHTTPError": "errors",
+    "ProviderConnectionError": "errors",
+    "RetryPolicy": "retry",
+    "call_with_retry": "retry",
+    "acall_with_retry": "retry",
+    "retry_after_seconds": "retry",
+    "error_headers": "retry",
+    "Hedger": "retry",
+    "worst_case_request_microcents": "retry",
+    "loads": "decoding",
+    "loads_member": "decoding",
+    "normalize_openai_usage": "openai_provider",
+    "normalize_anthropic_usage": "anthropic_provider",
+    "normalize_gemini_usage": "gemini_provider",
+    "BatchRequest": "batch",
+    "BatchResult": "batch",
+    "encode_openai_batch_file": "openai_provider",
+    "submit_openai_batch": "openai_provider",
+    "wait_openai_batch": "openai_provider",
+    "iter_openai_batch_results": "openai_provider",
+    "run_openai_batch": "openai_provider",
+    "submit_anthropic_batch": "anthropic_provider",
+    "wait_anthropic_batch": "anthropic_provider",
+    "iter_anthropic_batch_results": "anthropic_provider",
+    "run_anthropic_batch": "anthropic_provider",
+    "ResponseCache": "cache",
+    "CachedResponse": "cache",
+    "request_fingerprint": "cache",
+    "RateLimiter": "rate_limit",
+    "RateLimit": "rate_limit",
+    "RateReservation": "rate_limit",
+}
+
+
+def __getattr__(name: str) -> Any:
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f"{__name__}.{module}"), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
@@ -1,21 +1,54 @@
 from __future__ import annotations
 
+import http.client
 import json
 import os
-import urllib.error
-import urllib.request
-from typing import Any
+import time
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator
 
+from spendguard_engine.providers.batch import BatchRequest, BatchResult, check_batch_requests, wait_for_batch
+from spendguard_engine.providers.decoding import loads, loads_member
+from spendguard_engine.providers.errors import ProviderConnectionError, ProviderHTTPError
+from spendguard_engine.providers.sse import iter_sse_events
+from spendguard_engine.providers.transport import (
+    HTTPResponse,
+    HTTPTransport,
+    StreamingHTTPResponse,
+    get_default_transport,
+)
+from spendguard_engine.usage import NormalizedUsage, coerce_count
 
-def call_anthropic_messages(
+if TYPE_CHECKING:
+    from spendguard_engine.providers.async_transport import AsyncHTTPTransport
+
+# Message Batches limit (the 256 MB size limit is left to the API to enforce).
+ANTHROPIC_BATCH_MAX_REQUESTS = 100_000
+
+
+def _base_url(base_url: str | None) -> str:
+    return (base_url or os.getenv("ANTHROPIC_BASE_URL") or "https://api.anthropic.com").rstrip("/")
+
+
+def _api_headers(api_key: str) -> dict[str, str]:
+    return {
+        "Content-Type": "application/json",
+        "x-api-key": api_key,
+        # Keep overrideable since Anthropic versions drift.
+        "anthropic-version": os.getenv("ANTHROPIC_VERSION", "2023-06-01"),
+    }
+
+
+def _messages_request(
     api_key: str,
     model: str,
     system: str | None,
     messages: list[dict[str, Any]],
     temperature: float | None,
     max_tokens: int,
-) -> dict[str, Any]:
-    url = "https://api.anthropic.com/v1/messages"
+    base_url: str | None,
+    stream: bool = False,
+) -> tuple[str, bytes, dict[str, str]]:
+    url = f"{_base_url(base_url)}/v1/messages"
     payload: dict[str, Any] = {
         "model": model,
         "max_tokens": max_tokens,
@@ -25,33 +58,278 @@ def call_anthropic_messages(
         payload["system"] = system
     if temperature is not None:
         payload["temperature"] = temperature
+    if stream:
+        payload["stream"] = True
 
-    req = urllib.request.Request(
-        url,
-        data=json.dumps(payload).encode("utf-8"),
-        headers={
-            "Content-Type": "application/json",
-            "x-api-key": api_key,
-            # Keep overrideable since Anthropic versions drift.
-            "anthropic-version": os.getenv("ANTHROPIC_VERSION", "2023-06-01"),
-        },
-        method="POST",
-    )
-    try:
-        with urllib.request.urlopen(req, timeout=60) as resp:
-            raw = resp.read().decode("utf-8")
-    except urllib.error.HTTPError as exc:
-        detail = exc.read().decode("utf-8") if exc.fp else str(exc)
-        raise RuntimeError(f"Anthropic request failed: {detail}") from exc
-    except urllib.error.URLError as exc:
-        raise RuntimeError(f"Anthropic request failed: {exc.reason}") from exc
-
-    out = json.loads(raw)
+    return url, json.dumps(payload).encode("utf-8"), _api_headers(api_key)
+
+
+def _messages_response(resp: HTTPResponse, usage_only: bool) -> dict[str, Any]:
+    if not resp.ok:
+        raise ProviderHTTPError(
+            f"Anthropic request failed: {resp.text()}", status=resp.status, headers=resp.headers, body=resp.body
+        )
+    if usage_only:
+        # Settlement-only callers: decode just the trailing usage block.
+        usage = loads_member(resp.body, "usage")
+        return {"usage": usage if isinstance(usage, dict) else {}}
+    out = loads(resp.body)
     if not isinstance(out, dict):
         raise RuntimeError("Anthropic returned invalid JSON")
     return out
 
 
+def call_anthropic_messages(
+    api_key: str,
+    model: str,
+    system: str | None,
+    messages: list[dict[str, Any]],
+    temperature: float | None,
+    max_tokens: int,
+    *,
+    timeout: float | None = None,
+    transport: HTTPTransport | None = None,
+    base_url: str | None = None,
+    usage_only: bool = False,
+) -> dict[str, Any]:
+    url, body, headers = _messages_request(api_key, model, system, messages, temperature, max_tokens, base_url)
+    try:
+        resp = (transport or get_default_transport()).request("POST", url, body=body, headers=headers, timeout=timeout)
+    except (OSError, http.client.HTTPException) as exc:
+        raise ProviderConnectionError(f"Anthropic request failed: {exc}") from exc
+    return _messages_response(resp, usage_only)
+
+
+async def acall_anthropic_messages(
+    api_key: str,
+    model: str,
+    system: str | None,
+    messages: list[dict[str, Any]],
+    temperature: float | None,
+    max_tokens: int,
+    *,
+    timeout: float | None = None,
+    transport: AsyncHTTPTransport | None = None,
+    base_url: str | None = None,
+    usage_only: bool = False,
+) -> dict[str, Any]:
+    """asyncio version of call_anthropic_messages over the loop's shared AsyncHTTPTransport."""
+    if transport is None:
+        from spendguard_engine.providers.async_transport import get_default_async_transport
+
+        transport = get_default_async_transport()
+    url, body, headers = _messages_request(api_key, model, system, messages, temperature, max_tokens, base_url)
+    try:
+        resp = await transport.request("POST", url, body=body, headers=headers, timeout=timeout)
+    except (OSError, http.client.HTTPException) as exc:
+        raise ProviderConnectionError(f"Anthropic request failed: {exc}") from exc
+    return _messages_response(resp, usage_only)
+
+
+class AnthropicMessageStream:
+    """
+    Iterator over the text deltas of a streamed Messages call. `usage` accumulates the
+    message_start and message_delta usage blocks as they arrive; after the stream ends,
+    usage_payload() can go straight to extract_anthropic_usage for billing.
+    """
+
+    def __init__(self, response: StreamingHTTPResponse) -> None:
+        self._response = response
+        self._events = iter_sse_events(response.iter_lines())
+        self.usage: dict[str, Any] = {}
+        self.stop_reason: str | None = None
+        self.done = False
+
+    def __iter__(self) -> AnthropicMessageStream:
+        return self
+
+    def __next__(self) -> str:
+        for event in self._events:
+            text = self._handle(loads(event.data))
+            if text:
+                return text
+        self.done = True
+        raise StopIteration
+
+    def _handle(self, data: dict[str, Any]) -> str | None:
+        kind = data.get("type")
+        if kind == "content_block_delta":
+            delta = data.get("delta") or {}
+            if delta.get("type") == "text_delta":
+                return delta.get("text")
+        elif kind == "message_start":
+            usage = (data.get("message") or {}).get("usage")
+            if isinstance(usage, dict):
+                self.usage.update(usage)
+        elif kind == "message_delta":
+            usage = data.get("usage")
+            if isinstance(usage, dict):
+                # Counts here are cumulative, so they replace the message_start values.
+                self.usage.update({k: v for k, v in usage.items() if v is not None})
+            self.stop_reason = (data.get("delta") or {}).get("stop_reason") or self.stop_reason
+        elif kind == "error":
+            self.close()
+            raise RuntimeError(f"Anthropic stream failed: {json.dumps(data.get('error'))}")
+        return None
+
+    def usage_payload(self) -> dict[str, Any]:
+        return {"usage": dict(self.usage)}
+
+    def close(self) -> None:
+        self._response.close()
+
+    def __enter__(self) -> AnthropicMessageStream:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+def stream_anthropic_messages(
+    api_key: str,
+    model: str,
+    system: str | None,
+    messages: list[dict[str, Any]],
+    temperature: float | None,
+    max_tokens: int,
+    *,
+    timeout: float | None = None,
+    transport: HTTPTransport | None = None,
+    base_url: str | None = None,
+) -> AnthropicMessageStream:
+    """Streaming call_anthropic_messages; returns once response headers arrive."""
+    url, body, headers = _messages_request(
+        api_key, model, system, messages, temperature, max_tokens, base_url, stream=True
+    )
+    headers["Accept"] = "text/event-stream"
+    try:
+        resp = (transport or get_default_transport()).open("POST", url, body=body, headers=headers, timeout=timeout)
+        if not resp.ok:
+            body = resp.read()
+            raise ProviderHTTPError(
+                f"Anthropic request failed: {body.decode('utf-8', 'replace')}",
+                status=resp.status,
+                headers=resp.headers,
+                body=body,
+            )
+    except (OSError, http.client.HTTPException) as exc:
+        raise ProviderConnectionError(f"Anthropic request failed: {exc}") from exc
+    return AnthropicMessageStream(resp)
+
+
+def _batch_json(
+    api_key: str, method: str, url: str, body: bytes | None, timeout: float | None, transport: HTTPTransport | None
+) -> dict[str, Any]:
+    try:
+        resp = (transport or get_default_transport()).request(
+            method, url, body=body, headers=_api_headers(api_key), timeout=timeout
+        )
+    except (OSError, http.client.HTTPException) as exc:
+        raise ProviderConnectionError(f"Anthropic request failed: {exc}") from exc
+    return _messages_response(resp, False)
+
+
+def submit_anthropic_batch(
+    api_key: str,
+    requests: Iterable[BatchRequest],
+    *,
+    timeout: float | None = None,
+    transport: HTTPTransport | None = None,
+    base_url: str | None = None,
+) -> dict[str, Any]:
+    """Create a Message Batch; each request's params is a Messages body. Returns the batch object."""
+    items = check_batch_requests(requests, max_requests=ANTHROPIC_BATCH_MAX_REQUESTS)
+    payload = {"requests": [{"custom_id": item.custom_id, "params": item.params} for item in items]}
+    url = f"{_base_url(base_url)}/v1/messages/batches"
+    return _batch_json(api_key, "POST", url, json.dumps(payload).encode("utf-8"), timeout, transport)
+
+
+def wait_anthropic_batch(
+    api_key: str,
+    batch_id: str,
+    *,
+    poll_interval: float = 30.0,
+    max_wait: float | None = None,
+    sleep: Callable[[float], Any] = time.sleep,
+    timeout: float | None = None,
+    transport: HTTPTransport | None = None,
+    base_url: str | None = None,
+) -> dict[str, Any]:
+    """Poll a Message Batch until processing has ended (TimeoutError after max_wait seconds)."""
+    url = f"{_base_url(base_url)}/v1/messages/batches/{batch_id}"
+    return wait_for_batch(
+        lambda: _batch_json(api_key, "GET", url, None, timeout, transport),
+        lambda batch: batch.get("processing_status") == "ended",
+        poll_interval=poll_interval,
+        max_wait=max_wait,
+        sleep=sleep,
+    )
+
+
+def iter_anthropic_batch_results(
+    api_key: str,
+    batch: dict[str, Any],
+    *,
+    timeout: float | None = None,
+    transport: HTTPTransport | None = None,
+) -> Iterator[BatchResult]:
+    """Stream the JSONL results of an ended batch, one BatchResult per request, without buffering the file."""
+    url = batch.get("results_url")
+    if not url:
+        raise RuntimeError(f"Anthropic batch {batch.get('id')} has no results yet")
+    try:
+        resp = (transport or get_default_transport()).open("GET", url, headers=_api_headers(api_key), timeout=timeout)
+        if not resp.ok:
+            body = resp.read()
+            raise ProviderHTTPError(
+                f"Anthropic request failed: {body.decode('utf-8', 'replace')}",
+                status=resp.status,
+                headers=resp.headers,
+                body=body,
+            )
+        for line in resp.iter_lines():
+            if not line.strip():
+                continue
+            record = loads(line)
+            result = record.get("result") or {}
+            if result.get("type") == "succeeded":
+                yield BatchResult(record.get("custom_id"), body=result.get("message"))
+            else:
+                # errored / canceled / expired
+                yield BatchResult(record.get("custom_id"), error=result)
+    except (OSError, http.client.HTTPException) as exc:
+        raise ProviderConnectionError(f"Anthropic request failed: {exc}") from exc
+
+
+def run_anthropic_batch(
+    api_key: str,
+    requests: Iterable[BatchRequest],
+    *,
+    poll_interval: float = 30.0,
+    max_wait: float | None = None,
+    sleep: Callable[[float], Any] = time.sleep,
+    timeout: float | None = None,
+    transport: HTTPTransport | None = None,
+    base_url: str | None = None,
+) -> Iterator[BatchResult]:
+    """
+    Submit, wait and stream results. Batch usage is billed at the batch rate: settle each
+    result with normalize_anthropic_usage(result.body) and batch_api=True.
+    """
+    batch = submit_anthropic_batch(api_key, requests, timeout=timeout, transport=transport, base_url=base_url)
+    batch = wait_anthropic_batch(
+        api_key,
+        batch["id"],
+        poll_interval=poll_interval,
+        max_wait=max_wait,
+        sleep=sleep,
+        timeout=timeout,
+        transport=transport,
+        base_url=base_url,
+    )
+    return iter_anthropic_batch_results(api_key, batch, timeout=timeout, transport=transport)
+
+
 def extract_anthropic_completion(payload: dict[str, Any]) -> str | None:
     content = payload.get("content")
     if not isinstance(content, list) or not content:
@@ -76,3 +354,24 @@ def extract_anthropic_usage(payload: dict[str, Any]) -> tuple[int | None, int |
         return None, None
     return usage.get("input_tokens"), usage.get("output_tokens")
 
+
+def normalize_anthropic_usage(payload: dict[str, Any]) -> NormalizedUsage | None:
+    """
+    Messages usage (a response or AnthropicMessageStream.usage_payload()). Anthropic reports
+    input_tokens net of cache writes and reads; here they are added back so input_tokens is
+    the whole prompt. Server-side web searches are counted as "web_search_call" tool calls.
+    """
+    usage = payload.get("usage")
+    if not isinstance(usage, dict):
+        return None
+    cache_write = coerce_count(usage.get("cache_creation_input_tokens"))
+    cache_read = coerce_count(usage.get("cache_read_input_tokens"))
+    server_tools = usage.get("server_tool_use")
+    searches = coerce_count(server_tools.get("web_search_requests")) if isinstance(server_tools, dict) else 0
+    return NormalizedUsage(
+        input_tokens=coerce_count(usage.get("input_tokens")) + cache_write + cache_read,
+        output_tokens=coerce_count(usage.get("output_tokens")),
+        cache_write_input_tokens=cache_write,
+        cache_read_input_tokens=cache_read,
+        tool_calls={"web_search_call": searches} if searches else {},
+    )
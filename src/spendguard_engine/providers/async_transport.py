@@ -0,0 +1,303 @@
+from __future__ import annotations
+
+import asyncio
+import http.client
+import re
+import ssl
+import time
+import weakref
+from collections import deque
+from typing import Callable, Mapping
+from urllib.parse import urlsplit
+
+from spendguard_engine.providers.transport import HTTPResponse, HostKey, default_timeout
+
+_MAX_LINE = 65_536
+_MAX_HEADERS = 100
+_STALE_ERRORS = (ConnectionResetError, BrokenPipeError, ConnectionAbortedError)
+# Requests that may be re-sent after the server could already have received them.
+_IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE", "TRACE"})
+# Methods and header names are RFC 9110 tokens; header values may not contain CR, LF or NUL.
+_TOKEN = re.compile(r"[!#$%&'*+\-.^_`|~0-9A-Za-z]+")
+_ILLEGAL_VALUE = re.compile(r"[\r\n\0]")
+
+
+class _Connection:
+    __slots__ = ("reader", "writer")
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.reader = reader
+        self.writer = writer
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+class _StaleConnection(Exception):
+    """A reused keep-alive connection was closed by the server and the request is safe to re-send."""
+
+
+class _HostPool:
+    __slots__ = ("idle", "active", "cond")
+
+    def __init__(self) -> None:
+        self.idle: deque[tuple[_Connection, float]] = deque()
+        self.active = 0
+        self.cond = asyncio.Condition()
+
+
+async def _read_line(reader: asyncio.StreamReader) -> bytes:
+    try:
+        return await reader.readuntil(b"\n")
+    except (asyncio.LimitOverrunError, ValueError):
+        # The stream is opened with limit=_MAX_LINE.
+        raise http.client.LineTooLong("response line") from None
+
+
+async def _read_chunked(reader: asyncio.StreamReader) -> bytes:
+    parts = []
+    while True:
+        size_line = await _read_line(reader)
+        try:
+            size = int(size_line.split(b";", 1)[0].strip(), 16)
+        except ValueError:
+            raise http.client.HTTPException(f"invalid chunk size {size_line!r}") from None
+        if size == 0:
+            # Trailers, then the terminating blank line.
+            while (await _read_line(reader)) not in (b"\r\n", b"\n"):
+                pass
+            return b"".join(parts)
+        parts.append(await reader.readexactly(size))
+        await reader.readexactly(2)
+
+
+class AsyncHTTPTransport:
+    """
+    asyncio counterpart of HTTPTransport: keep-alive HTTP/1.1 over asyncio streams with
+    per-host in-flight limits, idle eviction and one retry when a reused connection turns
+    out to be closed while sending (or, for idempotent methods only, before any response
+    byte arrived). Responses may use Content-Length, chunked encoding or close-delimited
+    bodies.
+
+    Cancelling a request closes its connection (its state is unknown) and frees the slot.
+    A transport belongs to the event loop it is first used on.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_connections_per_host: int = 100,
+        timeout: float | None = None,
+        idle_timeout: float = 30.0,
+        pool_timeout: float | None = None,
+        ssl_context: ssl.SSLContext | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if max_connections_per_host <= 0:
+            raise ValueError("max_connections_per_host must be positive")
+        self.max_connections_per_host = int(max_connections_per_host)
+        self.timeout = timeout
+        self.idle_timeout = float(idle_timeout)
+        self.pool_timeout = pool_timeout
+        self._ssl_context = ssl_context
+        self._clock = clock
+        self._pools: dict[HostKey, _HostPool] = {}
+        self.connections_opened = 0
+
+    async def _acquire(self, pool: _HostPool) -> _Connection | None:
+        async with pool.cond:
+            if pool.active >= self.max_connections_per_host:
+                try:
+                    await asyncio.wait_for(
+                        pool.cond.wait_for(lambda: pool.active < self.max_connections_per_host), self.pool_timeout
+                    )
+                except asyncio.TimeoutError:
+                    raise TimeoutError("timed out waiting for a pooled HTTP connection") from None
+            pool.active += 1
+            conn = None
+            stale = []
+            now = self._clock()
+            while pool.idle:
+                candidate, returned_at = pool.idle.pop()
+                if now - returned_at <= self.idle_timeout and not candidate.reader.at_eof():
+                    conn = candidate
+                    break
+                stale.append(candidate)
+            while pool.idle and now - pool.idle[0][1] > self.idle_timeout:
+                stale.append(pool.idle.popleft()[0])
+        for old in stale:
+            old.close()
+        return conn
+
+    async def _release(self, pool: _HostPool, conn: _Connection | None) -> None:
+        async with pool.cond:
+            pool.active -= 1
+            if conn is not None:
+                pool.idle.append((conn, self._clock()))
+            pool.cond.notify()
+
+    async def _connect(self, key: HostKey) -> _Connection:
+        scheme, host, port = key
+        context = None
+        if scheme == "https":
+            if self._ssl_context is None:
+                self._ssl_context = ssl.create_default_context()
+            context = self._ssl_context
+        reader, writer = await asyncio.open_connection(host, port, ssl=context, limit=_MAX_LINE)
+        self.connections_opened += 1
+        return _Connection(reader, writer)
+
+    async def _exchange(
+        self, conn: _Connection, reused: bool, head: bytes, body: bytes | None, method: str
+    ) -> tuple[HTTPResponse, bool]:
+        try:
+            conn.writer.write(head)
+            if body:
+                conn.writer.write(body)
+            await conn.writer.drain()
+        except _STALE_ERRORS as exc:
+            if reused:
+                raise _StaleConnection from exc
+            raise
+        try:
+            status_line = await _read_line(conn.reader)
+        except (asyncio.IncompleteReadError, *_STALE_ERRORS) as exc:
+            # The request was sent and the server may have acted on it (and billed it).
+            nothing_read = not isinstance(exc, asyncio.IncompleteReadError) or not exc.partial
+            if reused and nothing_read and method.upper() in _IDEMPOTENT_METHODS:
+                raise _StaleConnection from exc
+            if isinstance(exc, asyncio.IncompleteReadError):
+                raise ConnectionError("connection closed before the response") from None
+            raise
+
+        try:
+            version, status_text = status_line.decode("latin-1").split(" ", 1)
+            status = int(status_text.split(" ", 1)[0])
+        except ValueError:
+            raise http.client.BadStatusLine(status_line.decode("latin-1", "replace")) from None
+
+        headers: dict[str, str] = {}
+        try:
+            for _ in range(_MAX_HEADERS + 1):
+                line = await _read_line(conn.reader)
+                if line in (b"\r\n", b"\n"):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            else:
+                raise http.client.HTTPException("too many response headers")
+
+            connection = headers.get("connection", "").lower()
+            keep_alive = "close" not in connection and (version != "HTTP/1.0" or "keep-alive" in connection)
+            if method == "HEAD" or status in (204, 304) or 100 <= status < 200:
+                data = b""
+            elif "chunked" in headers.get("transfer-encoding", "").lower():
+                data = await _read_chunked(conn.reader)
+            elif "content-length" in headers:
+                data = await conn.reader.readexactly(int(headers["content-length"]))
+            else:
+                data = await conn.reader.read()
+                keep_alive = False
+        except asyncio.IncompleteReadError:
+            raise ConnectionError("connection closed mid-response") from None
+        return HTTPResponse(status=status, body=data, headers=headers), keep_alive
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        *,
+        body: bytes | None = None,
+        headers: Mapping[str, str] | None = None,
+        timeout: float | None = None,
+    ) -> HTTPResponse:
+        """Send a request and read the full response. Network failures raise OSError/HTTPException."""
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        if scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError(f"unsupported URL: {url!r}")
+        default_port = 443 if scheme == "https" else 80
+        key = (scheme, parts.hostname, parts.port or default_port)
+        path = parts.path or "/"
+        if parts.query:
+            path = f"{path}?{parts.query}"
+        if timeout is None:
+            timeout = self.timeout if self.timeout is not None else default_timeout()
+
+        host = parts.hostname if not parts.port or parts.port == default_port else f"{parts.hostname}:{parts.port}"
+        if not _TOKEN.fullmatch(method):
+            raise ValueError(f"invalid HTTP method: {method!r}")
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {host}", f"Content-Length: {len(body or b'')}"]
+        for name, value in (headers or {}).items():
+            # Like http.client: refuse anything that could split the request head.
+            if not _TOKEN.fullmatch(name):
+                raise ValueError(f"invalid header name: {name!r}")
+            if _ILLEGAL_VALUE.search(value):
+                raise ValueError(f"invalid header value for {name!r}")
+            lines.append(f"{name}: {value}")
+        head = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+        pool = self._pools.get(key)
+        if pool is None:
+            pool = self._pools[key] = _HostPool()
+        conn = await self._acquire(pool)
+        keep: _Connection | None = None
+        try:
+            while True:
+                reused = conn is not None
+                try:
+                    if conn is None:
+                        conn = await asyncio.wait_for(self._connect(key), timeout)
+                    response, keep_alive = await asyncio.wait_for(
+                        self._exchange(conn, reused, head, body, method), timeout
+                    )
+                except _StaleConnection:
+                    conn.close()
+                    conn = None
+                    continue
+                except asyncio.TimeoutError:
+                    raise TimeoutError(f"{method} {url} timed out after {timeout}s") from None
+                if keep_alive:
+                    keep = conn
+                return response
+        finally:
+            if conn is not None and keep is None:
+                conn.close()
+            # Shielded so a cancellation arriving here cannot leak the slot.
+            await asyncio.shield(self._release(pool, keep))
+
+    def idle_connections(self) -> int:
+        return sum(len(pool.idle) for pool in self._pools.values())
+
+    def evict_idle(self, *, max_idle: float | None = None) -> int:
+        """Close idle connections older than `max_idle` (default idle_timeout); returns how many."""
+        limit = self.idle_timeout if max_idle is None else max_idle
+        now = self._clock()
+        evicted = 0
+        for pool in self._pools.values():
+            keep: deque[tuple[_Connection, float]] = deque()
+            for conn, returned_at in pool.idle:
+                if now - returned_at > limit:
+                    conn.close()
+                    evicted += 1
+                else:
+                    keep.append((conn, returned_at))
+            pool.idle = keep
+        return evicted
+
+    async def aclose(self) -> None:
+        self.evict_idle(max_idle=-1.0)
+
+
+_default_transports: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncHTTPTransport] = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_default_async_transport() -> AsyncHTTPTransport:
+    """The shared pool for the running event loop (one per loop)."""
+    loop = asyncio.get_running_loop()
+    transport = _default_transports.get(loop)
+    if transport is None:
+        transport = _default_transports[loop] = AsyncHTTPTransport()
+    return transport
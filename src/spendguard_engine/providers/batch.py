@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class BatchRequest:
+    # Caller-chosen id, unique within a batch; results come back keyed by it, in any order.
+    custom_id: str
+    # Request body as for the synchronous endpoint (Responses / Chat Completions / Messages).
+    params: dict[str, Any]
+
+
+@dataclass(frozen=True)
+class BatchResult:
+    custom_id: str
+    # Provider response body (Responses/Chat object, Anthropic message) when the request succeeded.
+    body: dict[str, Any] | None = None
+    # Provider error object (or result record) when it did not.
+    error: Any = None
+
+    @property
+    def ok(self) -> bool:
+        return self.body is not None
+
+
+def check_batch_requests(requests: Iterable[BatchRequest], *, max_requests: int) -> list[BatchRequest]:
+    items = list(requests)
+    if not items:
+        raise ValueError("batch has no requests")
+    if len(items) > max_requests:
+        raise ValueError(f"batch has {len(items)} requests, the provider limit is {max_requests}")
+    seen: set[str] = set()
+    for item in items:
+        if item.custom_id in seen:
+            raise ValueError(f"duplicate batch custom_id {item.custom_id!r}")
+        seen.add(item.custom_id)
+    return items
+
+
+def wait_for_batch(
+    fetch: Callable[[], T],
+    done: Callable[[T], bool],
+    *,
+    poll_interval: float,
+    max_wait: float | None,
+    sleep: Callable[[float], Any] = time.sleep,
+    clock: Callable[[], float] = time.monotonic,
+) -> T:
+    """Call `fetch` every poll_interval seconds until `done` accepts its result; TimeoutError after max_wait."""
+    deadline = None if max_wait is None else clock() + max_wait
+    while True:
+        batch = fetch()
+        if done(batch):
+            return batch
+        if deadline is not None and clock() + poll_interval > deadline:
+            raise TimeoutError(f"batch not finished after {max_wait}s")
+        sleep(poll_interval)
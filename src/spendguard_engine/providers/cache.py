@@ -0,0 +1,296 @@
+from __future__ import annotations
+
+import hashlib
+import inspect
+import json
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Mapping
+
+from spendguard_engine.providers.decoding import loads
+
+if TYPE_CHECKING:
+    import asyncio
+
+# Adapter arguments that do not change the response (credentials, connection plumbing).
+# Credentials are keyed separately, as a hash, unless the cache is shared across keys.
+_UNKEYED_ARGUMENTS = frozenset({"api_key", "client", "transport", "timeout"})
+
+
+def request_fingerprint(provider: str, model: str, payload: Any, *, namespace: str = "") -> str:
+    """
+    SHA-256 of a canonical JSON encoding (sorted keys, no whitespace) of the request, so
+    dict key order and formatting do not matter. payload must be JSON-serializable.
+    namespace separates tenants that must never share responses.
+    """
+    canonical = json.dumps(
+        [namespace, provider, model, payload], sort_keys=True, separators=(",", ":"), ensure_ascii=False
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _api_key_id(arguments: Mapping[str, Any]) -> str:
+    # Hashed so fingerprints (and anything logging them) never carry credentials.
+    api_key = arguments.get("api_key")
+    if api_key is None:
+        api_key = getattr(arguments.get("client"), "api_key", None)
+    return hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:16]
+
+
+def _deterministic(arguments: Mapping[str, Any]) -> bool:
+    # Only temperature-0, non-streamed requests are cached: anything else is expected to vary.
+    payload = arguments.get("payload")
+    payload = payload if isinstance(payload, Mapping) else {}
+    if arguments.get("stream") or payload.get("stream"):
+        return False
+    temperature = arguments.get("temperature", payload.get("temperature"))
+    return temperature is not None and float(temperature) == 0.0
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    value: Any
+    # True when no provider call was made for this caller: a cache hit, or a request
+    # coalesced onto an identical one already in flight. Bill with response_cache_hit=hit.
+    hit: bool
+    coalesced: bool = False
+    # None when the request was not cacheable (non-zero temperature, streaming).
+    fingerprint: str | None = None
+
+
+class _Entry:
+    __slots__ = ("data", "encoded", "size", "expires_at")
+
+    def __init__(self, data: Any, encoded: bool, size: int, expires_at: float | None) -> None:
+        self.data = data
+        self.encoded = encoded
+        self.size = size
+        self.expires_at = expires_at
+
+
+class _Flight:
+    __slots__ = ("done", "entry", "error")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.entry: _Entry | None = None
+        self.error: BaseException | None = None
+
+
+class ResponseCache:
+    """
+    Opt-in LRU + TTL cache of provider responses for deterministic (temperature 0) calls,
+    bounded by the approximate size of the stored responses in bytes.
+
+    Concurrent identical requests are coalesced: one caller (thread or task) calls the
+    provider and the others wait for its result; failures are shared but never cached.
+    JSON responses (the Anthropic/Gemini dicts) are stored serialized, so every hit gets
+    its own copy; other values (OpenAI SDK objects) are shared and must not be mutated.
+
+    Entries are keyed per API key (hashed), so callers with different credentials (and
+    so possibly different accounts or tenants) never see each other's responses; pass
+    share_across_keys=True to share them, e.g. when namespace already separates tenants.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl: float | None = 300.0,
+        namespace: str = "",
+        share_across_keys: bool = False,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if max_bytes <= 0:
+            raise ValueError("max_bytes must be positive")
+        self.max_bytes = int(max_bytes)
+        self.ttl = ttl
+        self.namespace = namespace
+        self.share_across_keys = share_across_keys
+        self._clock = clock
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._flights: dict[str, _Flight] = {}
+        self._async_flights: dict[tuple[int, str], asyncio.Future[_Entry | None]] = {}
+        self._lock = threading.Lock()
+        self.bytes_used = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def fingerprint(self, adapter: Callable[..., Any], *args: Any, **kwargs: Any) -> str | None:
+        """Fingerprint of an adapter call, or None when the call is not deterministic."""
+        arguments = inspect.signature(adapter).bind(*args, **kwargs).arguments
+        if not _deterministic(arguments):
+            return None
+        provider = adapter.__module__.rsplit(".", 1)[-1].removesuffix("_provider")
+        payload = {k: v for k, v in arguments.items() if k not in _UNKEYED_ARGUMENTS}
+        model = payload.pop("model", None) or (payload.get("payload") or {}).get("model", "")
+        if payload.get("temperature") is not None:
+            payload["temperature"] = float(payload["temperature"])  # 0 and 0.0 are the same request
+        # The adapter name keeps e.g. chat and Responses calls apart; sync and async variants share entries.
+        name = adapter.__name__.removeprefix("a") if adapter.__name__.startswith("acall_") else adapter.__name__
+        key_id = "" if self.share_across_keys else _api_key_id(arguments)
+        return request_fingerprint(provider, model, [name, key_id, payload], namespace=self.namespace)
+
+    def _get(self, key: str) -> _Entry | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at is not None and entry.expires_at <= self._clock():
+            self._drop(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _drop(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        self.bytes_used -= entry.size
+
+    def _encode(self, value: Any) -> _Entry | None:
+        if isinstance(value, (dict, list)):
+            data = json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+            entry = _Entry(data, True, len(data), None)
+        else:
+            dump = getattr(value, "model_dump_json", None)
+            entry = _Entry(value, False, len(dump()) if callable(dump) else sys.getsizeof(value), None)
+        if entry.size > self.max_bytes:
+            return None
+        if self.ttl is not None:
+            entry.expires_at = self._clock() + self.ttl
+        return entry
+
+    @staticmethod
+    def _decode(entry: _Entry) -> Any:
+        return loads(entry.data) if entry.encoded else entry.data
+
+    def _put(self, key: str, entry: _Entry) -> None:
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = entry
+        self.bytes_used += entry.size
+        while self.bytes_used > self.max_bytes:
+            self._drop(next(iter(self._entries)))
+            self.evictions += 1
+
+    def get_or_call(self, key: str, fn: Callable[[], Any]) -> CachedResponse:
+        with self._lock:
+            entry = self._get(key)
+            if entry is not None:
+                self.hits += 1
+            else:
+                flight = self._flights.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self._flights[key] = _Flight()
+                    self.misses += 1
+                else:
+                    self.coalesced += 1
+        if entry is not None:
+            return CachedResponse(self._decode(entry), True, fingerprint=key)
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            if flight.entry is not None:
+                return CachedResponse(self._decode(flight.entry), True, coalesced=True, fingerprint=key)
+            # Too large to share: make our own call.
+            return CachedResponse(fn(), False, fingerprint=key)
+        try:
+            value = fn()
+            flight.entry = self._encode(value)
+        except BaseException as exc:
+            flight.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+                if flight.entry is not None:
+                    self._put(key, flight.entry)
+            flight.done.set()
+        return CachedResponse(value, False, fingerprint=key)
+
+    async def aget_or_call(self, key: str, fn: Callable[[], Awaitable[Any]]) -> CachedResponse:
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        flight_key = (id(loop), key)
+        while True:
+            with self._lock:
+                entry = self._get(key)
+                if entry is not None:
+                    self.hits += 1
+                    return CachedResponse(self._decode(entry), True, fingerprint=key)
+                future = self._async_flights.get(flight_key)
+                if future is None:
+                    future = self._async_flights[flight_key] = loop.create_future()
+                    # Nobody may be waiting; keep failures from being reported as unretrieved.
+                    future.add_done_callback(lambda f: f.cancelled() or f.exception())
+                    self.misses += 1
+                    break
+                self.coalesced += 1
+            try:
+                shared = await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if future.cancelled():
+                    # The leading task was cancelled; retry (one of the waiters becomes the leader).
+                    continue
+                raise
+            if shared is not None:
+                return CachedResponse(self._decode(shared), True, coalesced=True, fingerprint=key)
+            return CachedResponse(await fn(), False, fingerprint=key)
+
+        entry = None
+        try:
+            value = await fn()
+            entry = self._encode(value)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            future.set_result(entry)
+        finally:
+            with self._lock:
+                del self._async_flights[flight_key]
+                if entry is not None:
+                    self._put(key, entry)
+        return CachedResponse(value, False, fingerprint=key)
+
+    def call(self, adapter: Callable[..., Any], *args: Any, **kwargs: Any) -> CachedResponse:
+        """
+        Call a call_* adapter through the cache, e.g.
+        cache.call(call_anthropic_messages, api_key, model, None, messages, 0, 256).
+        Non-deterministic calls go straight to the provider and are not cached.
+        """
+        key = self.fingerprint(adapter, *args, **kwargs)
+        if key is None:
+            return CachedResponse(adapter(*args, **kwargs), False)
+        return self.get_or_call(key, lambda: adapter(*args, **kwargs))
+
+    async def acall(self, adapter: Callable[..., Awaitable[Any]], *args: Any, **kwargs: Any) -> CachedResponse:
+        """asyncio version of call for the acall_* adapters."""
+        key = self.fingerprint(adapter, *args, **kwargs)
+        if key is None:
+            return CachedResponse(await adapter(*args, **kwargs), False)
+        return await self.aget_or_call(key, lambda: adapter(*args, **kwargs))
+
+    def invalidate(self, key: str) -> bool:
+        with self._lock:
+            if key not in self._entries:
+                return False
+            self._drop(key)
+            return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.bytes_used = 0
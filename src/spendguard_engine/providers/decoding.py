@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import json
+import re
+from typing import Any, Callable
+
+try:  # Optional fast backend; same results as the stdlib for provider payloads.
+    import orjson as _orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    _orjson = None
+
+JSON_BACKEND = "orjson" if _orjson is not None else "json"
+
+_DECODER = json.JSONDecoder()
+_WS = re.compile(r"[ \t\n\r]*")
+_MISSING = object()
+
+
+def _stdlib_loads(data: bytes | bytearray | memoryview | str) -> Any:
+    if isinstance(data, memoryview):
+        data = data.tobytes()
+    return json.loads(data)
+
+
+def _orjson_loads(data: bytes | bytearray | memoryview | str) -> Any:
+    return _orjson.loads(data)
+
+
+# Straight from the response buffer: no intermediate str copy of the body.
+loads: Callable[[bytes | bytearray | memoryview | str], Any] = _orjson_loads if _orjson is not None else _stdlib_loads
+
+
+def _ws(text: str, i: int) -> int:
+    return _WS.match(text, i).end()  # type: ignore[union-attr]
+
+
+def _escaped(data: bytes, pos: int) -> bool:
+    backslashes = 0
+    while pos - backslashes - 1 >= 0 and data[pos - backslashes - 1] == 0x5C:
+        backslashes += 1
+    return backslashes % 2 == 1
+
+
+def _root_member(tail: str) -> Any:
+    """Value of a `": value` tail, provided everything after it only closes the root object."""
+    try:
+        i = _ws(tail, 0)
+        if tail[i : i + 1] != ":":
+            return _MISSING
+        value, i = _DECODER.raw_decode(tail, _ws(tail, i + 1))
+        while True:
+            i = _ws(tail, i)
+            c = tail[i : i + 1]
+            if c == "}":
+                return value if _ws(tail, i + 1) == len(tail) else _MISSING
+            if c != ",":
+                return _MISSING
+            i = _ws(tail, i + 1)
+            if tail[i : i + 1] != '"':
+                return _MISSING
+            _, i = _DECODER.raw_decode(tail, i)
+            i = _ws(tail, i)
+            if tail[i : i + 1] != ":":
+                return _MISSING
+            _, i = _DECODER.raw_decode(tail, _ws(tail, i + 1))
+    except ValueError:
+        return _MISSING
+
+
+def loads_member(data: bytes | bytearray | memoryview, key: str) -> Any:
+    """
+    Top-level `key` of a JSON object document, decoding only the bytes after its last
+    occurrence when possible (usage blocks sit at the end of Anthropic, Gemini and OpenAI
+    responses), so the completion tree before it is never materialized. Falls back to a
+    full parse whenever the shortcut cannot prove the key is a root member. The skipped
+    prefix is not validated. Returns None when the key is absent.
+    """
+    if not isinstance(data, bytes):
+        data = bytes(data)
+    needle = b'"' + key.encode("utf-8") + b'"'
+    pos = data.rfind(needle)
+    if pos < 0:
+        # No key anywhere (escaped or not): parse only to surface invalid JSON.
+        doc = loads(data)
+        return doc.get(key) if isinstance(doc, dict) else None
+    if not _escaped(data, pos):
+        try:
+            tail = data[pos + len(needle) :].decode("utf-8")
+        except UnicodeDecodeError:
+            tail = None
+        if tail is not None:
+            value = _root_member(tail)
+            if value is not _MISSING:
+                return value
+    doc = loads(data)
+    return doc.get(key) if isinstance(doc, dict) else None
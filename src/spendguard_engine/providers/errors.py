@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+from typing import Mapping
+
+
+class ProviderHTTPError(RuntimeError):
+    """A provider answered with a non-2xx status. The message keeps the '<Provider> request failed: <body>' form."""
+
+    def __init__(self, message: str, *, status: int, headers: Mapping[str, str] | None = None, body: bytes = b""):
+        super().__init__(message)
+        self.status = status
+        # Lower-cased header names.
+        self.headers = dict(headers or {})
+        self.body = body
+
+
+class ProviderConnectionError(RuntimeError):
+    """The request never produced a response (connect failure, reset, timeout)."""
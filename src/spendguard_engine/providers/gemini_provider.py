@@ -1,9 +1,23 @@
 from __future__ import annotations
 
+import http.client
 import json
-import urllib.error
-import urllib.request
-from typing import Any
+import os
+from typing import TYPE_CHECKING, Any
+
+from spendguard_engine.providers.decoding import loads, loads_member
+from spendguard_engine.providers.errors import ProviderConnectionError, ProviderHTTPError
+from spendguard_engine.providers.sse import iter_sse_events
+from spendguard_engine.providers.transport import (
+    HTTPResponse,
+    HTTPTransport,
+    StreamingHTTPResponse,
+    get_default_transport,
+)
+from spendguard_engine.usage import NormalizedUsage, coerce_count
+
+if TYPE_CHECKING:
+    from spendguard_engine.providers.async_transport import AsyncHTTPTransport
 
 
 def _normalize_model(model: str) -> str:
@@ -12,40 +26,202 @@ def _normalize_model(model: str) -> str:
     return f"models/{model}"
 
 
-def call_gemini_generate_content(
+def _base_url(base_url: str | None) -> str:
+    return (base_url or os.getenv("GEMINI_BASE_URL") or "https://generativelanguage.googleapis.com").rstrip("/")
+
+
+def _generate_request(
     api_key: str,
     model: str,
     prompt: str,
     temperature: float | None,
     max_tokens: int,
-) -> dict[str, Any]:
-    url = f"https://generativelanguage.googleapis.com/v1beta/{_normalize_model(model)}:generateContent"
+    base_url: str | None,
+    method: str = "generateContent",
+) -> tuple[str, bytes, dict[str, str]]:
+    url = f"{_base_url(base_url)}/v1beta/{_normalize_model(model)}:{method}"
     payload: dict[str, Any] = {
         "contents": [{"parts": [{"text": prompt}]}],
         "generationConfig": {"maxOutputTokens": max_tokens},
     }
     if temperature is not None:
         payload["generationConfig"]["temperature"] = temperature
-    request = urllib.request.Request(
-        url,
-        data=json.dumps(payload).encode("utf-8"),
-        headers={"Content-Type": "application/json", "x-goog-api-key": api_key},
-        method="POST",
-    )
-    try:
-        with urllib.request.urlopen(request, timeout=60) as response:
-            raw = response.read().decode("utf-8")
-    except urllib.error.HTTPError as exc:
-        detail = exc.read().decode("utf-8") if exc.fp else str(exc)
-        raise RuntimeError(f"Gemini request failed: {detail}") from exc
-    except urllib.error.URLError as exc:
-        raise RuntimeError(f"Gemini request failed: {exc.reason}") from exc
-    payload = json.loads(raw)
+    headers = {"Content-Type": "application/json", "x-goog-api-key": api_key}
+    return url, json.dumps(payload).encode("utf-8"), headers
+
+
+def _generate_response(response: HTTPResponse, usage_only: bool) -> dict[str, Any]:
+    if not response.ok:
+        raise ProviderHTTPError(
+            f"Gemini request failed: {response.text()}",
+            status=response.status,
+            headers=response.headers,
+            body=response.body,
+        )
+    if usage_only and b'"groundingMetadata"' not in response.body:
+        # Settlement-only callers: decode just the trailing usage block.
+        usage = loads_member(response.body, "usageMetadata")
+        return {"usageMetadata": usage if isinstance(usage, dict) else {}}
+    payload = loads(response.body)
     if not isinstance(payload, dict):
         raise RuntimeError("Gemini returned invalid JSON")
+    if usage_only:
+        # Grounded responses bill per web search query, which only the candidates carry.
+        usage = payload.get("usageMetadata")
+        candidates = payload.get("candidates")
+        return {
+            "usageMetadata": usage if isinstance(usage, dict) else {},
+            "candidates": [
+                {"groundingMetadata": candidate["groundingMetadata"]}
+                for candidate in (candidates if isinstance(candidates, list) else [])
+                if isinstance(candidate, dict) and "groundingMetadata" in candidate
+            ],
+        }
     return payload
 
 
+def call_gemini_generate_content(
+    api_key: str,
+    model: str,
+    prompt: str,
+    temperature: float | None,
+    max_tokens: int,
+    *,
+    timeout: float | None = None,
+    transport: HTTPTransport | None = None,
+    base_url: str | None = None,
+    usage_only: bool = False,
+) -> dict[str, Any]:
+    url, body, headers = _generate_request(api_key, model, prompt, temperature, max_tokens, base_url)
+    try:
+        response = (transport or get_default_transport()).request(
+            "POST", url, body=body, headers=headers, timeout=timeout
+        )
+    except (OSError, http.client.HTTPException) as exc:
+        raise ProviderConnectionError(f"Gemini request failed: {exc}") from exc
+    return _generate_response(response, usage_only)
+
+
+async def acall_gemini_generate_content(
+    api_key: str,
+    model: str,
+    prompt: str,
+    temperature: float | None,
+    max_tokens: int,
+    *,
+    timeout: float | None = None,
+    transport: AsyncHTTPTransport | None = None,
+    base_url: str | None = None,
+    usage_only: bool = False,
+) -> dict[str, Any]:
+    """asyncio version of call_gemini_generate_content over the loop's shared AsyncHTTPTransport."""
+    if transport is None:
+        from spendguard_engine.providers.async_transport import get_default_async_transport
+
+        transport = get_default_async_transport()
+    url, body, headers = _generate_request(api_key, model, prompt, temperature, max_tokens, base_url)
+    try:
+        response = await transport.request("POST", url, body=body, headers=headers, timeout=timeout)
+    except (OSError, http.client.HTTPException) as exc:
+        raise ProviderConnectionError(f"Gemini request failed: {exc}") from exc
+    return _generate_response(response, usage_only)
+
+
+class GeminiContentStream:
+    """
+    Iterator over the text deltas of a streamGenerateContent call. `usage` holds the
+    latest usageMetadata seen (the final chunk carries the totals) and `grounding` the
+    groundingMetadata per candidate index; usage_payload() can go straight to
+    extract_gemini_usage / normalize_gemini_usage for billing.
+    """
+
+    def __init__(self, response: StreamingHTTPResponse) -> None:
+        self._response = response
+        self._events = iter_sse_events(response.iter_lines())
+        self.usage: dict[str, Any] = {}
+        self.grounding: dict[int, dict[str, Any]] = {}
+        self.finish_reason: str | None = None
+        self.done = False
+
+    def __iter__(self) -> GeminiContentStream:
+        return self
+
+    def __next__(self) -> str:
+        for event in self._events:
+            text = self._handle(loads(event.data))
+            if text:
+                return text
+        self.done = True
+        raise StopIteration
+
+    def _handle(self, chunk: dict[str, Any]) -> str | None:
+        if "error" in chunk:
+            self.close()
+            raise RuntimeError(f"Gemini stream failed: {json.dumps(chunk['error'])}")
+        usage = chunk.get("usageMetadata")
+        if isinstance(usage, dict):
+            self.usage = usage
+        candidates = chunk.get("candidates")
+        if not isinstance(candidates, list) or not candidates or not isinstance(candidates[0], dict):
+            return None
+        for position, candidate in enumerate(candidates):
+            # Grounded calls bill per web search query, which only the candidates carry.
+            grounding = candidate.get("groundingMetadata") if isinstance(candidate, dict) else None
+            if isinstance(grounding, dict):
+                self.grounding[candidate.get("index", position)] = grounding
+        self.finish_reason = candidates[0].get("finishReason") or self.finish_reason
+        content = candidates[0].get("content")
+        parts = content.get("parts") if isinstance(content, dict) else None
+        if not isinstance(parts, list):
+            return None
+        return "".join(p["text"] for p in parts if isinstance(p, dict) and isinstance(p.get("text"), str))
+
+    def usage_payload(self) -> dict[str, Any]:
+        payload: dict[str, Any] = {"usageMetadata": dict(self.usage)}
+        if self.grounding:
+            payload["candidates"] = [{"groundingMetadata": self.grounding[i]} for i in sorted(self.grounding)]
+        return payload
+
+    def close(self) -> None:
+        self._response.close()
+
+    def __enter__(self) -> GeminiContentStream:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+def stream_gemini_generate_content(
+    api_key: str,
+    model: str,
+    prompt: str,
+    temperature: float | None,
+    max_tokens: int,
+    *,
+    timeout: float | None = None,
+    transport: HTTPTransport | None = None,
+    base_url: str | None = None,
+) -> GeminiContentStream:
+    """Streaming call_gemini_generate_content (SSE); returns once response headers arrive."""
+    url, body, headers = _generate_request(
+        api_key, model, prompt, temperature, max_tokens, base_url, method="streamGenerateContent?alt=sse"
+    )
+    try:
+        response = (transport or get_default_transport()).open("POST", url, body=body, headers=headers, timeout=timeout)
+        if not response.ok:
+            body = response.read()
+            raise ProviderHTTPError(
+                f"Gemini request failed: {body.decode('utf-8', 'replace')}",
+                status=response.status,
+                headers=response.headers,
+                body=body,
+            )
+    except (OSError, http.client.HTTPException) as exc:
+        raise ProviderConnectionError(f"Gemini request failed: {exc}") from exc
+    return GeminiContentStream(response)
+
+
 def extract_gemini_completion(payload: dict[str, Any]) -> str | None:
     candidates = payload.get("candidates")
     if not isinstance(candidates, list) or not candidates:
@@ -71,3 +247,29 @@ def extract_gemini_usage(payload: dict[str, Any]) -> tuple[int | None, int | Non
         return None, None
     return usage.get("promptTokenCount"), usage.get("candidatesTokenCount")
 
+
+def normalize_gemini_usage(payload: dict[str, Any]) -> NormalizedUsage | None:
+    """
+    generateContent usageMetadata plus grounding. Gemini reports thinking tokens apart from
+    candidatesTokenCount and tool-use prompt tokens apart from promptTokenCount; both are folded
+    back in. grounding_queries counts the web search queries of all candidates.
+    """
+    usage = payload.get("usageMetadata")
+    if not isinstance(usage, dict):
+        return None
+    thoughts = coerce_count(usage.get("thoughtsTokenCount"))
+    grounding_queries = 0
+    candidates = payload.get("candidates")
+    if isinstance(candidates, list):
+        for candidate in candidates:
+            grounding = candidate.get("groundingMetadata") if isinstance(candidate, dict) else None
+            queries = grounding.get("webSearchQueries") if isinstance(grounding, dict) else None
+            if isinstance(queries, list):
+                grounding_queries += len(queries)
+    return NormalizedUsage(
+        input_tokens=coerce_count(usage.get("promptTokenCount")) + coerce_count(usage.get("toolUsePromptTokenCount")),
+        output_tokens=coerce_count(usage.get("candidatesTokenCount")) + thoughts,
+        cached_input_tokens=coerce_count(usage.get("cachedContentTokenCount")),
+        reasoning_tokens=thoughts,
+        grounding_queries=grounding_queries,
+    )
@@ -1,9 +1,20 @@
 from __future__ import annotations
 
+import json
 import os
-from typing import Any
+import time
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator
 
-from openai import OpenAI
+from spendguard_engine.providers.batch import BatchRequest, BatchResult, check_batch_requests, wait_for_batch
+from spendguard_engine.usage import NormalizedUsage, coerce_count
+
+if TYPE_CHECKING:
+    # Annotation only; the SDK is imported by whoever constructs the client.
+    from openai import AsyncOpenAI, OpenAI
+
+# Batch API limits (the 200 MB file limit is left to the API to enforce).
+OPENAI_BATCH_MAX_REQUESTS = 50_000
+OPENAI_BATCH_TERMINAL_STATUSES = frozenset({"completed", "failed", "expired", "cancelled"})
 
 
 def clamp_openai_max_tokens(max_tokens: int) -> int:
@@ -51,6 +62,33 @@ def call_openai_responses(
     return client.responses.create(**body)
 
 
+async def acall_openai_chat(
+    client: AsyncOpenAI,
+    model: str,
+    messages: list[dict[str, Any]],
+    temperature: float | None,
+    max_tokens: int,
+    stream: bool,
+) -> Any:
+    return await client.chat.completions.create(
+        model=model,
+        messages=messages,
+        temperature=temperature,
+        max_tokens=clamp_openai_max_tokens(max_tokens),
+        stream=stream,
+    )
+
+
+async def acall_openai_responses(
+    client: AsyncOpenAI,
+    payload: dict[str, Any],
+    max_output_tokens: int,
+) -> Any:
+    body = dict(payload)
+    body["max_output_tokens"] = clamp_openai_max_output_tokens(max_output_tokens)
+    return await client.responses.create(**body)
+
+
 def extract_openai_usage(response: Any) -> tuple[int | None, int | None]:
     usage = getattr(response, "usage", None)
     if not usage:
@@ -58,3 +96,144 @@ def extract_openai_usage(response: Any) -> tuple[int | None, int | None]:
     if isinstance(usage, dict):
         return usage.get("prompt_tokens"), usage.get("completion_tokens")
     return getattr(usage, "prompt_tokens", None), getattr(usage, "completion_tokens", None)
+
+
+def encode_openai_batch_file(requests: Iterable[BatchRequest], *, endpoint: str = "/v1/responses") -> bytes:
+    """JSONL batch input file, with the same max-token clamps as the synchronous adapters."""
+    lines: list[bytes] = []
+    for item in check_batch_requests(requests, max_requests=OPENAI_BATCH_MAX_REQUESTS):
+        body = dict(item.params)
+        if body.get("max_output_tokens") is not None:
+            body["max_output_tokens"] = clamp_openai_max_output_tokens(body["max_output_tokens"])
+        if body.get("max_tokens") is not None:
+            body["max_tokens"] = clamp_openai_max_tokens(body["max_tokens"])
+        line = {"custom_id": item.custom_id, "method": "POST", "url": endpoint, "body": body}
+        lines.append(json.dumps(line, separators=(",", ":")).encode("utf-8"))
+    return b"\n".join(lines) + b"\n"
+
+
+def submit_openai_batch(
+    client: OpenAI,
+    requests: Iterable[BatchRequest],
+    *,
+    endpoint: str = "/v1/responses",
+    completion_window: str = "24h",
+    metadata: dict[str, str] | None = None,
+) -> Any:
+    """Upload the requests as a batch input file and create the batch. Returns the SDK Batch object."""
+    data = encode_openai_batch_file(requests, endpoint=endpoint)
+    uploaded = client.files.create(file=("batch.jsonl", data, "application/jsonl"), purpose="batch")
+    extra: dict[str, Any] = {"metadata": metadata} if metadata else {}
+    return client.batches.create(
+        input_file_id=uploaded.id, endpoint=endpoint, completion_window=completion_window, **extra
+    )
+
+
+def wait_openai_batch(
+    client: OpenAI,
+    batch_id: str,
+    *,
+    poll_interval: float = 30.0,
+    max_wait: float | None = None,
+    sleep: Callable[[float], Any] = time.sleep,
+) -> Any:
+    """Poll until the batch is completed, failed, expired or cancelled (TimeoutError after max_wait seconds)."""
+    return wait_for_batch(
+        lambda: client.batches.retrieve(batch_id),
+        lambda batch: batch.status in OPENAI_BATCH_TERMINAL_STATUSES,
+        poll_interval=poll_interval,
+        max_wait=max_wait,
+        sleep=sleep,
+    )
+
+
+def _batch_result(record: dict[str, Any]) -> BatchResult:
+    response = record.get("response") or {}
+    status = response.get("status_code") or 0
+    if record.get("error") is None and 200 <= status < 300:
+        return BatchResult(record.get("custom_id"), body=response.get("body"))
+    return BatchResult(record.get("custom_id"), error=record.get("error") or response.get("body") or response)
+
+
+def iter_openai_batch_results(client: OpenAI, batch: Any) -> Iterator[BatchResult]:
+    """
+    Stream the output file, then the error file, of a finished batch. Expired and cancelled
+    batches still yield whatever completed; a failed batch (rejected input) raises RuntimeError.
+    """
+    if batch.status == "failed":
+        raise RuntimeError(f"OpenAI batch {batch.id} failed: {batch.errors}")
+    for file_id in (batch.output_file_id, batch.error_file_id):
+        if not file_id:
+            continue
+        with client.files.with_streaming_response.content(file_id) as resp:
+            for line in resp.iter_lines():
+                if line.strip():
+                    yield _batch_result(json.loads(line))
+
+
+def run_openai_batch(
+    client: OpenAI,
+    requests: Iterable[BatchRequest],
+    *,
+    endpoint: str = "/v1/responses",
+    poll_interval: float = 30.0,
+    max_wait: float | None = None,
+    sleep: Callable[[float], Any] = time.sleep,
+) -> Iterator[BatchResult]:
+    """
+    Submit, wait and stream results. Batch usage is billed at the batch rate: settle each
+    result with normalize_openai_usage(result.body) and batch_api=True.
+    """
+    batch = submit_openai_batch(client, requests, endpoint=endpoint)
+    batch = wait_openai_batch(client, batch.id, poll_interval=poll_interval, max_wait=max_wait, sleep=sleep)
+    return iter_openai_batch_results(client, batch)
+
+
+def _field(obj: Any, name: str) -> Any:
+    # SDK objects expose attributes, raw JSON payloads are dicts.
+    if isinstance(obj, dict):
+        return obj.get(name)
+    return getattr(obj, name, None)
+
+
+def normalize_openai_usage(response: Any) -> NormalizedUsage | None:
+    """
+    Chat Completions or Responses usage (SDK object or raw dict), including cached prompt and
+    reasoning token details and tool calls counted by item type ("web_search_call", ...).
+    None when the response carries no usage.
+    """
+    usage = _field(response, "usage")
+    if not usage:
+        return None
+    tool_calls: dict[str, int] = {}
+    output = _field(response, "output")
+    if isinstance(output, list):
+        # Responses API: tool invocations are output items typed "<tool>_call".
+        for item in output:
+            kind = _field(item, "type")
+            if isinstance(kind, str) and kind.endswith("_call"):
+                tool_calls[kind] = tool_calls.get(kind, 0) + 1
+    choices = _field(response, "choices")
+    if isinstance(choices, list):
+        for choice in choices:
+            for call in _field(_field(choice, "message"), "tool_calls") or ():
+                kind = f"{_field(call, 'type') or 'function'}_call"
+                tool_calls[kind] = tool_calls.get(kind, 0) + 1
+
+    input_tokens = _field(usage, "input_tokens")
+    if input_tokens is not None:
+        input_details = _field(usage, "input_tokens_details")
+        output_tokens = _field(usage, "output_tokens")
+        output_details = _field(usage, "output_tokens_details")
+    else:
+        input_tokens = _field(usage, "prompt_tokens")
+        input_details = _field(usage, "prompt_tokens_details")
+        output_tokens = _field(usage, "completion_tokens")
+        output_details = _field(usage, "completion_tokens_details")
+    return NormalizedUsage(
+        input_tokens=coerce_count(input_tokens),
+        output_tokens=coerce_count(output_tokens),
+        cached_input_tokens=coerce_count(_field(input_details, "cached_tokens")) if input_details else 0,
+        reasoning_tokens=coerce_count(_field(output_details, "reasoning_tokens")) if output_details else 0,
+        tool_calls=tool_calls,
+    )
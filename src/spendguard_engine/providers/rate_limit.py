@@ -0,0 +1,390 @@
+from __future__ import annotations
+
+import hashlib
+import inspect
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Mapping
+
+from spendguard_engine.providers.retry import error_headers, retry_after_seconds
+from spendguard_engine.token_estimation import TokenEstimator
+
+_default_estimator = TokenEstimator()
+
+# (limit, remaining) header pairs per bucket, most specific first. Anthropic's
+# "tokens" headers report whichever of its input/output token limits is tighter.
+_REQUEST_HEADERS = (
+    ("x-ratelimit-limit-requests", "x-ratelimit-remaining-requests"),
+    ("anthropic-ratelimit-requests-limit", "anthropic-ratelimit-requests-remaining"),
+)
+_TOKEN_HEADERS = (
+    ("x-ratelimit-limit-tokens", "x-ratelimit-remaining-tokens"),
+    ("anthropic-ratelimit-tokens-limit", "anthropic-ratelimit-tokens-remaining"),
+    ("anthropic-ratelimit-input-tokens-limit", "anthropic-ratelimit-input-tokens-remaining"),
+)
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    # None means unknown: not limited until rate-limit headers report the real limit.
+    requests_per_minute: int | None = None
+    tokens_per_minute: int | None = None
+
+
+@dataclass(frozen=True)
+class RateReservation:
+    key: tuple[str, str, str]
+    tokens: int
+
+
+class _Bucket:
+    """Token bucket that refills `capacity` units per minute; the level may go negative (a queue of debts)."""
+
+    __slots__ = ("capacity", "level", "updated")
+
+    def __init__(self, capacity: int | None, now: float) -> None:
+        self.capacity = capacity
+        self.level = float(capacity or 0)
+        self.updated = now
+
+    def _refill(self, now: float) -> None:
+        if self.capacity:
+            self.level = min(float(self.capacity), self.level + (now - self.updated) * self.capacity / 60.0)
+        self.updated = now
+
+    def take(self, amount: int, now: float) -> float:
+        """Debit `amount` and return the seconds until the debit is covered."""
+        if not self.capacity:
+            return 0.0
+        self._refill(now)
+        self.level -= amount
+        return 0.0 if self.level >= 0 else -self.level * 60.0 / self.capacity
+
+    def give(self, amount: int, now: float) -> None:
+        if self.capacity:
+            self._refill(now)
+            self.level = min(float(self.capacity), self.level + amount)
+
+    def observe(self, limit: int | None, remaining: int | None, now: float) -> None:
+        if limit is not None and limit > 0 and limit != self.capacity:
+            self._refill(now)
+            if self.capacity is None:
+                self.level = float(limit)
+            else:
+                self.level += limit - self.capacity
+            self.capacity = limit
+        if remaining is not None and self.capacity:
+            # The server has not seen our requests still in flight, so never raise the level.
+            self._refill(now)
+            self.level = min(self.level, float(remaining))
+
+
+class _KeyState:
+    __slots__ = ("requests", "tokens", "paused_until")
+
+    def __init__(self, limit: RateLimit, now: float) -> None:
+        self.requests = _Bucket(limit.requests_per_minute, now)
+        self.tokens = _Bucket(limit.tokens_per_minute, now)
+        self.paused_until = 0.0
+
+
+def _header_int(headers: Mapping[str, str], name: str) -> int | None:
+    raw = headers.get(name)
+    if raw is None:
+        return None
+    try:
+        return int(float(raw))
+    except ValueError:
+        return None
+
+
+def _read_pair(headers: Mapping[str, str], pairs: tuple[tuple[str, str], ...]) -> tuple[int | None, int | None]:
+    for limit, remaining in pairs:
+        if limit in headers or remaining in headers:
+            return _header_int(headers, limit), _header_int(headers, remaining)
+    return None, None
+
+
+def _api_key_id(api_key: str | None) -> str:
+    # Keys are hashed so limiter state (and its reprs) never holds credentials.
+    return hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:16]
+
+
+def _request_shape(adapter: Callable[..., Any], arguments: Mapping[str, Any]) -> tuple[str, str, str | None, int]:
+    """(provider, model, api key, estimated input + output tokens) of an adapter call."""
+    provider = adapter.__module__.rsplit(".", 1)[-1].removesuffix("_provider")
+    payload = arguments.get("payload")
+    if provider == "openai":
+        # Reserve what the adapter will actually send, not the unclamped request.
+        from spendguard_engine.providers.openai_provider import (
+            clamp_openai_max_output_tokens,
+            clamp_openai_max_tokens,
+        )
+
+        arguments = dict(arguments)
+        if arguments.get("max_output_tokens") is not None:
+            arguments["max_output_tokens"] = clamp_openai_max_output_tokens(arguments["max_output_tokens"])
+        if arguments.get("max_tokens") is not None:
+            arguments["max_tokens"] = clamp_openai_max_tokens(arguments["max_tokens"])
+    if isinstance(payload, Mapping):
+        model = payload.get("model", "")
+        tokens = _default_estimator.responses(dict(payload)) + int(arguments.get("max_output_tokens") or 0)
+    elif "system" in arguments:
+        model = arguments.get("model", "")
+        tokens = _default_estimator.anthropic(arguments["system"], arguments.get("messages") or [])
+        tokens += int(arguments.get("max_tokens") or 0)
+    elif "prompt" in arguments:
+        model = arguments.get("model", "")
+        tokens = _default_estimator.messages([{"role": "user", "content": arguments["prompt"]}])
+        tokens += int(arguments.get("max_tokens") or 0)
+    else:
+        model = arguments.get("model", "")
+        tokens = _default_estimator.messages(arguments.get("messages") or []) + int(arguments.get("max_tokens") or 0)
+    api_key = arguments.get("api_key")
+    if api_key is None:
+        api_key = getattr(arguments.get("client"), "api_key", None)
+    return provider, str(model), api_key, tokens
+
+
+def _actual_tokens(adapter: Callable[..., Any], result: Any) -> int | None:
+    import importlib
+
+    module = importlib.import_module(adapter.__module__)
+    provider = adapter.__module__.rsplit(".", 1)[-1].removesuffix("_provider")
+    normalize = getattr(module, f"normalize_{provider}_usage", None)
+    usage = normalize(result) if normalize is not None else None
+    if usage is None:
+        return None
+    return usage.input_tokens + usage.output_tokens
+
+
+class _ObservingTransport:
+    def __init__(self, inner: Any, observe: Callable[[Mapping[str, str]], None]) -> None:
+        self._inner = inner
+        self._observe = observe
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._inner, name)
+
+    def request(self, *args: Any, **kwargs: Any) -> Any:
+        response = self._inner.request(*args, **kwargs)
+        self._observe(response.headers)
+        return response
+
+
+class _AsyncObservingTransport(_ObservingTransport):
+    async def request(self, *args: Any, **kwargs: Any) -> Any:
+        response = await self._inner.request(*args, **kwargs)
+        self._observe(response.headers)
+        return response
+
+
+class _ObservingClient:
+    """
+    OpenAI SDK client proxy whose chat.completions.create / responses.create go through
+    with_raw_response, so the rate-limit headers of successful responses are observed too.
+    """
+
+    _RESOURCES = frozenset({"chat", "completions", "responses"})
+
+    def __init__(self, inner: Any, observe: Callable[[Mapping[str, str]], None]) -> None:
+        self._inner = inner
+        self._observe = observe
+
+    def __getattr__(self, name: str) -> Any:
+        value = getattr(self._inner, name)
+        return type(self)(value, self._observe) if name in self._RESOURCES else value
+
+    def _raw(self) -> Any:
+        return getattr(self._inner, "with_raw_response", None)
+
+    def create(self, **kwargs: Any) -> Any:
+        raw_api = self._raw()
+        if raw_api is None:
+            return self._inner.create(**kwargs)
+        raw = raw_api.create(**kwargs)
+        self._observe(raw.headers)
+        return raw.parse()
+
+
+class _AsyncObservingClient(_ObservingClient):
+    async def create(self, **kwargs: Any) -> Any:
+        raw_api = self._raw()
+        if raw_api is None:
+            return await self._inner.create(**kwargs)
+        raw = await raw_api.create(**kwargs)
+        self._observe(raw.headers)
+        parsed = raw.parse()
+        return await parsed if inspect.isawaitable(parsed) else parsed
+
+
+class RateLimiter:
+    """
+    Client-side requests- and tokens-per-minute limiter, one pair of token buckets per
+    (provider, model, API key).
+
+    Each call reserves one request and its estimated input + max output tokens up front;
+    callers over the limit are queued by sleeping until their debit is covered, so waiters
+    are released in order instead of retrying in a burst. The reservation is reconciled
+    with the usage the provider reports afterwards. Limits start from `default` / `limits`
+    and follow the x-ratelimit-* / anthropic-ratelimit-* response headers (read through
+    the transport, or with_raw_response for OpenAI SDK clients), and an
+    exhausted limit or Retry-After pauses the key until its reset. Safe to share between
+    threads and event loops.
+    """
+
+    def __init__(
+        self,
+        default: RateLimit | None = None,
+        *,
+        limits: Mapping[tuple[str, str], RateLimit] | None = None,
+        max_keys: int = 10_000,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], Any] = time.sleep,
+    ) -> None:
+        if max_keys <= 0:
+            raise ValueError("max_keys must be positive")
+        self.default = default or RateLimit()
+        self.limits = dict(limits or {})
+        self.max_keys = int(max_keys)
+        self._clock = clock
+        self._sleep = sleep
+        self._keys: OrderedDict[tuple[str, str, str], _KeyState] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _state(self, key: tuple[str, str, str], now: float) -> _KeyState:
+        state = self._keys.get(key)
+        if state is None:
+            limit = self.limits.get((key[0], key[1]), self.default)
+            state = self._keys[key] = _KeyState(limit, now)
+            while len(self._keys) > self.max_keys:
+                self._keys.popitem(last=False)
+        else:
+            self._keys.move_to_end(key)
+        return state
+
+    def reserve(self, provider: str, model: str, api_key: str | None, tokens: int) -> tuple[RateReservation, float]:
+        """Debit one request and `tokens`; returns the reservation and the seconds to wait before sending."""
+        key = (provider, model, _api_key_id(api_key))
+        tokens = max(0, int(tokens))
+        with self._lock:
+            now = self._clock()
+            state = self._state(key, now)
+            wait = max(state.requests.take(1, now), state.tokens.take(tokens, now), state.paused_until - now)
+        return RateReservation(key, tokens), max(0.0, wait)
+
+    def acquire(self, provider: str, model: str, api_key: str | None, tokens: int) -> RateReservation:
+        reservation, wait = self.reserve(provider, model, api_key, tokens)
+        if wait > 0:
+            self._sleep(wait)
+        return reservation
+
+    async def aacquire(self, provider: str, model: str, api_key: str | None, tokens: int) -> RateReservation:
+        import asyncio
+
+        reservation, wait = self.reserve(provider, model, api_key, tokens)
+        if wait > 0:
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                self.release(reservation, requests=1)
+                raise
+        return reservation
+
+    def reconcile(self, reservation: RateReservation, actual_tokens: int | None) -> None:
+        """Credit back (or further debit) the difference between the estimate and actual usage."""
+        if actual_tokens is None:
+            return
+        with self._lock:
+            state = self._keys.get(reservation.key)
+            if state is not None:
+                state.tokens.give(reservation.tokens - int(actual_tokens), self._clock())
+
+    def release(self, reservation: RateReservation, *, requests: int = 0) -> None:
+        """Return a reservation's tokens (and optionally its request) when nothing was consumed."""
+        with self._lock:
+            state = self._keys.get(reservation.key)
+            if state is not None:
+                now = self._clock()
+                state.tokens.give(reservation.tokens, now)
+                state.requests.give(requests, now)
+
+    def observe(self, provider: str, model: str, api_key: str | None, headers: Mapping[str, str]) -> None:
+        """Adapt a key's limits from a response's rate-limit headers (any status)."""
+        self._observe((provider, model, _api_key_id(api_key)), headers)
+
+    def _observe(self, key: tuple[str, str, str], headers: Mapping[str, str]) -> None:
+        if not headers:
+            return
+        headers = {k.lower(): v for k, v in headers.items()}
+        pause = retry_after_seconds(headers)
+        with self._lock:
+            now = self._clock()
+            state = self._state(key, now)
+            state.requests.observe(*_read_pair(headers, _REQUEST_HEADERS), now)
+            state.tokens.observe(*_read_pair(headers, _TOKEN_HEADERS), now)
+            if pause:
+                state.paused_until = max(state.paused_until, now + pause)
+
+    def _prepare(
+        self, adapter: Callable[..., Any], args: tuple[Any, ...], kwargs: dict[str, Any], default_transport: Any
+    ) -> tuple[str, str, str | None, int, tuple[Any, ...], dict[str, Any]]:
+        signature = inspect.signature(adapter)
+        bound = signature.bind(*args, **kwargs)
+        provider, model, api_key, tokens = _request_shape(adapter, bound.arguments)
+        key = (provider, model, _api_key_id(api_key))
+        is_async = inspect.iscoroutinefunction(adapter)
+        if "transport" in signature.parameters:
+            wrapper = _AsyncObservingTransport if is_async else _ObservingTransport
+            kwargs = dict(kwargs)
+            kwargs["transport"] = wrapper(
+                kwargs.get("transport") or default_transport(), lambda headers: self._observe(key, headers)
+            )
+        elif "client" in bound.arguments:
+            client_wrapper = _AsyncObservingClient if is_async else _ObservingClient
+            bound.arguments["client"] = client_wrapper(
+                bound.arguments["client"], lambda headers: self._observe(key, headers)
+            )
+            args, kwargs = bound.args, bound.kwargs
+        return provider, model, api_key, tokens, args, kwargs
+
+    def _failed(self, reservation: RateReservation, exc: BaseException) -> None:
+        # Rejected or failed requests do not use their tokens; their headers still teach the limits.
+        self.release(reservation)
+        self._observe(reservation.key, error_headers(exc))
+
+    def call(self, adapter: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Call a call_* adapter under the limiter, e.g.
+        limiter.call(call_anthropic_messages, api_key, model, None, messages, None, 256).
+        Compose with call_with_retry for 429s: call_with_retry(lambda: limiter.call(...)).
+        """
+        from spendguard_engine.providers.transport import get_default_transport
+
+        provider, model, api_key, tokens, args, kwargs = self._prepare(adapter, args, kwargs, get_default_transport)
+        reservation = self.acquire(provider, model, api_key, tokens)
+        try:
+            result = adapter(*args, **kwargs)
+        except BaseException as exc:
+            self._failed(reservation, exc)
+            raise
+        self.reconcile(reservation, _actual_tokens(adapter, result))
+        return result
+
+    async def acall(self, adapter: Callable[..., Awaitable[Any]], *args: Any, **kwargs: Any) -> Any:
+        """asyncio version of call for the acall_* adapters."""
+        from spendguard_engine.providers.async_transport import get_default_async_transport
+
+        provider, model, api_key, tokens, args, kwargs = self._prepare(
+            adapter, args, kwargs, get_default_async_transport
+        )
+        reservation = await self.aacquire(provider, model, api_key, tokens)
+        try:
+            result = await adapter(*args, **kwargs)
+        except BaseException as exc:
+            self._failed(reservation, exc)
+            raise
+        self.reconcile(reservation, _actual_tokens(adapter, result))
+        return result
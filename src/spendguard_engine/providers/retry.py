@@ -0,0 +1,349 @@
+from __future__ import annotations
+
+import email.utils
+import queue
+import random
+import re
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Mapping, TypeVar
+
+from spendguard_engine.billing import compute_cost_totals
+from spendguard_engine.providers.errors import ProviderConnectionError, ProviderHTTPError
+
+if TYPE_CHECKING:
+    from spendguard_engine.pricing import RateCard
+
+T = TypeVar("T")
+
+# 529 is Anthropic's "overloaded".
+RETRY_STATUSES = frozenset({408, 409, 425, 429, 500, 502, 503, 504, 529})
+
+# Rate-limit headers whose reset is only meaningful once the matching "remaining" hits 0.
+_RESET_HEADERS = (
+    ("x-ratelimit-remaining-requests", "x-ratelimit-reset-requests"),
+    ("x-ratelimit-remaining-tokens", "x-ratelimit-reset-tokens"),
+    ("anthropic-ratelimit-requests-remaining", "anthropic-ratelimit-requests-reset"),
+    ("anthropic-ratelimit-tokens-remaining", "anthropic-ratelimit-tokens-reset"),
+    ("anthropic-ratelimit-input-tokens-remaining", "anthropic-ratelimit-input-tokens-reset"),
+    ("anthropic-ratelimit-output-tokens-remaining", "anthropic-ratelimit-output-tokens-reset"),
+)
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+
+
+def _parse_reset(value: str, now: float) -> float | None:
+    """Seconds until a reset given as seconds, a duration ("6m0s", "20ms"), an RFC 3339 time or an HTTP date."""
+    value = value.strip()
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if parts and "".join(n + u for n, u in parts) == value:
+        return sum(float(n) * _DURATION_UNITS[u] for n, u in parts)
+    try:
+        when = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        try:
+            when = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return when.timestamp() - now
+
+
+def retry_after_seconds(headers: Mapping[str, str], *, now: float | None = None) -> float | None:
+    """
+    Server-requested wait from Retry-After / retry-after-ms, or from exhausted OpenAI
+    (x-ratelimit-*) and Anthropic (anthropic-ratelimit-*) limits. None when there is no hint.
+    """
+    if not headers:
+        return None
+    headers = {k.lower(): v for k, v in headers.items()}
+    now = time.time() if now is None else now
+    hints: list[float] = []
+    raw = headers.get("retry-after-ms")
+    if raw:
+        try:
+            hints.append(float(raw) / 1000.0)
+        except ValueError:
+            pass
+    raw = headers.get("retry-after")
+    if raw:
+        seconds = _parse_reset(raw, now)
+        if seconds is not None:
+            hints.append(seconds)
+    for remaining, reset in _RESET_HEADERS:
+        if headers.get(remaining, "").strip() == "0" and headers.get(reset):
+            seconds = _parse_reset(headers[reset], now)
+            if seconds is not None:
+                hints.append(seconds)
+    if not hints:
+        return None
+    return max(0.0, max(hints))
+
+
+def _status(exc: BaseException) -> int | None:
+    if isinstance(exc, ProviderHTTPError):
+        return exc.status
+    # openai.APIStatusError and similar SDK errors.
+    status = getattr(exc, "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def error_headers(exc: BaseException) -> Mapping[str, str]:
+    """Response headers carried by a ProviderHTTPError or an SDK error with a `.response`, else {}."""
+    if isinstance(exc, ProviderHTTPError):
+        return exc.headers
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    return dict(headers.items()) if headers is not None else {}
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter. Server hints (Retry-After, rate-limit resets)
+    replace the computed backoff; a hint longer than max_retry_after stops retrying so
+    the caller can fail over instead of sleeping.
+    """
+
+    max_attempts: int = 4
+    base_delay: float = 0.5
+    max_delay: float = 20.0
+    max_retry_after: float = 60.0
+    retry_statuses: frozenset[int] = RETRY_STATUSES
+    # Non-HTTP failures worth retrying (add e.g. openai.APIConnectionError for SDK calls).
+    retry_on: tuple[type[BaseException], ...] = (ProviderConnectionError,)
+
+    def is_retryable(self, exc: BaseException) -> bool:
+        status = _status(exc)
+        if status is not None:
+            return status in self.retry_statuses
+        return isinstance(exc, self.retry_on)
+
+    def backoff(self, attempt: int, rng: Callable[[], float] = random.random) -> float:
+        return rng() * min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+
+    def next_delay(self, attempt: int, exc: BaseException, rng: Callable[[], float] = random.random) -> float | None:
+        """Seconds to wait before attempt `attempt + 1`, or None to give up."""
+        if attempt >= self.max_attempts or not self.is_retryable(exc):
+            return None
+        hint = retry_after_seconds(error_headers(exc))
+        if hint is not None:
+            return hint if hint <= self.max_retry_after else None
+        return self.backoff(attempt, rng)
+
+
+def call_with_retry(
+    fn: Callable[[], T],
+    *,
+    policy: RetryPolicy | None = None,
+    sleep: Callable[[float], Any] = time.sleep,
+    rng: Callable[[], float] = random.random,
+    on_retry: Callable[[int, BaseException, float], Any] | None = None,
+) -> T:
+    """Call `fn` until it succeeds or `policy` gives up; the last error is re-raised."""
+    policy = policy or RetryPolicy()
+    attempt = 1
+    while True:
+        try:
+            return fn()
+        except Exception as exc:
+            delay = policy.next_delay(attempt, exc, rng)
+            if delay is None:
+                raise
+            if on_retry is not None:
+                on_retry(attempt, exc, delay)
+        sleep(delay)
+        attempt += 1
+
+
+async def acall_with_retry(
+    fn: Callable[[], Awaitable[T]],
+    *,
+    policy: RetryPolicy | None = None,
+    rng: Callable[[], float] = random.random,
+    on_retry: Callable[[int, BaseException, float], Any] | None = None,
+) -> T:
+    """asyncio version of call_with_retry; `fn` returns a fresh awaitable per attempt."""
+    import asyncio
+
+    policy = policy or RetryPolicy()
+    attempt = 1
+    while True:
+        try:
+            return await fn()
+        except Exception as exc:
+            delay = policy.next_delay(attempt, exc, rng)
+            if delay is None:
+                raise
+            if on_retry is not None:
+                on_retry(attempt, exc, delay)
+        await asyncio.sleep(delay)
+        attempt += 1
+
+
+def worst_case_request_microcents(rate_card: RateCard, *, input_tokens: int, max_output_tokens: int) -> int:
+    """
+    Most one request can cost: input at the dearer of the plain/cache-write rates plus
+    max_output_tokens at the dearer of the output/reasoning rates.
+    """
+    return max(
+        compute_cost_totals(
+            rate_card=rate_card,
+            input_tokens=input_tokens,
+            output_tokens=max_output_tokens,
+            reasoning_tokens=reasoning,
+            cache_write_input_tokens=cache_write,
+        ).realized_microcents
+        for reasoning in (None, max_output_tokens)
+        for cache_write in (None, input_tokens)
+    )
+
+
+class Hedger:
+    """
+    Hedged requests: if a call has not finished after the observed latency quantile
+    (p95 by default, over the last `window` successful calls), send a duplicate and take
+    whichever answers first.
+
+    Duplicates cost money, so each call sends at most
+    min(max_hedges, budget_microcents // worst_case_microcents) of them (see
+    worst_case_request_microcents), and none when the worst case is unknown (<= 0). No
+    hedging happens until `min_samples` latencies are known. Every attempt's latency is
+    recorded, losers included, so the quantile is not biased towards the fast winners.
+    Thread-based hedges cannot be cancelled and run to completion in the background; the
+    asyncio variant cancels the losers and records how long they had run.
+    """
+
+    def __init__(
+        self,
+        *,
+        quantile: float = 0.95,
+        window: int = 256,
+        min_samples: int = 20,
+        min_delay: float = 0.0,
+        max_hedges: int = 1,
+    ) -> None:
+        if not 0 < quantile < 1:
+            raise ValueError("quantile must be between 0 and 1")
+        self.quantile = quantile
+        self.min_samples = int(min_samples)
+        self.min_delay = float(min_delay)
+        self.max_hedges = int(max_hedges)
+        self._latencies: deque[float] = deque(maxlen=int(window))
+        self._lock = threading.Lock()
+        self.hedges_sent = 0
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def delay(self) -> float | None:
+        with self._lock:
+            if len(self._latencies) < max(1, self.min_samples):
+                return None
+            ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, int(self.quantile * len(ordered)))
+        return max(self.min_delay, ordered[index])
+
+    def hedges_allowed(self, *, worst_case_microcents: int, budget_microcents: int) -> int:
+        if worst_case_microcents <= 0:
+            return 0
+        return max(0, min(self.max_hedges, int(budget_microcents) // int(worst_case_microcents)))
+
+    def _plan(self, worst_case_microcents: int, budget_microcents: int) -> tuple[int, float | None]:
+        hedges = self.hedges_allowed(worst_case_microcents=worst_case_microcents, budget_microcents=budget_microcents)
+        return hedges, (self.delay() if hedges else None)
+
+    def call(self, fn: Callable[[], T], *, worst_case_microcents: int, budget_microcents: int) -> T:
+        hedges, delay = self._plan(worst_case_microcents, budget_microcents)
+        if delay is None:
+            start = time.monotonic()
+            result = fn()
+            self.record(time.monotonic() - start)
+            return result
+
+        results: queue.SimpleQueue[tuple[bool, Any]] = queue.SimpleQueue()
+
+        def run() -> None:
+            start = time.monotonic()
+            try:
+                value = fn()
+            except BaseException as exc:
+                results.put((False, exc))
+                return
+            # Losers finish in the background and are recorded too.
+            self.record(time.monotonic() - start)
+            results.put((True, value))
+
+        threading.Thread(target=run, daemon=True).start()
+        launched, finished = 1, 0
+        first_error: BaseException | None = None
+        while True:
+            try:
+                ok, value = results.get(timeout=delay if launched <= hedges else None)
+            except queue.Empty:
+                threading.Thread(target=run, daemon=True).start()
+                launched += 1
+                with self._lock:
+                    self.hedges_sent += 1
+                continue
+            finished += 1
+            if ok:
+                return value
+            first_error = first_error or value
+            if finished == launched:
+                raise first_error
+
+    async def acall(self, fn: Callable[[], Awaitable[T]], *, worst_case_microcents: int, budget_microcents: int) -> T:
+        import asyncio
+
+        hedges, delay = self._plan(worst_case_microcents, budget_microcents)
+        loop = asyncio.get_running_loop()
+
+        async def run() -> T:
+            start = loop.time()
+            try:
+                result = await fn()
+            except asyncio.CancelledError:
+                # A cancelled loser took at least this long; leaving it out would skew the quantile low.
+                self.record(loop.time() - start)
+                raise
+            self.record(loop.time() - start)
+            return result
+
+        if delay is None:
+            return await run()
+
+        tasks = {asyncio.ensure_future(run())}
+        launched = 1
+        first_error: BaseException | None = None
+        try:
+            while tasks:
+                done, tasks = await asyncio.wait(
+                    tasks, timeout=delay if launched <= hedges else None, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    tasks.add(asyncio.ensure_future(run()))
+                    launched += 1
+                    with self._lock:
+                        self.hedges_sent += 1
+                    continue
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    first_error = first_error or task.exception()
+            assert first_error is not None
+            raise first_error
+        finally:
+            for task in tasks:
+                task.cancel()
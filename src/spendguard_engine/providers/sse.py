@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Iterable, Iterator
+
+
+@dataclass(frozen=True)
+class ServerSentEvent:
+    event: str
+    data: str
+    id: str | None = None
+
+
+class SSEDecoder:
+    """
+    Incremental text/event-stream decoder (WHATWG rules): feed it one line at a time and
+    it returns an event whenever a blank line completes one. Comment lines and fields
+    other than event/data/id are ignored; events without data are dropped.
+    """
+
+    __slots__ = ("_event", "_data", "_id")
+
+    def __init__(self) -> None:
+        self._event = ""
+        self._data: list[str] = []
+        self._id: str | None = None
+
+    def decode(self, line: bytes | str) -> ServerSentEvent | None:
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        line = line.rstrip("\r\n")
+        if not line:
+            if not self._data:
+                self._event = ""
+                return None
+            event = ServerSentEvent(event=self._event or "message", data="\n".join(self._data), id=self._id)
+            self._event = ""
+            self._data = []
+            return event
+        if line.startswith(":"):
+            return None
+        name, _, value = line.partition(":")
+        if value.startswith(" "):
+            value = value[1:]
+        if name == "data":
+            self._data.append(value)
+        elif name == "event":
+            self._event = value
+        elif name == "id" and "\0" not in value:
+            self._id = value
+        return None
+
+    def flush(self) -> ServerSentEvent | None:
+        """Dispatch an event left pending when the stream ended without a trailing blank line."""
+        return self.decode("")
+
+
+def iter_sse_events(lines: Iterable[bytes | str]) -> Iterator[ServerSentEvent]:
+    decoder = SSEDecoder()
+    for line in lines:
+        event = decoder.decode(line)
+        if event is not None:
+            yield event
+    event = decoder.flush()
+    if event is not None:
+        yield event
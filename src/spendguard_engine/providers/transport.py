@@ -0,0 +1,354 @@
+from __future__ import annotations
+
+import http.client
+import os
+import select
+import ssl
+import threading
+import time
+import weakref
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterator, Mapping
+from urllib.parse import urlsplit
+
+from spendguard_engine.providers.decoding import loads
+
+# Seconds; replaces the adapters' old hard-coded 60s urlopen timeout.
+TIMEOUT_ENV = "SPENDGUARD_HTTP_TIMEOUT_SECONDS"
+DEFAULT_TIMEOUT_SECONDS = 60.0
+
+# Errors that mean a reused keep-alive connection was closed by the server while idle.
+_STALE_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError, ConnectionAbortedError)
+# Requests that may be re-sent after the server could already have received them.
+_IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE", "TRACE"})
+
+HostKey = tuple[str, str, int]
+
+
+def default_timeout() -> float:
+    raw = os.getenv(TIMEOUT_ENV, "").strip()
+    if not raw:
+        return DEFAULT_TIMEOUT_SECONDS
+    timeout = float(raw)
+    if timeout <= 0:
+        raise ValueError(f"{TIMEOUT_ENV} must be positive, got {raw!r}")
+    return timeout
+
+
+@dataclass(frozen=True)
+class HTTPResponse:
+    status: int
+    body: bytes
+    # Lower-cased header names.
+    headers: Mapping[str, str] = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status < 300
+
+    def json(self) -> Any:
+        return loads(self.body)
+
+    def text(self) -> str:
+        return self.body.decode("utf-8", "replace")
+
+
+def _dropped(conn: http.client.HTTPConnection) -> bool:
+    # An idle keep-alive socket is only readable if the server closed it (or sent garbage).
+    if conn.sock is None:
+        return True
+    try:
+        return bool(select.select([conn.sock], [], [], 0)[0])
+    except (OSError, ValueError):
+        return True
+
+
+class _HostPool:
+    __slots__ = ("idle", "active", "cond")
+
+    def __init__(self) -> None:
+        # (connection, monotonic time it was returned), most recently used last.
+        self.idle: deque[tuple[http.client.HTTPConnection, float]] = deque()
+        self.active = 0
+        self.cond = threading.Condition()
+
+
+class HTTPTransport:
+    """
+    Thread-safe keep-alive HTTP/1.1 client over http.client.
+
+    Connections are pooled per (scheme, host, port) with at most `max_connections_per_host`
+    in flight; callers beyond the limit wait up to `pool_timeout` seconds. Idle connections
+    older than `idle_timeout`, or already closed by the server, are closed instead of
+    reused. A request whose send fails on a reused connection is retried once on a fresh
+    connection; once the request was sent, only idempotent methods are retried, so a POST
+    the server may have acted on is never sent twice.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_connections_per_host: int = 10,
+        timeout: float | None = None,
+        idle_timeout: float = 30.0,
+        pool_timeout: float | None = None,
+        ssl_context: ssl.SSLContext | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if max_connections_per_host <= 0:
+            raise ValueError("max_connections_per_host must be positive")
+        self.max_connections_per_host = int(max_connections_per_host)
+        self.timeout = timeout
+        self.idle_timeout = float(idle_timeout)
+        self.pool_timeout = pool_timeout
+        self._ssl_context = ssl_context
+        self._clock = clock
+        self._pools: dict[HostKey, _HostPool] = {}
+        self._lock = threading.Lock()
+        self.connections_opened = 0
+
+    def _pool(self, key: HostKey) -> _HostPool:
+        pool = self._pools.get(key)
+        if pool is None:
+            with self._lock:
+                pool = self._pools.setdefault(key, _HostPool())
+        return pool
+
+    def _connect(self, key: HostKey, timeout: float) -> http.client.HTTPConnection:
+        scheme, host, port = key
+        if scheme == "https":
+            if self._ssl_context is None:
+                self._ssl_context = ssl.create_default_context()
+            conn: http.client.HTTPConnection = http.client.HTTPSConnection(
+                host, port, timeout=timeout, context=self._ssl_context
+            )
+        else:
+            conn = http.client.HTTPConnection(host, port, timeout=timeout)
+        with self._lock:
+            self.connections_opened += 1
+        return conn
+
+    def _acquire(self, pool: _HostPool) -> http.client.HTTPConnection | None:
+        """Take a slot in the pool; returns a fresh-enough idle connection, if any."""
+        deadline = None if self.pool_timeout is None else self._clock() + self.pool_timeout
+        stale: list[http.client.HTTPConnection] = []
+        with pool.cond:
+            while pool.active >= self.max_connections_per_host:
+                remaining = None if deadline is None else deadline - self._clock()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError("timed out waiting for a pooled HTTP connection")
+                pool.cond.wait(remaining)
+            pool.active += 1
+            conn = None
+            now = self._clock()
+            while pool.idle:
+                candidate, returned_at = pool.idle.pop()
+                if now - returned_at <= self.idle_timeout and not _dropped(candidate):
+                    conn = candidate
+                    break
+                stale.append(candidate)
+            # Anything left below an expired entry is older still.
+            while pool.idle and now - pool.idle[0][1] > self.idle_timeout:
+                stale.append(pool.idle.popleft()[0])
+        for old in stale:
+            old.close()
+        return conn
+
+    def _release(self, pool: _HostPool, conn: http.client.HTTPConnection | None) -> None:
+        with pool.cond:
+            pool.active -= 1
+            if conn is not None:
+                pool.idle.append((conn, self._clock()))
+            pool.cond.notify()
+
+    def _send(
+        self, method: str, url: str, body: bytes | None, headers: Mapping[str, str] | None, timeout: float | None
+    ) -> tuple[_HostPool, http.client.HTTPConnection, http.client.HTTPResponse]:
+        """Send a request and read the status line and headers; the caller owns the slot afterwards."""
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        if scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError(f"unsupported URL: {url!r}")
+        key = (scheme, parts.hostname, parts.port or (443 if scheme == "https" else 80))
+        path = parts.path or "/"
+        if parts.query:
+            path = f"{path}?{parts.query}"
+        if timeout is None:
+            timeout = self.timeout if self.timeout is not None else default_timeout()
+
+        pool = self._pool(key)
+        conn = self._acquire(pool)
+        try:
+            while True:
+                reused = conn is not None
+                if conn is None:
+                    conn = self._connect(key, timeout)
+                else:
+                    conn.timeout = timeout
+                    if conn.sock is not None:
+                        conn.sock.settimeout(timeout)
+                try:
+                    conn.request(method, path, body=body, headers=dict(headers or {}))
+                except _STALE_ERRORS:
+                    conn.close()
+                    conn = None
+                    if not reused:
+                        raise
+                    continue
+                try:
+                    return pool, conn, conn.getresponse()
+                except _STALE_ERRORS:
+                    conn.close()
+                    conn = None
+                    # The server may already have acted on the request (and billed it).
+                    if not reused or method.upper() not in _IDEMPOTENT_METHODS:
+                        raise
+        except BaseException:
+            if conn is not None:
+                conn.close()
+            self._release(pool, None)
+            raise
+
+    def _finish(
+        self, pool: _HostPool, conn: http.client.HTTPConnection, resp: http.client.HTTPResponse, complete: bool
+    ) -> None:
+        if complete and not resp.will_close:
+            self._release(pool, conn)
+        else:
+            conn.close()
+            self._release(pool, None)
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        *,
+        body: bytes | None = None,
+        headers: Mapping[str, str] | None = None,
+        timeout: float | None = None,
+    ) -> HTTPResponse:
+        """Send a request and read the full response. Network failures raise OSError/HTTPException."""
+        pool, conn, resp = self._send(method, url, body, headers, timeout)
+        complete = False
+        try:
+            data = resp.read()
+            complete = True
+        finally:
+            self._finish(pool, conn, resp, complete)
+        return HTTPResponse(status=resp.status, body=data, headers={k.lower(): v for k, v in resp.getheaders()})
+
+    def open(
+        self,
+        method: str,
+        url: str,
+        *,
+        body: bytes | None = None,
+        headers: Mapping[str, str] | None = None,
+        timeout: float | None = None,
+    ) -> StreamingHTTPResponse:
+        """Send a request and return once headers arrive; the body is read incrementally."""
+        pool, conn, resp = self._send(method, url, body, headers, timeout)
+        return StreamingHTTPResponse(self, pool, conn, resp)
+
+    def idle_connections(self) -> int:
+        total = 0
+        for pool in list(self._pools.values()):
+            with pool.cond:
+                total += len(pool.idle)
+        return total
+
+    def evict_idle(self, *, max_idle: float | None = None) -> int:
+        """Close idle connections older than `max_idle` (default idle_timeout); returns how many."""
+        limit = self.idle_timeout if max_idle is None else max_idle
+        now = self._clock()
+        evicted: list[http.client.HTTPConnection] = []
+        for pool in list(self._pools.values()):
+            with pool.cond:
+                keep = deque(item for item in pool.idle if now - item[1] <= limit)
+                evicted.extend(conn for conn, returned_at in pool.idle if now - returned_at > limit)
+                pool.idle = keep
+        for conn in evicted:
+            conn.close()
+        return len(evicted)
+
+    def close(self) -> None:
+        self.evict_idle(max_idle=-1.0)
+
+
+class StreamingHTTPResponse:
+    """
+    A response whose body has not been read yet. It holds its pooled connection until
+    closed; the connection is reused only if the body was read to the end. A response
+    dropped without being closed gives its slot back when it is garbage-collected.
+    """
+
+    def __init__(
+        self,
+        transport: HTTPTransport,
+        pool: _HostPool,
+        conn: http.client.HTTPConnection,
+        resp: http.client.HTTPResponse,
+    ) -> None:
+        self._transport = transport
+        self._pool = pool
+        self._conn = conn
+        self._resp = resp
+        # Never reuses the connection: an abandoned body was not read to the end.
+        self._finalizer = weakref.finalize(self, transport._finish, pool, conn, resp, False)
+        self.status = resp.status
+        self.headers = {k.lower(): v for k, v in resp.getheaders()}
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status < 300
+
+    def read(self) -> bytes:
+        try:
+            return self._resp.read()
+        finally:
+            self.close()
+
+    def iter_lines(self) -> Iterator[bytes]:
+        """Body lines (chunked encoding handled), each with its line ending."""
+        try:
+            while True:
+                line = self._resp.readline()
+                if not line:
+                    return
+                yield line
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        if self._finalizer.detach() is not None:
+            self._transport._finish(self._pool, self._conn, self._resp, self._resp.isclosed())
+
+    def __enter__(self) -> StreamingHTTPResponse:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+_default_lock = threading.Lock()
+_default_transport: HTTPTransport | None = None
+
+
+def get_default_transport() -> HTTPTransport:
+    """The process-wide pool shared by the provider adapters."""
+    global _default_transport
+    if _default_transport is None:
+        with _default_lock:
+            if _default_transport is None:
+                _default_transport = HTTPTransport()
+    return _default_transport
+
+
+def set_default_transport(transport: HTTPTransport | None) -> None:
+    """Replace the shared pool (None: create a new one on next use). The old pool is closed."""
+    global _default_transport
+    with _default_lock:
+        old, _default_transport = _default_transport, transport
+    if old is not None and old is not transport:
+        old.close()
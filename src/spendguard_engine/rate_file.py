@@ -0,0 +1,301 @@
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import zlib
+from array import array
+from typing import Any, Iterator, Mapping
+
+from spendguard_engine.compact_rates import (
+    COLUMNS,
+    MULTIPLIER_SCALE,
+    NONE_SENTINEL,
+    SCALED_COLUMNS,
+    CompactRateTable,
+    RateRow,
+    TableKey,
+)
+from spendguard_engine.pricing import RateCard
+
+# Layout (all little-endian):
+#   header   MAGIC, format version, column count, row count, string count, multiplier
+#            scale, section offsets, CRC32 of everything after the header
+#   columns  u32 string id per column (column names, in row order)
+#   strings  u32 offsets[count + 1] followed by the UTF-8 blob
+#   keys     3 x u32 string ids (tenant, provider, model) per row, sorted by key
+#   rows     ncols x i64 per row, 8-byte aligned
+MAGIC = b"SGRATES\0"
+FORMAT_VERSION = 1
+_HEADER = struct.Struct("<8sHHIIIqQQQQI")
+_STRING_SPAN = struct.Struct("<II")
+
+
+def _pad8(n: int) -> int:
+    return (n + 7) & ~7
+
+
+def encode_rate_table(source: CompactRateTable | Mapping[str, Mapping[str, RateCard]], *, tenant: str = "") -> bytes:
+    """Serialize a CompactRateTable (or a copy_rates-style dict under `tenant`)."""
+    if not isinstance(source, CompactRateTable):
+        source = CompactRateTable.from_rates(dict(source), tenant=tenant)
+
+    keys = sorted(source.keys())
+    strings = sorted({part for key in keys for part in key} | set(COLUMNS))
+    string_ids = {s: i for i, s in enumerate(strings)}
+
+    columns = struct.pack(f"<{len(COLUMNS)}I", *(string_ids[c] for c in COLUMNS))
+    blobs = [s.encode("utf-8") for s in strings]
+    offsets = [0]
+    for blob in blobs:
+        offsets.append(offsets[-1] + len(blob))
+    string_section = struct.pack(f"<{len(offsets)}I", *offsets) + b"".join(blobs)
+    key_section = struct.pack(f"<{3 * len(keys)}I", *(string_ids[part] for key in keys for part in key))
+
+    rows = array("q")
+    for key in keys:
+        row = source.get(*key)
+        assert row is not None
+        base = row._base
+        rows.extend(row._data[base : base + len(COLUMNS)])
+    if sys.byteorder != "little":
+        rows.byteswap()
+
+    columns_offset = _HEADER.size
+    strings_offset = columns_offset + len(columns)
+    keys_offset = strings_offset + len(string_section)
+    rows_offset = _pad8(keys_offset + len(key_section))
+    body = (
+        columns + string_section + key_section + b"\0" * (rows_offset - keys_offset - len(key_section)) + rows.tobytes()
+    )
+    header = _HEADER.pack(
+        MAGIC,
+        FORMAT_VERSION,
+        0,
+        len(COLUMNS),
+        len(keys),
+        len(strings),
+        MULTIPLIER_SCALE,
+        columns_offset,
+        strings_offset,
+        keys_offset,
+        rows_offset,
+        zlib.crc32(body),
+    )
+    return header + body
+
+
+def _shared_file_mode() -> int:
+    # mkstemp creates files 0600; rate files are mapped by workers that may run as other users.
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o644 & ~umask
+
+
+def write_rate_file(
+    path: str, source: CompactRateTable | Mapping[str, Mapping[str, RateCard]], *, tenant: str = ""
+) -> None:
+    """
+    Write atomically (temp file + fsync + rename) so processes mapping the old file keep a
+    valid view and a crash never publishes a torn file. The file is created 0644 (minus the
+    umask) so other users' worker processes can map it.
+    """
+    data = encode_rate_table(source, tenant=tenant)
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(prefix=".rates-", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, _shared_file_mode())
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    if hasattr(os, "O_DIRECTORY"):
+        # Persist the rename itself.
+        dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+class MappedRateTable:
+    """
+    Read-only rate table backed by a memory-mapped rate file.
+
+    Opening checks the header, the section bounds and the CRC32 but decodes nothing:
+    keys are binary-searched in place and rows are decoded only when looked up, and all
+    processes share the same page cache. The CRC32 reads the whole file once;
+    verify_checksum=False skips it for callers that already verified the file.
+    Corrupt or truncated files raise ValueError.
+    """
+
+    def __init__(self, path: str, *, verify_checksum: bool = True) -> None:
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._open(verify_checksum)
+        except BaseException:
+            self._mm.close()
+            raise
+
+    def _open(self, verify_checksum: bool) -> None:
+        mm = self._mm
+        if len(mm) < _HEADER.size:
+            raise ValueError(f"{self.path}: truncated rate file")
+        (
+            magic,
+            version,
+            _,
+            ncols,
+            nrows,
+            nstrings,
+            scale,
+            columns_offset,
+            strings_offset,
+            keys_offset,
+            rows_offset,
+            checksum,
+        ) = _HEADER.unpack_from(mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path}: not a rate file")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"{self.path}: unsupported rate file version {version}")
+        if rows_offset + nrows * ncols * 8 != len(mm):
+            raise ValueError(f"{self.path}: truncated rate file")
+        self._checksum = checksum
+        if verify_checksum:
+            self.verify()
+        blob_offset = strings_offset + 4 * (nstrings + 1)
+        if not (
+            columns_offset == _HEADER.size
+            and strings_offset == columns_offset + 4 * ncols
+            and blob_offset <= keys_offset
+            and keys_offset + 12 * nrows <= rows_offset
+            and rows_offset % 8 == 0
+            and scale > 0
+        ):
+            raise ValueError(f"{self.path}: corrupt rate file (bad section offsets)")
+
+        self._nrows = nrows
+        self._ncols = ncols
+        self._nstrings = nstrings
+        self._scale = scale
+        self._strings_offset = strings_offset
+        self._blob_offset = blob_offset
+        self._blob_size = keys_offset - blob_offset
+
+        # Validate the columns before any buffer view exists, so a failed open can still unmap.
+        columns = tuple(self._string(i) for i in struct.unpack_from(f"<{ncols}I", mm, columns_offset))
+        unknown = set(columns) - set(COLUMNS)
+        if unknown:
+            raise ValueError(f"{self.path}: unknown rate columns {sorted(unknown)}")
+        missing = {"input_cents_per_1m", "output_cents_per_1m"} - set(columns)
+        if missing or len(set(columns)) != len(columns):
+            raise ValueError(f"{self.path}: corrupt rate file (bad columns)")
+        # Files written with the current column layout (and scale) are served as zero-copy RateRow views.
+        self._native = columns == COLUMNS and scale == MULTIPLIER_SCALE
+        self._columns = columns
+
+        self._keys = memoryview(mm)[keys_offset : keys_offset + 12 * nrows].cast("I")
+        raw_rows = memoryview(mm)[rows_offset : rows_offset + 8 * nrows * ncols]
+        if sys.byteorder == "little":
+            self._rows: Any = raw_rows.cast("q")
+        else:
+            swapped = array("q", raw_rows.tobytes())
+            swapped.byteswap()
+            self._rows = swapped
+
+    def verify(self) -> None:
+        """Check the file's CRC32; raises ValueError on mismatch."""
+        with memoryview(self._mm) as view:
+            if zlib.crc32(view[_HEADER.size :]) != self._checksum:
+                raise ValueError(f"{self.path}: checksum mismatch")
+
+    def _string(self, index: int) -> str:
+        if index >= self._nstrings:
+            raise ValueError(f"{self.path}: corrupt rate file (string id {index} out of range)")
+        start, end = _STRING_SPAN.unpack_from(self._mm, self._strings_offset + 4 * index)
+        if not start <= end <= self._blob_size:
+            raise ValueError(f"{self.path}: corrupt rate file (string {index} out of bounds)")
+        try:
+            return bytes(self._mm[self._blob_offset + start : self._blob_offset + end]).decode("utf-8")
+        except UnicodeDecodeError:
+            raise ValueError(f"{self.path}: corrupt rate file (string {index} is not UTF-8)") from None
+
+    def _key(self, row: int) -> TableKey:
+        base = 3 * row
+        keys = self._keys
+        return (self._string(keys[base]), self._string(keys[base + 1]), self._string(keys[base + 2]))
+
+    def _find(self, key: TableKey) -> int | None:
+        lo, hi = 0, self._nrows
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self._nrows and self._key(lo) == key:
+            return lo
+        return None
+
+    def _card(self, row: int) -> RateCard:
+        values: dict[str, Any] = {}
+        base = row * self._ncols
+        for i, name in enumerate(self._columns):
+            raw = self._rows[base + i]
+            if raw == NONE_SENTINEL:
+                values[name] = None
+            else:
+                values[name] = raw / self._scale if name in SCALED_COLUMNS else raw
+        return RateCard(**values)
+
+    def get(self, tenant: str, provider: str, model: str) -> RateRow | RateCard | None:
+        row = self._find((tenant, provider, model))
+        if row is None:
+            return None
+        if self._native:
+            return RateRow(self._rows, row)
+        return self._card(row)
+
+    def keys(self) -> Iterator[TableKey]:
+        return (self._key(row) for row in range(self._nrows))
+
+    def to_compact(self) -> CompactRateTable:
+        table = CompactRateTable()
+        for row in range(self._nrows):
+            table.set(*self._key(row), self._card(row))
+        return table
+
+    def to_rates(self, *, tenant: str = "") -> dict[str, dict[str, RateCard]]:
+        out: dict[str, dict[str, RateCard]] = {}
+        for row in range(self._nrows):
+            t, provider, model = self._key(row)
+            if t == tenant:
+                out.setdefault(provider, {})[model] = self._card(row)
+        return out
+
+    def __len__(self) -> int:
+        return self._nrows
+
+    def close(self) -> None:
+        """Unmap the file; fails with BufferError while RateRow views from get() are still referenced."""
+        self._rows = self._keys = None
+        self._mm.close()
+
+    def __enter__(self) -> MappedRateTable:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+def load_rate_file(path: str, *, verify_checksum: bool = True) -> MappedRateTable:
+    return MappedRateTable(path, verify_checksum=verify_checksum)
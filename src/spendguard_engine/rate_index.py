@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Mapping
+
+from spendguard_engine.pricing import RateCard
+
+# Dated snapshot suffixes: gpt-4o-2024-08-06, claude-3-5-sonnet-20241022.
+_SNAPSHOT_SUFFIX = re.compile(r"-(?:\d{4}-\d{2}-\d{2}|\d{8})$")
+# A prefix match must end at one of these so "o3" never matches "o3x".
+_PREFIX_BOUNDARIES = frozenset("-:@/")
+_TERMINAL = ""
+
+
+def normalize_model_name(model: str) -> str:
+    model = model.strip().lower()
+    if model.startswith("models/"):
+        model = model[len("models/") :]
+    return model
+
+
+@dataclass(frozen=True)
+class ResolvedRate:
+    provider: str
+    requested: str
+    # Catalog key the request resolved to.
+    model: str
+    rate_card: RateCard
+    # "exact", "alias", "snapshot" or "prefix".
+    match: str
+
+
+class _Trie:
+    __slots__ = ("root",)
+
+    def __init__(self) -> None:
+        self.root: dict[str, Any] = {}
+
+    def insert(self, key: str, value: str) -> None:
+        node = self.root
+        for ch in key:
+            node = node.setdefault(ch, {})
+        node[_TERMINAL] = value
+
+    def longest_prefix(self, key: str) -> str | None:
+        node = self.root
+        best = None
+        for i, ch in enumerate(key):
+            node = node.get(ch)
+            if node is None:
+                break
+            value = node.get(_TERMINAL)
+            if value is not None and (i + 1 == len(key) or key[i + 1] in _PREFIX_BOUNDARIES):
+                best = value
+        return best
+
+
+class _ProviderIndex:
+    __slots__ = ("cards", "normalized", "aliases", "trie")
+
+    def __init__(self, models: Mapping[str, RateCard], aliases: Mapping[str, str]) -> None:
+        self.cards = dict(models)
+        self.normalized: dict[str, str] = {}
+        self.trie = _Trie()
+        for name in models:
+            norm = normalize_model_name(name)
+            # First spelling wins if two catalog keys normalize to the same name.
+            if norm not in self.normalized:
+                self.normalized[norm] = name
+                self.trie.insert(norm, name)
+        self.aliases: dict[str, str] = {}
+        for alias, target in aliases.items():
+            resolved = self.normalized.get(normalize_model_name(target))
+            if resolved is None:
+                raise ValueError(f"alias {alias!r} points at unknown model {target!r}")
+            self.aliases[normalize_model_name(alias)] = resolved
+
+    def resolve(self, norm: str, allow_prefix: bool) -> tuple[str, str] | None:
+        name = self.aliases.get(norm)
+        if name is not None:
+            return name, "alias"
+        name = self.normalized.get(norm)
+        if name is not None:
+            return name, "exact"
+        base = _SNAPSHOT_SUFFIX.sub("", norm)
+        if base != norm:
+            for candidate in (base, f"{base}-latest"):
+                name = self.aliases.get(candidate) or self.normalized.get(candidate)
+                if name is not None:
+                    return name, "snapshot"
+        if allow_prefix:
+            name = self.trie.longest_prefix(norm)
+            if name is not None:
+                return name, "prefix"
+        return None
+
+
+class RateIndex:
+    """
+    Model-name -> RateCard lookup over a rates table (e.g. DEFAULT_RATES merged with overrides).
+
+    Resolution order: explicit alias, exact name, dated snapshot (with or without a
+    "-latest" catalog entry), then, only with allow_prefix=True, the longest catalog name
+    that is a prefix of the request ending at a "-", ":", "@" or "/" boundary. Prefix
+    matching is off by default because an unknown variant is not priced like its base
+    model ("o1-pro" costs far more than "o1"); unknown names resolve to None instead.
+    Names are normalized first (case, whitespace, Gemini's "models/" prefix). Trie walks
+    keep misses O(len(name)) regardless of catalog size, and resolved names are memoized
+    in a bounded LRU.
+    """
+
+    def __init__(
+        self,
+        rates: Mapping[str, Mapping[str, RateCard]],
+        *,
+        aliases: Mapping[str, Mapping[str, str]] | None = None,
+        allow_prefix: bool = False,
+        memo_size: int = 4096,
+    ) -> None:
+        aliases = aliases or {}
+        self._providers = {
+            provider: _ProviderIndex(models, aliases.get(provider) or {}) for provider, models in rates.items()
+        }
+        self.allow_prefix = allow_prefix
+        self._memo: OrderedDict[tuple[str, str], ResolvedRate | None] = OrderedDict()
+        self._memo_size = max(0, int(memo_size))
+        self._lock = threading.Lock()
+
+    def resolve(self, provider: str, model: str) -> ResolvedRate | None:
+        key = (provider, model)
+        with self._lock:
+            if key in self._memo:
+                self._memo.move_to_end(key)
+                return self._memo[key]
+
+        result = None
+        index = self._providers.get(provider)
+        if index is not None:
+            found = index.resolve(normalize_model_name(model), self.allow_prefix)
+            if found is not None:
+                name, match = found
+                result = ResolvedRate(
+                    provider=provider, requested=model, model=name, rate_card=index.cards[name], match=match
+                )
+
+        if self._memo_size:
+            with self._lock:
+                self._memo[key] = result
+                self._memo.move_to_end(key)
+                while len(self._memo) > self._memo_size:
+                    self._memo.popitem(last=False)
+        return result
+
+    def lookup(self, provider: str, model: str) -> RateCard | None:
+        resolved = self.resolve(provider, model)
+        return resolved.rate_card if resolved else None
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import dataclasses
+import hashlib
+import threading
+from types import MappingProxyType
+from typing import Iterator, Mapping
+
+from spendguard_engine.pricing import RateCard
+from spendguard_engine.rate_index import RateIndex
+
+
+def _provider_digest(models: Mapping[str, RateCard]) -> str:
+    h = hashlib.sha256()
+    for name in sorted(models):
+        h.update(name.encode("utf-8"))
+        h.update(b"\0")
+        h.update(repr(dataclasses.astuple(models[name])).encode("utf-8"))
+        h.update(b"\n")
+    return h.hexdigest()
+
+
+class RateTable(Mapping[str, Mapping[str, RateCard]]):
+    """
+    Immutable, versioned snapshot of a provider -> model -> RateCard table.
+
+    overlay() returns a new snapshot that shares every untouched provider mapping (and its
+    digest) with this one. version is a content hash, so identical tables get identical
+    ids across processes; stamp it into breakdowns via compute_cost_breakdown(rate_version=...).
+    """
+
+    __slots__ = ("_providers", "_digests", "_index", "version")
+
+    def __init__(self, rates: Mapping[str, Mapping[str, RateCard]]) -> None:
+        providers = {provider: MappingProxyType(dict(models)) for provider, models in rates.items()}
+        self._init(providers, {provider: _provider_digest(models) for provider, models in providers.items()})
+
+    def _init(self, providers: dict[str, Mapping[str, RateCard]], digests: dict[str, str]) -> None:
+        self._providers = providers
+        self._digests = digests
+        self._index: RateIndex | None = None
+        h = hashlib.sha256()
+        for provider in sorted(digests):
+            h.update(f"{provider}\0{digests[provider]}\n".encode("utf-8"))
+        self.version = f"rt-{h.hexdigest()[:16]}"
+
+    def overlay(self, overlay: Mapping[str, Mapping[str, RateCard]]) -> RateTable:
+        """Same semantics as merge_rates(copy_rates(table), overlay), without copying untouched providers."""
+        providers = dict(self._providers)
+        digests = dict(self._digests)
+        for provider, models in overlay.items():
+            merged = dict(providers.get(provider) or {})
+            merged.update(models)
+            providers[provider] = MappingProxyType(merged)
+            digests[provider] = _provider_digest(merged)
+        table = RateTable.__new__(RateTable)
+        table._init(providers, digests)
+        return table
+
+    def get_rate(self, provider: str, model: str) -> RateCard | None:
+        models = self._providers.get(provider)
+        return models.get(model) if models is not None else None
+
+    @property
+    def index(self) -> RateIndex:
+        """RateIndex over this snapshot, built on first use."""
+        index = self._index
+        if index is None:
+            index = self._index = RateIndex(self._providers)
+        return index
+
+    def to_rates(self) -> dict[str, dict[str, RateCard]]:
+        """Mutable copy in the copy_rates/merge_rates dict shape."""
+        return {provider: dict(models) for provider, models in self._providers.items()}
+
+    def __getitem__(self, provider: str) -> Mapping[str, RateCard]:
+        return self._providers[provider]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._providers)
+
+    def __len__(self) -> int:
+        return len(self._providers)
+
+    def __repr__(self) -> str:
+        return f"RateTable(version={self.version!r}, providers={len(self._providers)})"
+
+
+class RateTableRef:
+    """
+    Holder for the current RateTable; readers take `current` once per request and
+    get a consistent snapshot, writers publish a new snapshot with one reference swap.
+    """
+
+    def __init__(self, table: RateTable) -> None:
+        self._current = table
+        self._write_lock = threading.Lock()
+
+    @property
+    def current(self) -> RateTable:
+        return self._current
+
+    def swap(self, table: RateTable) -> RateTable:
+        with self._write_lock:
+            previous, self._current = self._current, table
+            return previous
+
+    def apply_overlay(self, overlay: Mapping[str, Mapping[str, RateCard]]) -> RateTable:
+        # Serialize writers so concurrent overlays are not lost; readers never block.
+        with self._write_lock:
+            table = self._current.overlay(overlay)
+            self._current = table
+            return table
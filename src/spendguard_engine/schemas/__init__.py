@@ -1,9 +1,15 @@
-from spendguard_engine.schemas.common import (
-    AgentCreateRequest,
-    AgentCreateResponse,
-    BudgetResponse,
-    BudgetSetRequest,
-)
+from __future__ import annotations
+
+import importlib
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from spendguard_engine.schemas.common import (
+        AgentCreateRequest,
+        AgentCreateResponse,
+        BudgetResponse,
+        BudgetSetRequest,
+    )
 
 __all__ = [
     "AgentCreateRequest",
@@ -11,3 +17,19 @@ __all__ = [
     "BudgetSetRequest",
     "BudgetResponse",
 ]
+
+# Loaded on first attribute access so importing the package does not pull in pydantic.
+_LAZY = {name: "common" for name in __all__}
+
+
+def __getattr__(name: str) -> Any:
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f"{__name__}.{module}"), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Iterable
+
+from spendguard_engine.tokenizers import Tokenizer, estimate_tokens_text_classes, get_default_tokenizer
+
+# Chat formats wrap each message in a few control tokens and prime the reply with a few more.
+MESSAGE_OVERHEAD_TOKENS = 4
+REPLY_PRIMING_TOKENS = 3
+# Flat, conservative charge for an image part (roughly a ~1.15MP image on current providers).
+IMAGE_TOKENS = 1600
+
+_IMAGE_TYPES = frozenset({"image_url", "input_image", "image"})
+# Identifiers and flags that are not sent to the model as text.
+_SKIP_KEYS = frozenset({"type", "id", "call_id", "tool_call_id", "tool_use_id", "cache_control", "status", "signature"})
+# Strings at least this long are memoized; shorter ones are cheaper to rescan.
+_MEMO_MIN_CHARS = 256
+
+
+class TokenEstimator:
+    """
+    Single-pass token estimator for structured prompts (chat messages, Responses payloads,
+    Anthropic content blocks) that never serializes the whole prompt into one string.
+
+    Text is counted with `tokenizer`, else the process default (get_default_tokenizer),
+    else estimate_tokens_text_classes. Counts for long strings are memoized by a 128-bit
+    content digest in an LRU of at most memo_max_entries, so system prompts and earlier
+    turns re-sent on every call are not rescanned and the memo never holds prompt text.
+    """
+
+    def __init__(self, *, tokenizer: Tokenizer | None = None, memo_max_entries: int = 4096) -> None:
+        self._tokenizer = tokenizer
+        # content digest -> (tokenizer that produced the count, count)
+        self._memo: OrderedDict[bytes, tuple[Tokenizer | None, int]] = OrderedDict()
+        self._memo_max_entries = int(memo_max_entries)
+        self._lock = threading.Lock()
+
+    def _count_text(self, tokenizer: Tokenizer | None, text: str) -> int:
+        if tokenizer is not None:
+            return tokenizer.count(text)
+        return estimate_tokens_text_classes(text)
+
+    def text(self, text: str) -> int:
+        tokenizer = self._tokenizer or get_default_tokenizer()
+        if len(text) < _MEMO_MIN_CHARS:
+            return self._count_text(tokenizer, text)
+        key = hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+        with self._lock:
+            cached = self._memo.get(key)
+            if cached is not None and cached[0] is tokenizer:
+                self._memo.move_to_end(key)
+                return cached[1]
+        tokens = self._count_text(tokenizer, text)
+        with self._lock:
+            self._memo[key] = (tokenizer, tokens)
+            self._memo.move_to_end(key)
+            while len(self._memo) > self._memo_max_entries:
+                self._memo.popitem(last=False)
+        return tokens
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memo.clear()
+
+    def walk(self, node: Any) -> int:
+        """Tokens for the text content of an arbitrary message/content-block structure."""
+        if isinstance(node, str):
+            return self.text(node)
+        if isinstance(node, dict):
+            if node.get("type") in _IMAGE_TYPES:
+                return IMAGE_TOKENS
+            total = 0
+            for key, value in node.items():
+                if key in _SKIP_KEYS or value is None or isinstance(value, bool):
+                    continue
+                if key in ("input", "arguments") and isinstance(value, dict):
+                    # Tool-call inputs are sent as JSON, keys included.
+                    total += self.text(json.dumps(value, ensure_ascii=False, separators=(",", ":")))
+                else:
+                    total += self.walk(value)
+            return total
+        if isinstance(node, (list, tuple)):
+            return sum(self.walk(item) for item in node)
+        if isinstance(node, (int, float)):
+            return self.text(str(node))
+        return 0
+
+    def _messages(self, messages: Iterable[Any]) -> int:
+        return sum(MESSAGE_OVERHEAD_TOKENS + self.walk(message) for message in messages)
+
+    def _tools(self, tools: Any) -> int:
+        if not tools:
+            return 0
+        return self.text(json.dumps(tools, ensure_ascii=False, separators=(",", ":")))
+
+    def messages(self, messages: Iterable[dict[str, Any]], *, tools: Any = None) -> int:
+        """OpenAI chat.completions `messages` (plus optional `tools` definitions)."""
+        return REPLY_PRIMING_TOKENS + self._messages(messages) + self._tools(tools)
+
+    def responses(self, payload: dict[str, Any]) -> int:
+        """OpenAI Responses payload: `instructions`, `input` (string or items) and `tools`."""
+        total = REPLY_PRIMING_TOKENS
+        instructions = payload.get("instructions")
+        if isinstance(instructions, str) and instructions:
+            total += MESSAGE_OVERHEAD_TOKENS + self.text(instructions)
+        items = payload.get("input")
+        if isinstance(items, str):
+            total += MESSAGE_OVERHEAD_TOKENS + self.text(items)
+        elif isinstance(items, list):
+            for item in items:
+                overhead = MESSAGE_OVERHEAD_TOKENS if isinstance(item, dict) and "role" in item else 0
+                total += overhead + self.walk(item)
+        return total + self._tools(payload.get("tools"))
+
+    def anthropic(
+        self, system: str | list[dict[str, Any]] | None, messages: Iterable[dict[str, Any]], *, tools: Any = None
+    ) -> int:
+        """Anthropic Messages `system` (string or blocks), `messages` and `tools`."""
+        total = REPLY_PRIMING_TOKENS + self._messages(messages) + self._tools(tools)
+        if system:
+            total += MESSAGE_OVERHEAD_TOKENS + self.walk(system)
+        return total
+
+
+_default_estimator = TokenEstimator()
+
+
+def estimate_tokens_messages(messages: Iterable[dict[str, Any]], *, tools: Any = None) -> int:
+    return _default_estimator.messages(messages, tools=tools)
+
+
+def estimate_tokens_responses(payload: dict[str, Any]) -> int:
+    return _default_estimator.responses(payload)
+
+
+def estimate_tokens_anthropic(
+    system: str | list[dict[str, Any]] | None, messages: Iterable[dict[str, Any]], *, tools: Any = None
+) -> int:
+    return _default_estimator.anthropic(system, messages, tools=tools)
@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import base64
+import functools
+import os
+import re
+import threading
+import weakref
+from typing import TYPE_CHECKING, Protocol, Sequence
+
+if TYPE_CHECKING:
+    from concurrent.futures import Executor, ProcessPoolExecutor
+
+# Local BPE vocabulary (tiktoken format: "<base64 token> <rank>" per line). Never fetched.
+VOCAB_ENV = "SPENDGUARD_TOKENIZER_VOCAB"
+
+# GPT-style pre-tokenization expressed with the stdlib `re` module: contractions,
+# letter runs, up to 3 digits, punctuation runs and whitespace, each with an optional
+# leading space.
+DEFAULT_PRETOKENIZE_PATTERN = (
+    r"""'(?:[sdmt]|ll|ve|re)| ?[^\W\d_]+| ?\d{1,3}| ?[^\s\w]+[\r\n]*|\s*[\r\n]+|\s+(?!\S)|\s+"""
+)
+
+
+def estimate_tokens_text_classes(text: str) -> int:
+    """
+    Estimate tokens for text by codepoint class: ASCII at ~3 chars/token (the
+    estimate_tokens_text heuristic), 2-byte UTF-8 codepoints at ~2 chars/token,
+    3-byte codepoints (CJK etc.) at 1 token each and astral codepoints (emoji) at 2.
+    """
+    if not text:
+        return 0
+    n = len(text)
+    if text.isascii():
+        return max(1, (n + 2) // 3)
+    # Count the classes with C-level encodes instead of a per-character loop:
+    #   utf8_bytes = ascii + 2*two + 3*three + 4*astral
+    #   n          = ascii + two + three + astral
+    ascii_chars = len(text.encode("ascii", "ignore"))
+    utf8_bytes = len(text.encode("utf-8", "surrogatepass"))
+    astral = len(text.encode("utf-16-le", "surrogatepass")) // 2 - n
+    rest = n - ascii_chars - astral
+    three = (utf8_bytes - ascii_chars - 4 * astral) - 2 * rest
+    two = rest - three
+    return max(1, (ascii_chars + 2) // 3 + (two + 1) // 2 + three + 2 * astral)
+
+
+class Tokenizer(Protocol):
+    def count(self, text: str) -> int: ...
+
+    def count_batch(
+        self, texts: Sequence[str], *, workers: int | None = None, executor: Executor | None = None
+    ) -> list[int]: ...
+
+
+def _chunks(texts: Sequence[str], n: int) -> list[Sequence[str]]:
+    size = max(1, -(-len(texts) // n))
+    return [texts[i : i + size] for i in range(0, len(texts), size)]
+
+
+# Per-process BPETokenizers for _bpe_count_chunk, keyed by (vocab_path, pattern, cache_size).
+_worker_tokenizers: dict[tuple[str, str, int], BPETokenizer] = {}
+
+
+def _bpe_count_chunk(vocab_path: str, pattern: str, cache_size: int, texts: Sequence[str]) -> list[int]:
+    # Module-level so it pickles into worker processes; each process loads the vocabulary once.
+    key = (vocab_path, pattern, cache_size)
+    tokenizer = _worker_tokenizers.get(key)
+    if tokenizer is None:
+        tokenizer = _worker_tokenizers[key] = BPETokenizer(vocab_path, pattern=pattern, cache_size=cache_size)
+    return [tokenizer.count(text) for text in texts]
+
+
+class HeuristicTokenizer:
+    """The dependency-free fallback: estimate_tokens_text_classes."""
+
+    def count(self, text: str) -> int:
+        return estimate_tokens_text_classes(text)
+
+    def count_batch(
+        self, texts: Sequence[str], *, workers: int | None = None, executor: Executor | None = None
+    ) -> list[int]:
+        """Counting is a few C-level encodes per string, so `workers` is ignored."""
+        if executor is not None:
+            return list(executor.map(estimate_tokens_text_classes, texts))
+        return [estimate_tokens_text_classes(text) for text in texts]
+
+
+class BPETokenizer:
+    """
+    Byte-pair-encoding tokenizer over a local tiktoken-format vocabulary file.
+
+    The file is read on first use, not at construction, so configuring it costs nothing
+    for processes that never estimate. Encoded pre-token segments are kept in an LRU
+    cache; common words and whitespace runs are encoded once per process.
+
+    count_batch(workers=N) keeps one process pool per tokenizer, created on first use and
+    shut down by close() (or when the tokenizer is collected, or at exit).
+    """
+
+    def __init__(self, vocab_path: str, *, pattern: str = DEFAULT_PRETOKENIZE_PATTERN, cache_size: int = 65_536):
+        self.vocab_path = vocab_path
+        self._pattern = re.compile(pattern)
+        self._cache_size = cache_size
+        self._ranks: dict[bytes, int] | None = None
+        self._load_lock = threading.Lock()
+        self._encode_segment = functools.lru_cache(maxsize=cache_size)(self._bpe)
+        self._pool: ProcessPoolExecutor | None = None
+        self._pool_workers = 0
+        self._pool_finalizer: weakref.finalize | None = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._ranks is not None
+
+    def _load(self) -> dict[bytes, int]:
+        ranks = self._ranks
+        if ranks is not None:
+            return ranks
+        with self._load_lock:
+            if self._ranks is None:
+                loaded: dict[bytes, int] = {}
+                with open(self.vocab_path, "rb") as f:
+                    for lineno, line in enumerate(f, 1):
+                        line = line.strip()
+                        if not line:
+                            continue
+                        try:
+                            token, rank = line.split()
+                            loaded[base64.b64decode(token)] = int(rank)
+                        except ValueError as exc:
+                            raise ValueError(f"{self.vocab_path}:{lineno}: invalid vocabulary line") from exc
+                self._ranks = loaded
+            return self._ranks
+
+    def _bpe(self, segment: bytes) -> tuple[int, ...]:
+        ranks = self._load()
+        rank = ranks.get(segment)
+        if rank is not None:
+            return (rank,)
+        parts = [segment[i : i + 1] for i in range(len(segment))]
+        while len(parts) > 1:
+            best_rank = None
+            best_i = -1
+            for i in range(len(parts) - 1):
+                r = ranks.get(parts[i] + parts[i + 1])
+                if r is not None and (best_rank is None or r < best_rank):
+                    best_rank, best_i = r, i
+            if best_rank is None:
+                break
+            parts[best_i : best_i + 2] = [parts[best_i] + parts[best_i + 1]]
+        # Bytes missing from the vocabulary (incomplete files) count as one token each (-1).
+        return tuple(ranks.get(part, -1) for part in parts)
+
+    def encode(self, text: str) -> list[int]:
+        out: list[int] = []
+        for segment in self._pattern.findall(text):
+            out.extend(self._encode_segment(segment.encode("utf-8", "surrogatepass")))
+        return out
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        return sum(len(self._encode_segment(s.encode("utf-8", "surrogatepass"))) for s in self._pattern.findall(text))
+
+    def count_batch(
+        self, texts: Sequence[str], *, workers: int | None = None, executor: Executor | None = None
+    ) -> list[int]:
+        """
+        Count many strings, optionally across `workers` processes (or a caller-supplied executor).
+
+        BPE merging is pure Python and holds the GIL, so threads do not speed it up; the
+        texts are split into chunks counted by a picklable worker that loads the vocabulary
+        once per process. The tokenizer's pool is reused across calls, so each worker
+        process pays the vocabulary load only once.
+        """
+        if executor is None and (workers is None or workers <= 1 or len(texts) < 2):
+            return [self.count(text) for text in texts]
+        worker = functools.partial(_bpe_count_chunk, self.vocab_path, self._pattern.pattern, self._cache_size)
+        chunks = _chunks(texts, 4 * (workers or os.cpu_count() or 1))
+        pool = executor if executor is not None else self._process_pool(workers or 1)
+        return [n for counts in pool.map(worker, chunks) for n in counts]
+
+    def _process_pool(self, workers: int) -> ProcessPoolExecutor:
+        with self._load_lock:
+            if self._pool is None or self._pool_workers != workers:
+                from concurrent.futures import ProcessPoolExecutor
+
+                self._close_pool()
+                self._pool = ProcessPoolExecutor(max_workers=workers)
+                self._pool_workers = workers
+                self._pool_finalizer = weakref.finalize(self, self._pool.shutdown)
+            return self._pool
+
+    def _close_pool(self) -> None:
+        if self._pool_finalizer is not None:
+            self._pool_finalizer()
+        self._pool = self._pool_finalizer = None
+
+    def close(self) -> None:
+        """Shut down the count_batch worker processes, if any."""
+        with self._load_lock:
+            self._close_pool()
+
+    def cache_info(self) -> functools._CacheInfo:
+        return self._encode_segment.cache_info()
+
+
+_default_lock = threading.Lock()
+_default_tokenizer: Tokenizer | None = None
+_default_resolved = False
+
+
+def get_default_tokenizer() -> Tokenizer | None:
+    """
+    The process-wide tokenizer used by the pricing estimators, or None for the built-in
+    heuristic. Defaults to a BPETokenizer over $SPENDGUARD_TOKENIZER_VOCAB when set and
+    the file exists; a missing file falls back to the heuristic rather than failing estimates.
+    """
+    global _default_tokenizer, _default_resolved
+    if not _default_resolved:
+        with _default_lock:
+            if not _default_resolved:
+                path = os.getenv(VOCAB_ENV, "").strip()
+                _default_tokenizer = BPETokenizer(path) if path and os.path.isfile(path) else None
+                _default_resolved = True
+    return _default_tokenizer
+
+
+def set_default_tokenizer(tokenizer: Tokenizer | None) -> None:
+    """Override the process-wide tokenizer; None restores the heuristic."""
+    global _default_tokenizer, _default_resolved
+    with _default_lock:
+        _default_tokenizer = tokenizer
+        _default_resolved = True
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field, fields
+from typing import Any, Iterator
+
+
+@dataclass(slots=True)
+class NormalizedUsage:
+    """
+    Provider usage in compute_cost_breakdown's terms: input_tokens is all prompt tokens
+    (cached, cache-write and cache-read included) and output_tokens all generated tokens
+    (reasoning included). Filled by the normalize_*_usage functions in one pass over a payload.
+
+    Behaves as a mapping of those keyword arguments, so it can be splatted into
+    compute_cost_breakdown / compute_cost_totals / LazyCostBreakdown:
+    compute_cost_breakdown(provider=..., model=..., rate_card=..., **usage).
+    """
+
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cached_input_tokens: int = 0
+    reasoning_tokens: int = 0
+    cache_write_input_tokens: int = 0
+    cache_read_input_tokens: int = 0
+    grounding_queries: int = 0
+    # Observed tool invocations by item type, e.g. {"web_search_call": 2}.
+    tool_calls: dict[str, int] = field(default_factory=dict)
+
+    def keys(self) -> tuple[str, ...]:
+        return _FIELDS
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in _FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(_FIELDS)
+
+    def __len__(self) -> int:
+        return len(_FIELDS)
+
+
+_FIELDS = tuple(f.name for f in fields(NormalizedUsage))
+
+
+def coerce_count(value: Any) -> int:
+    """Non-negative int from a usage field that may be missing, None or a float."""
+    if value is None or isinstance(value, bool):
+        return 0
+    try:
+        return max(0, int(value))
+    except (TypeError, ValueError):
+        return 0
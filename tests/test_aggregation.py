@@ -0,0 +1,76 @@
+import json
+import unittest
+
+from spendguard_engine.aggregation import SpendAggregator
+from spendguard_engine.billing import compute_cost_breakdown
+from spendguard_engine.pricing import RateCard
+
+CARD = RateCard(input_cents_per_1m=30, output_cents_per_1m=120, cached_input_cents_per_1m=3)
+
+
+class TestSpendAggregator(unittest.TestCase):
+    def test_rolls_up_breakdowns_and_usage(self):
+        agg = SpendAggregator(window_seconds=60)
+        b = compute_cost_breakdown(
+            provider="openai", model="gpt-4o-mini", rate_card=CARD, input_tokens=100, output_tokens=10
+        )
+        agg.add_breakdown(b, agent_id="a1", timestamp=120)
+        agg.add_usage(
+            agent_id="a1",
+            provider="openai",
+            model="gpt-4o-mini",
+            rate_card=CARD,
+            timestamp=150,
+            input_tokens=100,
+            output_tokens=10,
+        )
+        self.assertEqual(agg.total_microcents(), 2 * b["totals"]["realized_microcents"])
+        self.assertEqual(agg.total_microcents(charge="output_tokens"), 2 * 1200)
+        self.assertEqual(len(agg), 2)  # input_tokens + output_tokens in a single window
+        rows = list(agg.items())
+        self.assertEqual(rows[0][1], 120)
+
+    def test_window_expiry_bounds_memory(self):
+        agg = SpendAggregator(window_seconds=60, retention_windows=2)
+        for minute in range(10):
+            agg.add_usage(
+                agent_id="a1",
+                provider="openai",
+                model="m",
+                rate_card=CARD,
+                timestamp=minute * 60,
+                input_tokens=1,
+                output_tokens=0,
+            )
+        self.assertEqual(agg.total_microcents(), 2 * 30)
+        agg.add_usage(
+            agent_id="a1", provider="openai", model="m", rate_card=CARD, timestamp=0, input_tokens=1, output_tokens=0
+        )
+        self.assertEqual(agg.dropped_late, 2)  # input_tokens and output_tokens charges
+        agg.expire(now=60 * 100)
+        self.assertEqual(len(agg), 0)
+
+    def test_state_round_trip_and_merge(self):
+        w1 = SpendAggregator(window_seconds=60)
+        w2 = SpendAggregator(window_seconds=60)
+        w1.add_usage(
+            agent_id="a1", provider="openai", model="m", rate_card=CARD, timestamp=60, input_tokens=10, output_tokens=1
+        )
+        w2.add_usage(
+            agent_id="a1", provider="openai", model="m", rate_card=CARD, timestamp=90, input_tokens=10, output_tokens=1
+        )
+        w2.add_usage(
+            agent_id="a2", provider="openai", model="m", rate_card=CARD, timestamp=90, input_tokens=10, output_tokens=1
+        )
+
+        merged = SpendAggregator.from_state(json.loads(json.dumps(w1.state())))
+        merged.merge(json.loads(json.dumps(w2.state())))
+        self.assertEqual(merged.total_microcents(agent_id="a1"), 2 * (300 + 120))
+        self.assertEqual(merged.total_microcents(agent_id="a2"), 300 + 120)
+
+        with self.assertRaises(ValueError):
+            SpendAggregator(window_seconds=30).merge(w1)
+
+
+if __name__ == "__main__":
+    unittest.main()
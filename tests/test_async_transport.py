@@ -0,0 +1,223 @@
+import asyncio
+import http.client
+import json
+import unittest
+
+from spendguard_engine.providers.anthropic_provider import acall_anthropic_messages, extract_anthropic_usage
+from spendguard_engine.providers.async_transport import AsyncHTTPTransport
+from spendguard_engine.providers.gemini_provider import acall_gemini_generate_content, extract_gemini_usage
+from spendguard_engine.providers.openai_provider import acall_openai_chat, acall_openai_responses
+
+
+class _StubServer:
+    """Minimal HTTP/1.1 server; the request path picks the response framing."""
+
+    def __init__(self):
+        self.requests = []
+        self.responses = {}
+        self.connections = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        return f"http://127.0.0.1:{self.server.sockets[0].getsockname()[1]}"
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    return
+                method, path, _ = line.decode().split(" ", 2)
+                headers = {}
+                while (line := await reader.readline()) not in (b"\r\n", b""):
+                    name, _, value = line.decode().partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                self.requests.append((path, headers, body))
+                if path.startswith("/vanish"):
+                    # Read the request, then close instead of answering.
+                    return
+                self.in_flight += 1
+                self.max_in_flight = max(self.max_in_flight, self.in_flight)
+                try:
+                    if path.startswith("/slow"):
+                        await asyncio.sleep(0.2)
+                    status, payload = self.responses.get(path, (200, {"ok": True}))
+                    data = json.dumps(payload).encode()
+                    reason = b"OK" if status == 200 else b"Error"
+                    if path.startswith("/chunked"):
+                        writer.write(b"HTTP/1.1 %d %s\r\nTransfer-Encoding: chunked\r\n\r\n" % (status, reason))
+                        for i in range(0, len(data), 3):
+                            piece = data[i : i + 3]
+                            writer.write(b"%x\r\n%s\r\n" % (len(piece), piece))
+                        writer.write(b"0\r\n\r\n")
+                    elif path.startswith("/long-header"):
+                        writer.write(b"HTTP/1.1 200 OK\r\nX-Long: %s\r\n\r\n" % (b"a" * 70_000))
+                    elif path.startswith("/eof"):
+                        writer.write(b"HTTP/1.1 %d %s\r\nConnection: close\r\n\r\n%s" % (status, reason, data))
+                        await writer.drain()
+                        writer.close()
+                        return
+                    else:
+                        writer.write(
+                            b"HTTP/1.1 %d %s\r\nContent-Length: %d\r\n\r\n%s" % (status, reason, len(data), data)
+                        )
+                    await writer.drain()
+                finally:
+                    self.in_flight -= 1
+                if path.startswith("/drop"):
+                    writer.close()
+                    return
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+class TestAsyncHTTPTransport(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.stub = _StubServer()
+        self.base_url = await self.stub.start()
+        self.transport = AsyncHTTPTransport(timeout=5)
+
+    async def asyncTearDown(self):
+        await self.transport.aclose()
+        await self.stub.stop()
+
+    async def test_keep_alive_and_body_framings(self):
+        for path in ("/x", "/chunked", "/x", "/chunked"):
+            resp = await self.transport.request("POST", f"{self.base_url}{path}", body=b"{}")
+            self.assertEqual(resp.status, 200)
+            self.assertEqual(resp.json(), {"ok": True})
+        self.assertEqual(self.transport.connections_opened, 1)
+
+        resp = await self.transport.request("POST", f"{self.base_url}/eof", body=b"{}")
+        self.assertEqual(resp.json(), {"ok": True})
+        self.assertEqual(self.transport.idle_connections(), 0)
+
+    async def test_stale_connection_is_retried(self):
+        await self.transport.request("POST", f"{self.base_url}/drop", body=b"")
+        await asyncio.sleep(0.05)
+        resp = await self.transport.request("POST", f"{self.base_url}/x", body=b"")
+        self.assertTrue(resp.ok)
+        self.assertEqual(self.transport.connections_opened, 2)
+
+    async def test_many_concurrent_requests_share_a_bounded_pool(self):
+        transport = AsyncHTTPTransport(timeout=5, max_connections_per_host=20)
+        results = await asyncio.gather(
+            *(transport.request("POST", f"{self.base_url}/x", body=b"{}") for _ in range(500))
+        )
+        self.assertTrue(all(r.ok for r in results))
+        self.assertLessEqual(transport.connections_opened, 20)
+        self.assertLessEqual(self.stub.max_in_flight, 20)
+        await transport.aclose()
+
+    async def test_cancellation_frees_the_slot(self):
+        transport = AsyncHTTPTransport(timeout=5, max_connections_per_host=1)
+        task = asyncio.create_task(transport.request("POST", f"{self.base_url}/slow", body=b""))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        resp = await asyncio.wait_for(transport.request("POST", f"{self.base_url}/x", body=b""), 2)
+        self.assertTrue(resp.ok)
+        self.assertEqual(transport.connections_opened, 2)
+        await transport.aclose()
+
+    async def test_timeout(self):
+        with self.assertRaises(TimeoutError):
+            await self.transport.request("POST", f"{self.base_url}/slow", body=b"", timeout=0.05)
+
+    async def test_sent_post_is_not_resent(self):
+        await self.transport.request("POST", f"{self.base_url}/x", body=b"")
+        with self.assertRaises(ConnectionError):
+            await self.transport.request("POST", f"{self.base_url}/vanish", body=b"")
+        self.assertEqual([path for path, _, _ in self.stub.requests].count("/vanish"), 1)
+
+    async def test_overlong_lines(self):
+        with self.assertRaises(http.client.LineTooLong):
+            await self.transport.request("POST", f"{self.base_url}/long-header", body=b"")
+
+    async def test_rejects_header_injection(self):
+        url = f"{self.base_url}/x"
+        for headers in (
+            {"X-Ok": "a\r\nX-Injected: 1"},
+            {"X-Ok": "a\nb"},
+            {"X-Ok": "a\0b"},
+            {"X-Bad\r\nX-Injected": "1"},
+            {"X Bad": "1"},
+            {"": "1"},
+        ):
+            with self.assertRaises(ValueError):
+                await self.transport.request("POST", url, body=b"", headers=headers)
+        with self.assertRaises(ValueError):
+            await self.transport.request("POST /x HTTP/1.1\r\nX:", url, body=b"")
+        self.assertEqual(self.transport.connections_opened, 0)
+        resp = await self.transport.request("POST", url, body=b"", headers={"X-Ok": "a b\tc"})
+        self.assertTrue(resp.ok)
+
+    async def test_pool_timeout(self):
+        transport = AsyncHTTPTransport(timeout=5, max_connections_per_host=1, pool_timeout=0.05)
+        slow = asyncio.create_task(transport.request("POST", f"{self.base_url}/slow", body=b""))
+        await asyncio.sleep(0.05)
+        with self.assertRaises(TimeoutError):
+            await transport.request("POST", f"{self.base_url}/x", body=b"")
+        await slow
+        await transport.aclose()
+
+    async def test_anthropic_and_gemini_adapters(self):
+        self.stub.responses["/v1/messages"] = (200, {"content": [], "usage": {"input_tokens": 5, "output_tokens": 7}})
+        out = await acall_anthropic_messages(
+            "key", "claude", None, [], None, 10, transport=self.transport, base_url=self.base_url
+        )
+        self.assertEqual(extract_anthropic_usage(out), (5, 7))
+        self.assertEqual(self.stub.requests[-1][1]["x-api-key"], "key")
+
+        path = "/v1beta/models/gemini-pro:generateContent"
+        self.stub.responses[path] = (200, {"usageMetadata": {"promptTokenCount": 1, "candidatesTokenCount": 2}})
+        out = await acall_gemini_generate_content(
+            "key", "gemini-pro", "hi", None, 10, transport=self.transport, base_url=self.base_url
+        )
+        self.assertEqual(extract_gemini_usage(out), (1, 2))
+
+        self.stub.responses[path] = (400, {"error": "bad"})
+        with self.assertRaisesRegex(RuntimeError, "Gemini request failed: .*bad"):
+            await acall_gemini_generate_content(
+                "key", "gemini-pro", "hi", None, 10, transport=self.transport, base_url=self.base_url
+            )
+
+
+class _Endpoint:
+    def __init__(self):
+        self.calls = []
+
+    async def create(self, **kwargs):
+        self.calls.append(kwargs)
+        return {"echo": kwargs}
+
+
+class _AsyncClient:
+    def __init__(self):
+        self.chat = type("Chat", (), {"completions": _Endpoint()})()
+        self.responses = _Endpoint()
+
+
+class TestAsyncOpenAI(unittest.IsolatedAsyncioTestCase):
+    async def test_async_calls_clamp_like_sync(self):
+        client = _AsyncClient()
+        await acall_openai_chat(client, "gpt-4o", [{"role": "user", "content": "hi"}], None, 10**9, False)
+        self.assertLessEqual(client.chat.completions.calls[0]["max_tokens"], 16384)
+        await acall_openai_responses(client, {"model": "gpt-4o", "input": "hi"}, 10**9)
+        self.assertLessEqual(client.responses.calls[0]["max_output_tokens"], 16384)
+        self.assertEqual(client.responses.calls[0]["input"], "hi")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,187 @@
+import json
+import os
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from spendguard_engine.billing import compile_rate_card, compute_cost_breakdown, compute_cost_totals
+from spendguard_engine.pricing import RateCard
+from spendguard_engine.providers.anthropic_provider import normalize_anthropic_usage, run_anthropic_batch
+from spendguard_engine.providers.batch import BatchRequest
+from spendguard_engine.providers.openai_provider import (
+    encode_openai_batch_file,
+    normalize_openai_usage,
+    run_openai_batch,
+    wait_openai_batch,
+)
+from spendguard_engine.providers.transport import HTTPTransport
+
+CARD = RateCard(input_cents_per_1m=300, output_cents_per_1m=1500, batch_discount_percent=50)
+
+
+def _usage_message(custom_id):
+    return {"id": f"msg_{custom_id}", "content": [], "usage": {"input_tokens": 10, "output_tokens": 3}}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, payload, status=200):
+        data = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        server = self.server
+        if self.path == "/v1/messages/batches":
+            server.anthropic_requests = json.loads(body)["requests"]
+            self._send({"id": "msgbatch_1", "type": "message_batch", "processing_status": "in_progress"})
+        elif self.path == "/v1/files":
+            # Multipart upload: keep the JSONL lines of the file part.
+            server.openai_lines = [json.loads(line) for line in body.splitlines() if line.startswith(b'{"custom_id"')]
+            self._send({"id": "file-in", "object": "file", "purpose": "batch", "filename": "batch.jsonl"})
+        elif self.path == "/v1/batches":
+            server.openai_batch = json.loads(body)
+            self._send({"id": "batch_1", "object": "batch", "status": "validating", **server.openai_batch})
+        else:
+            self._send({"error": "not found"}, 404)
+
+    def do_GET(self):
+        server = self.server
+        server.polls[self.path] = server.polls.get(self.path, 0) + 1
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        if self.path == "/v1/messages/batches/msgbatch_1":
+            ended = server.polls[self.path] >= 2
+            batch = {"id": "msgbatch_1", "processing_status": "ended" if ended else "in_progress"}
+            if ended:
+                batch["results_url"] = f"{base}/v1/messages/batches/msgbatch_1/results"
+            self._send(batch)
+        elif self.path == "/v1/messages/batches/msgbatch_1/results":
+            lines = []
+            for request in server.anthropic_requests:
+                if request["custom_id"] == "bad":
+                    result = {"type": "errored", "error": {"type": "invalid_request_error"}}
+                else:
+                    result = {"type": "succeeded", "message": _usage_message(request["custom_id"])}
+                lines.append(json.dumps({"custom_id": request["custom_id"], "result": result}).encode())
+            self._send(b"\n".join(lines) + b"\n")
+        elif self.path == "/v1/batches/batch_1":
+            done = server.polls[self.path] >= 3
+            batch = {"id": "batch_1", "object": "batch", "status": "completed" if done else "in_progress"}
+            if done:
+                batch.update(output_file_id="file-out", error_file_id="file-err")
+            self._send(batch)
+        elif self.path in ("/v1/files/file-out/content", "/v1/files/file-err/content"):
+            ok = self.path == "/v1/files/file-out/content"
+            lines = []
+            for line in server.openai_lines:
+                if (line["custom_id"] != "bad") != ok:
+                    continue
+                if ok:
+                    usage = {"input_tokens": 100, "output_tokens": 20, "output_tokens_details": {"reasoning_tokens": 0}}
+                    response = {"status_code": 200, "body": {"id": "resp", "output": [], "usage": usage}}
+                else:
+                    response = {"status_code": 400, "body": {"error": {"message": "bad request"}}}
+                lines.append(json.dumps({"custom_id": line["custom_id"], "response": response, "error": None}).encode())
+            self._send(b"\n".join(lines) + b"\n")
+        else:
+            self._send({"error": "not found"}, 404)
+
+
+class TestBatchDiscountPricing(unittest.TestCase):
+    def test_discount_applies_only_to_batch_records(self):
+        usage = {"input_tokens": 1001, "output_tokens": 7}
+        full = compute_cost_totals(rate_card=CARD, **usage).realized_microcents
+        self.assertEqual(full, 1001 * 300 + 7 * 1500)
+        self.assertEqual(compute_cost_totals(rate_card=CARD, batch_api=True, **usage).realized_microcents, 155_400)
+        breakdown = compute_cost_breakdown(provider="anthropic", model="m", rate_card=CARD, batch_api=True, **usage)
+        self.assertTrue(breakdown["batch_api"])
+        self.assertEqual(breakdown["charges"][-1]["name"], "batch_discount")
+        self.assertEqual(sum(c["cost_microcents"] for c in breakdown["charges"]), 155_400)
+        self.assertEqual(breakdown["totals"]["realized_microcents"], 155_400)
+        plain = RateCard(input_cents_per_1m=300, output_cents_per_1m=1500)
+        self.assertEqual(compute_cost_totals(rate_card=plain, batch_api=True, **usage).realized_microcents, full)
+        self.assertIn("batch_discount", compile_rate_card(CARD).components)
+        with self.assertRaises(ValueError):
+            compile_rate_card(RateCard(input_cents_per_1m=1, output_cents_per_1m=1, batch_discount_percent=101))
+
+
+class TestBatchAdapters(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self.server.daemon_threads = True
+        self.server.polls = {}
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.requests = [
+            BatchRequest("a", {"model": "m", "max_tokens": 10, "messages": []}),
+            BatchRequest("bad", {"model": "m", "max_tokens": 10, "messages": []}),
+            BatchRequest("b", {"model": "m", "max_tokens": 10, "messages": []}),
+        ]
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_anthropic_round_trip(self):
+        transport = HTTPTransport(timeout=5)
+        sleeps = []
+        results = list(
+            run_anthropic_batch(
+                "key",
+                self.requests,
+                poll_interval=7,
+                sleep=sleeps.append,
+                transport=transport,
+                base_url=self.base_url,
+            )
+        )
+        transport.close()
+        self.assertEqual(sleeps, [7])
+        self.assertEqual([r.custom_id for r in results], ["a", "bad", "b"])
+        self.assertEqual([r.ok for r in results], [True, False, True])
+        self.assertEqual(results[1].error["type"], "errored")
+        totals = sum(
+            compute_cost_totals(rate_card=CARD, batch_api=True, **normalize_anthropic_usage(r.body)).realized_microcents
+            for r in results
+            if r.ok
+        )
+        self.assertEqual(totals, 2 * (10 * 150 + 3 * 750))
+
+    def test_openai_round_trip(self):
+        from openai import OpenAI
+
+        os.environ.pop("CAP_OPENAI_MAX_OUTPUT_TOKENS", None)
+        client = OpenAI(api_key="key", base_url=f"{self.base_url}/v1", max_retries=0)
+        requests = [
+            BatchRequest(r.custom_id, {"model": "m", "input": "hi", "max_output_tokens": 99_999}) for r in self.requests
+        ]
+        results = list(run_openai_batch(client, requests, sleep=lambda s: None))
+        self.assertEqual(self.server.openai_batch["endpoint"], "/v1/responses")
+        self.assertEqual([line["body"]["max_output_tokens"] for line in self.server.openai_lines], [16384] * 3)
+        self.assertEqual(sorted(r.custom_id for r in results if r.ok), ["a", "b"])
+        failed = [r for r in results if not r.ok]
+        self.assertEqual((failed[0].custom_id, failed[0].error["error"]["message"]), ("bad", "bad request"))
+        usage = normalize_openai_usage(results[0].body)
+        self.assertEqual(compute_cost_totals(rate_card=CARD, batch_api=True, **usage).realized_microcents, 30_000)
+
+        with self.assertRaises(TimeoutError):
+            self.server.polls.clear()
+            wait_openai_batch(client, "batch_1", poll_interval=10, max_wait=5, sleep=lambda s: None)
+
+    def test_rejects_bad_batches(self):
+        with self.assertRaises(ValueError):
+            encode_openai_batch_file([BatchRequest("a", {}), BatchRequest("a", {})])
+        with self.assertRaises(ValueError):
+            encode_openai_batch_file([])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+import random
+import unittest
+
+from spendguard_engine.billing import compute_cost_breakdown, compute_cost_totals_batch
+from spendguard_engine.pricing import RateCard
+
+CARDS = [
+    RateCard(input_cents_per_1m=30, output_cents_per_1m=120),
+    RateCard(
+        input_cents_per_1m=30,
+        output_cents_per_1m=120,
+        cached_input_cents_per_1m=3,
+        reasoning_output_cents_per_1m=500,
+    ),
+    RateCard(
+        input_cents_per_1m=300,
+        output_cents_per_1m=1500,
+        cache_write_input_cents_per_1m=375,
+        cache_read_input_cents_per_1m=30,
+        context_cliff_threshold_tokens=200_000,
+        context_cliff_input_multiplier=2.0,
+        context_cliff_output_multiplier=1.5,
+    ),
+    RateCard(
+        input_cents_per_1m=7,
+        output_cents_per_1m=13,
+        uncached_input_cents_per_1m=9,
+        grounding_cents_per_1k_queries=1400,
+        web_search_cents_per_call=2,
+        file_search_cents_per_call=7,
+        context_cliff_threshold_tokens=100,
+        context_cliff_input_multiplier=1.3333,
+    ),
+]
+
+
+class TestBillingBatch(unittest.TestCase):
+    def test_matches_scalar_breakdown(self):
+        rng = random.Random(1234)
+        rows = 2000
+        cols = {
+            "rate_card_index": [rng.randrange(len(CARDS)) for _ in range(rows)],
+            "input_tokens": [rng.choice([0, -5, 1, 99, 101, 250_000, rng.randrange(400_000)]) for _ in range(rows)],
+            "output_tokens": [rng.choice([0, -1, 1, rng.randrange(50_000)]) for _ in range(rows)],
+            "cached_input_tokens": [rng.choice([None, 0, -3, rng.randrange(300_000)]) for _ in range(rows)],
+            "reasoning_tokens": [rng.choice([None, 0, rng.randrange(60_000)]) for _ in range(rows)],
+            "cache_write_input_tokens": [rng.choice([None, 0, rng.randrange(300_000)]) for _ in range(rows)],
+            "cache_read_input_tokens": [rng.choice([None, 0, rng.randrange(300_000)]) for _ in range(rows)],
+            "grounding_queries": [rng.choice([None, 0, -2, rng.randrange(20)]) for _ in range(rows)],
+            "web_search_calls": [rng.choice([None, 0, -1, rng.randrange(5)]) for _ in range(rows)],
+            "file_search_calls": [rng.choice([None, 0, rng.randrange(5)]) for _ in range(rows)],
+        }
+        out = compute_cost_totals_batch(rate_cards=CARDS, **cols)
+
+        for i in range(rows):
+            b = compute_cost_breakdown(
+                provider="p",
+                model="m",
+                rate_card=CARDS[cols["rate_card_index"][i]],
+                input_tokens=cols["input_tokens"][i],
+                output_tokens=cols["output_tokens"][i],
+                cached_input_tokens=cols["cached_input_tokens"][i],
+                reasoning_tokens=cols["reasoning_tokens"][i],
+                cache_write_input_tokens=cols["cache_write_input_tokens"][i],
+                cache_read_input_tokens=cols["cache_read_input_tokens"][i],
+                grounding_queries=cols["grounding_queries"][i],
+                tool_calls={
+                    "web_search_call": cols["web_search_calls"][i],
+                    "file_search_call": cols["file_search_calls"][i],
+                },
+            )
+            self.assertEqual(out.realized_microcents[i], b["totals"]["realized_microcents"], i)
+            self.assertEqual(out.realized_cents_ceiled[i], b["totals"]["realized_cents_ceiled"], i)
+
+    def test_optional_columns_default_to_zero(self):
+        out = compute_cost_totals_batch(
+            rate_cards=CARDS[:1],
+            rate_card_index=[0, 0],
+            input_tokens=[11, 0],
+            output_tokens=[1, 0],
+        )
+        self.assertEqual(out.realized_microcents, [450, 0])
+        self.assertEqual(out.realized_cents_ceiled, [1, 0])
+
+    def test_column_length_mismatch(self):
+        with self.assertRaises(ValueError):
+            compute_cost_totals_batch(
+                rate_cards=CARDS[:1],
+                rate_card_index=[0, 0],
+                input_tokens=[1],
+                output_tokens=[1, 1],
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
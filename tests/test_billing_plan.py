@@ -0,0 +1,71 @@
+import unittest
+
+from spendguard_engine.billing import apply_context_cliff_to_rates, compile_rate_card, compute_cost_breakdown
+from spendguard_engine.pricing import RateCard
+
+
+class TestBillingPlan(unittest.TestCase):
+    def test_plan_is_cached_per_card_value(self):
+        card = RateCard(input_cents_per_1m=30, output_cents_per_1m=120)
+        self.assertIs(
+            compile_rate_card(card), compile_rate_card(RateCard(input_cents_per_1m=30, output_cents_per_1m=120))
+        )
+        # A refreshed card with different values gets its own plan.
+        refreshed = RateCard(input_cents_per_1m=31, output_cents_per_1m=120)
+        self.assertIsNot(compile_rate_card(card), compile_rate_card(refreshed))
+        self.assertEqual(compile_rate_card(refreshed).base_rates.input, 31)
+
+    def test_resolves_fallback_rates(self):
+        plan = compile_rate_card(RateCard(input_cents_per_1m=30, output_cents_per_1m=120, cached_input_cents_per_1m=3))
+        self.assertEqual(plan.base_rates.cached_input, 3)
+        self.assertEqual(plan.base_rates.uncached_input, 30)
+        self.assertEqual(plan.base_rates.cache_write_input, 30)
+        self.assertEqual(plan.base_rates.cache_read_input, 30)
+        self.assertIsNone(plan.cliff_threshold_tokens)
+        self.assertEqual(plan.components, ())
+
+    def test_premultiplied_cliff_rates(self):
+        card = RateCard(
+            input_cents_per_1m=300,
+            output_cents_per_1m=1500,
+            context_cliff_threshold_tokens=200_000,
+            context_cliff_input_multiplier=2.0,
+            context_cliff_output_multiplier=1.5,
+        )
+        plan = compile_rate_card(card)
+        self.assertEqual(plan.cliff_threshold_tokens, 200_000)
+        self.assertEqual(plan.rates_for(200_000), (plan.base_rates, False))
+        rates, applied = plan.rates_for(200_001)
+        self.assertTrue(applied)
+        self.assertEqual((rates.input, rates.output), (600, 2250))
+        self.assertEqual(apply_context_cliff_to_rates(card, 200_001)[:3], (600, 2250, True))
+
+        b = compute_cost_breakdown(
+            provider="anthropic",
+            model="claude",
+            rate_card=card,
+            input_tokens=200_001,
+            output_tokens=10,
+        )
+        self.assertTrue(b["cliff"]["applied"])
+        self.assertEqual(b["totals"]["realized_microcents"], 200_001 * 600 + 10 * 2250)
+        self.assertEqual(plan.realized_microcents(200_001, 10), b["totals"]["realized_microcents"])
+
+    def test_components(self):
+        plan = compile_rate_card(
+            RateCard(
+                input_cents_per_1m=30,
+                output_cents_per_1m=120,
+                reasoning_output_cents_per_1m=500,
+                web_search_cents_per_call=2,
+            )
+        )
+        self.assertEqual(plan.components, ("output_tokens_reasoning", "tool_web_search_call"))
+        self.assertEqual(
+            plan.realized_microcents(10, 5, reasoning_tokens=2, web_search_calls=1),
+            10 * 30 + 3 * 120 + 2 * 500 + 2_000_000,
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+
+from spendguard_engine.billing import LazyCostBreakdown, compute_cost_breakdown, compute_cost_totals
+from spendguard_engine.pricing import RateCard
+
+CARD = RateCard(
+    input_cents_per_1m=30,
+    output_cents_per_1m=120,
+    cached_input_cents_per_1m=3,
+    reasoning_output_cents_per_1m=500,
+    web_search_cents_per_call=2,
+    context_cliff_threshold_tokens=100,
+    context_cliff_input_multiplier=1.5,
+)
+
+USAGE = {
+    "input_tokens": 150,
+    "output_tokens": 20,
+    "cached_input_tokens": 999,  # clamps to 150
+    "reasoning_tokens": 5,
+    "tool_calls": {"web_search_call": 1},
+}
+
+
+class TestBillingTotals(unittest.TestCase):
+    def test_totals_match_breakdown(self):
+        b = compute_cost_breakdown(provider="openai", model="m", rate_card=CARD, **USAGE)
+        totals = compute_cost_totals(rate_card=CARD, **USAGE)
+        self.assertEqual(totals.realized_microcents, b["totals"]["realized_microcents"])
+        self.assertEqual(totals.realized_cents_ceiled, b["totals"]["realized_cents_ceiled"])
+
+    def test_totals_rounding(self):
+        card = RateCard(input_cents_per_1m=30, output_cents_per_1m=120)
+        self.assertEqual(compute_cost_totals(rate_card=card, input_tokens=11, output_tokens=1), (450, 1))
+
+    def test_lazy_breakdown_builds_on_demand(self):
+        lazy = LazyCostBreakdown(provider="openai", model="m", rate_card=CARD, **USAGE)
+        b = compute_cost_breakdown(provider="openai", model="m", rate_card=CARD, **USAGE)
+
+        self.assertEqual(lazy["totals"], b["totals"])
+        self.assertFalse(lazy.materialized)
+
+        self.assertEqual(lazy.to_dict(), b)
+        self.assertTrue(lazy.materialized)
+        self.assertIs(lazy.to_dict(), lazy.to_dict())
+        self.assertEqual(lazy["charges"], b["charges"])
+
+
+if __name__ == "__main__":
+    unittest.main()
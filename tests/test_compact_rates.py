@@ -0,0 +1,103 @@
+import random
+import unittest
+
+from spendguard_engine.billing import compile_rate_card, compute_cost_breakdown, compute_cost_totals
+from spendguard_engine.compact_rates import CompactRateTable, RateRow
+from spendguard_engine.pricing import DEFAULT_RATES, RateCard
+
+CLIFF_CARD = RateCard(
+    input_cents_per_1m=300,
+    output_cents_per_1m=1500,
+    cached_input_cents_per_1m=30,
+    reasoning_output_cents_per_1m=2000,
+    grounding_cents_per_1k_queries=1400,
+    context_cliff_threshold_tokens=1000,
+    context_cliff_input_multiplier=1.3333,
+    context_cliff_output_multiplier=2.0,
+)
+
+
+class TestCompactRateTable(unittest.TestCase):
+    def test_round_trip(self):
+        table = CompactRateTable.from_rates(DEFAULT_RATES, tenant="t1")
+        self.assertEqual(table.to_rates(tenant="t1"), DEFAULT_RATES)
+        self.assertEqual(table.to_rates(tenant="other"), {})
+        self.assertIsNone(table.get("t1", "openai", "missing"))
+
+    def test_row_view_prices_identically(self):
+        table = CompactRateTable()
+        table.set("t1", "anthropic", "claude", CLIFF_CARD)
+        row = table.get("t1", "anthropic", "claude")
+        self.assertIsInstance(row, RateRow)
+        self.assertIsNone(row.cache_write_input_cents_per_1m)
+        self.assertEqual(row.context_cliff_input_multiplier, 1.3333)
+        self.assertEqual(row.to_rate_card(), CLIFF_CARD)
+
+        rng = random.Random(7)
+        for _ in range(200):
+            usage = {
+                "input_tokens": rng.randrange(3000),
+                "output_tokens": rng.randrange(3000),
+                "cached_input_tokens": rng.randrange(3000),
+                "reasoning_tokens": rng.randrange(3000),
+                "grounding_queries": rng.randrange(5),
+            }
+            expected = compute_cost_breakdown(provider="p", model="m", rate_card=CLIFF_CARD, **usage)
+            self.assertEqual(compute_cost_breakdown(provider="p", model="m", rate_card=row, **usage), expected)
+            self.assertEqual(
+                compute_cost_totals(rate_card=row, **usage).realized_microcents,
+                expected["totals"]["realized_microcents"],
+            )
+
+    def test_overwrite_in_place(self):
+        table = CompactRateTable()
+        first = table.set("t", "openai", "m", RateCard(input_cents_per_1m=1, output_cents_per_1m=2))
+        again = table.set("t", "openai", "m", RateCard(input_cents_per_1m=3, output_cents_per_1m=4))
+        self.assertEqual(first, again)
+        self.assertEqual(len(table), 1)
+        self.assertEqual(table.row(first).input_cents_per_1m, 3)
+
+    def test_overwrite_after_pricing(self):
+        table = CompactRateTable()
+        table.set("t", "openai", "m", RateCard(input_cents_per_1m=1, output_cents_per_1m=2))
+        row = table.get("t", "openai", "m")
+        plan = compile_rate_card(row)
+        # Plans are cached on the decoded values, never on the view over the table's array.
+        self.assertIsInstance(plan.rate_card, RateCard)
+        self.assertEqual(compute_cost_totals(rate_card=row, input_tokens=10, output_tokens=10).realized_microcents, 30)
+        table.set("t", "openai", "m", RateCard(input_cents_per_1m=5, output_cents_per_1m=6))
+        self.assertEqual(compute_cost_totals(rate_card=row, input_tokens=10, output_tokens=10).realized_microcents, 110)
+        self.assertEqual(plan.rate_card, RateCard(input_cents_per_1m=1, output_cents_per_1m=2))
+        self.assertIsNot(compile_rate_card(row), plan)
+
+    def test_rejects_unrepresentable_multiplier(self):
+        with self.assertRaises(ValueError):
+            CompactRateTable().set(
+                "t",
+                "p",
+                "m",
+                RateCard(
+                    input_cents_per_1m=1,
+                    output_cents_per_1m=1,
+                    context_cliff_threshold_tokens=1,
+                    context_cliff_input_multiplier=1 / 3,
+                ),
+            )
+
+    def test_memory_footprint(self):
+        table = CompactRateTable()
+        for tenant in range(100):
+            for model in range(100):
+                table.set(
+                    f"tenant-{tenant}",
+                    "openai",
+                    f"model-{model}",
+                    RateCard(input_cents_per_1m=1, output_cents_per_1m=2),
+                )
+        footprint = table.memory_footprint()
+        self.assertGreaterEqual(footprint["rows"], 10_000 * 13 * 8)
+        self.assertEqual(footprint["total"], footprint["rows"] + footprint["index"] + footprint["strings"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+import json
+import random
+import unittest
+
+from spendguard_engine.providers import decoding
+from spendguard_engine.providers.anthropic_provider import call_anthropic_messages, extract_anthropic_usage
+from spendguard_engine.providers.decoding import loads, loads_member
+from spendguard_engine.providers.gemini_provider import (
+    call_gemini_generate_content,
+    extract_gemini_usage,
+    normalize_gemini_usage,
+)
+from spendguard_engine.providers.transport import HTTPResponse
+
+
+class _FixedTransport:
+    def __init__(self, body: bytes, status: int = 200):
+        self.response = HTTPResponse(status=status, body=body)
+
+    def request(self, method, url, *, body=None, headers=None, timeout=None):
+        return self.response
+
+
+class TestLoads(unittest.TestCase):
+    def test_accepts_buffers(self):
+        for data in (b'{"a": [1, 2.5, "\xc3\xa9"]}', bytearray(b'{"a": [1, 2.5, "\xc3\xa9"]}')):
+            self.assertEqual(loads(data), {"a": [1, 2.5, "é"]})
+            self.assertEqual(decoding._stdlib_loads(data), {"a": [1, 2.5, "é"]})
+        self.assertEqual(decoding._stdlib_loads(memoryview(b"[1]")), [1])
+        with self.assertRaises(ValueError):
+            loads(b"{")
+
+
+class TestLoadsMember(unittest.TestCase):
+    def test_trailing_usage_blocks(self):
+        docs = [
+            {"content": [{"type": "text", "text": "hi"}], "usage": {"input_tokens": 3, "output_tokens": 4}},
+            {"candidates": [], "usageMetadata": {"promptTokenCount": 1}, "modelVersion": "x", "responseId": "r"},
+            {"usage": {"a": 1}, "content": [{"usage": {"nested": True}}]},
+            {"text": 'quoted "usage": {"fake": 1}', "usage": {"real": 1}},
+            {"usage": {"first": 1}, "note": "usage"},
+            {"content": "no usage here"},
+            {"usage": None},
+        ]
+        for doc in docs:
+            for separators in ((",", ":"), (", ", ": ")):
+                data = json.dumps(doc, separators=separators).encode()
+                for key in ("usage", "usageMetadata"):
+                    self.assertEqual(loads_member(data, key), doc.get(key), (doc, key))
+        self.assertEqual(loads_member(b'\n{ "usage" : {"x": 1} ,\n "id" : "a" }\n', "usage"), {"x": 1})
+
+    def test_fast_path_skips_the_prefix(self):
+        # The prefix is never parsed when the key is provably a root member.
+        self.assertEqual(loads_member(b'{"content": ###garbage###, "usage": {"x": 1}}', "usage"), {"x": 1})
+
+    def test_matches_full_parse_on_random_documents(self):
+        rng = random.Random(7)
+
+        def value(depth):
+            kind = rng.randrange(6 if depth < 3 else 3)
+            if kind == 0:
+                return rng.randrange(-5, 1000)
+            if kind == 1:
+                return rng.choice(["usage", '"usage": 1', "\\", "é", ""])
+            if kind == 2:
+                return None
+            if kind == 3:
+                return [value(depth + 1) for _ in range(rng.randrange(3))]
+            return {rng.choice(["usage", "a", "b"]): value(depth + 1) for _ in range(rng.randrange(3))}
+
+        for _ in range(2000):
+            doc = {rng.choice(["usage", "content", "id", "usageMetadata"]): value(0) for _ in range(rng.randrange(5))}
+            data = json.dumps(doc, ensure_ascii=rng.random() < 0.5).encode()
+            self.assertEqual(loads_member(data, "usage"), doc.get("usage"), data)
+
+
+class TestUsageOnlyAdapters(unittest.TestCase):
+    def test_anthropic(self):
+        body = json.dumps(
+            {"content": [{"type": "text", "text": "x" * 10_000}], "usage": {"input_tokens": 10, "output_tokens": 20}}
+        ).encode()
+        out = call_anthropic_messages("k", "m", None, [], None, 1, transport=_FixedTransport(body), usage_only=True)
+        self.assertEqual(out, {"usage": {"input_tokens": 10, "output_tokens": 20}})
+        self.assertEqual(extract_anthropic_usage(out), (10, 20))
+        full = call_anthropic_messages("k", "m", None, [], None, 1, transport=_FixedTransport(body))
+        self.assertEqual(extract_anthropic_usage(full), (10, 20))
+
+    def test_gemini(self):
+        body = json.dumps(
+            {"candidates": [], "usageMetadata": {"promptTokenCount": 5, "candidatesTokenCount": 6}, "modelVersion": "v"}
+        ).encode()
+        out = call_gemini_generate_content("k", "m", "p", None, 1, transport=_FixedTransport(body), usage_only=True)
+        self.assertEqual(extract_gemini_usage(out), (5, 6))
+        out = call_gemini_generate_content(
+            "k", "m", "p", None, 1, transport=_FixedTransport(b'{"candidates": []}'), usage_only=True
+        )
+        self.assertEqual(extract_gemini_usage(out), (None, None))
+
+    def test_gemini_grounding_is_kept(self):
+        body = json.dumps(
+            {
+                "candidates": [
+                    {
+                        "content": {"parts": [{"text": "x" * 10_000}]},
+                        "groundingMetadata": {"webSearchQueries": ["a", "b"], "groundingChunks": [{}]},
+                    }
+                ],
+                "usageMetadata": {"promptTokenCount": 5, "candidatesTokenCount": 6},
+            }
+        ).encode()
+        out = call_gemini_generate_content("k", "m", "p", None, 1, transport=_FixedTransport(body), usage_only=True)
+        self.assertNotIn("content", out["candidates"][0])
+        full = call_gemini_generate_content("k", "m", "p", None, 1, transport=_FixedTransport(body))
+        self.assertEqual(normalize_gemini_usage(out), normalize_gemini_usage(full))
+        self.assertEqual(normalize_gemini_usage(out).grounding_queries, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import subprocess
+import sys
+import unittest
+
+import spendguard_engine
+import spendguard_engine.providers as providers
+import spendguard_engine.schemas as schemas
+
+
+def _loaded_after(statement: str) -> set[str]:
+    code = f"import sys\n{statement}\nprint('\\n'.join(sorted(sys.modules)))"
+    out = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True).stdout
+    return set(out.split())
+
+
+class TestLazyImports(unittest.TestCase):
+    def test_package_imports_do_not_load_sdks(self) -> None:
+        loaded = _loaded_after("import spendguard_engine, spendguard_engine.providers, spendguard_engine.schemas")
+        self.assertNotIn("openai", loaded)
+        self.assertNotIn("pydantic", loaded)
+        self.assertNotIn("spendguard_engine.providers.openai_provider", loaded)
+
+    def test_root_package_loads_only_pricing(self) -> None:
+        loaded = _loaded_after("import spendguard_engine")
+        for module in ("ledger", "rate_file", "tokenizers", "prompt_cache", "aggregation", "rate_table"):
+            self.assertNotIn(f"spendguard_engine.{module}", loaded)
+
+    def test_one_provider_does_not_load_the_others(self) -> None:
+        loaded = _loaded_after("from spendguard_engine.providers import extract_anthropic_usage")
+        self.assertIn("spendguard_engine.providers.anthropic_provider", loaded)
+        self.assertNotIn("spendguard_engine.providers.gemini_provider", loaded)
+        self.assertNotIn("openai", loaded)
+
+    def test_public_names_resolve(self) -> None:
+        for module in (providers, schemas):
+            for name in module.__all__:
+                self.assertTrue(callable(getattr(module, name)), name)
+                self.assertIn(name, dir(module))
+        for name in spendguard_engine.__all__:
+            self.assertIsNotNone(getattr(spendguard_engine, name), name)
+            self.assertIn(name, dir(spendguard_engine))
+        # The ledger's budget reservation and the rate limiter's are distinct names.
+        self.assertIsNot(spendguard_engine.Reservation, providers.RateReservation)
+        self.assertNotIn("Reservation", providers.__all__)
+        with self.assertRaises(AttributeError):
+            providers.call_unknown_provider  # noqa: B018
+        with self.assertRaises(AttributeError):
+            spendguard_engine.no_such_name  # noqa: B018
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+import threading
+import unittest
+
+from spendguard_engine.ledger import BudgetLedger
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestBudgetLedger(unittest.TestCase):
+    def test_reserve_settle_release(self):
+        ledger = BudgetLedger()
+        ledger.set_budget("a1", 10)
+        res = ledger.reserve("a1", 4_000_000, run_id="r1")
+        self.assertIsNotNone(res)
+        self.assertIsNone(ledger.reserve("a1", 6_000_001))
+
+        remaining = ledger.settle(res, 1_500_000)
+        self.assertEqual(remaining, 8_500_000)
+        snap = ledger.snapshot("a1")
+        self.assertEqual((snap.spent_microcents, snap.locked_microcents), (1_500_000, 0))
+
+        res2 = ledger.reserve("a1", 1_000_000)
+        self.assertTrue(ledger.release(res2))
+        self.assertFalse(ledger.release(res2))
+        self.assertEqual(ledger.snapshot("a1").remaining_microcents, 8_500_000)
+
+    def test_settle_is_idempotent(self):
+        ledger = BudgetLedger()
+        ledger.set_budget("a1", 10)
+        res = ledger.reserve("a1", 2_000_000, run_id="r1")
+        self.assertEqual(ledger.settle(res, 1_000_000), 9_000_000)
+        self.assertEqual(ledger.settle(res, 1_000_000), 9_000_000)
+        self.assertEqual(ledger.snapshot("a1").spent_microcents, 1_000_000)
+
+    def test_stale_reservation_for_reused_run_id(self):
+        ledger = BudgetLedger()
+        ledger.set_budget("a1", 10)
+        old = ledger.reserve("a1", 3_000_000, run_id="r1")
+        ledger.release(old)
+        new = ledger.reserve("a1", 1_000_000, run_id="r1")
+        # The stale reservation neither drops the new one nor unlocks its own (old) amount.
+        self.assertFalse(ledger.release(old))
+        self.assertEqual(ledger.snapshot("a1").locked_microcents, 1_000_000)
+        ledger.settle(old, 500_000)
+        snap = ledger.snapshot("a1")
+        self.assertEqual(
+            (snap.spent_microcents, snap.locked_microcents, snap.locked_run_id), (500_000, 1_000_000, "r1")
+        )
+        ledger.settle(new, 700_000)
+        snap = ledger.snapshot("a1")
+        self.assertEqual((snap.spent_microcents, snap.locked_microcents), (1_200_000, 0))
+
+    def test_unknown_agent(self):
+        with self.assertRaises(KeyError):
+            BudgetLedger().reserve("nope", 1)
+
+    def test_duplicate_run_id(self):
+        ledger = BudgetLedger()
+        ledger.set_budget("a1", 10)
+        ledger.reserve("a1", 1, run_id="r1")
+        with self.assertRaises(ValueError):
+            ledger.reserve("a1", 1, run_id="r1")
+
+    def test_generated_run_ids_skip_explicit_ones(self):
+        ledger = BudgetLedger()
+        ledger.set_budget("a1", 10)
+        explicit = ledger.reserve("a1", 1_000_000, run_id="run-2")
+        generated = [ledger.reserve("a1", 1_000_000) for _ in range(3)]
+        self.assertNotIn("run-2", [res.run_id for res in generated])
+        self.assertEqual(ledger.snapshot("a1").locked_microcents, 4_000_000)
+        for res in [explicit, *generated]:
+            self.assertTrue(ledger.release(res))
+        self.assertEqual(ledger.snapshot("a1").locked_microcents, 0)
+
+    def test_expiry_releases_lock(self):
+        clock = FakeClock()
+        ledger = BudgetLedger(clock=clock)
+        ledger.set_budget("a1", 1)
+        res = ledger.reserve("a1", 1_000_000, ttl_seconds=30)
+        self.assertIsNone(ledger.reserve("a1", 1))
+        clock.now += 31
+        self.assertEqual(ledger.snapshot("a1").locked_microcents, 0)
+        # Settling an expired reservation still records the spend.
+        self.assertEqual(ledger.settle(res, 400_000), 600_000)
+
+    def test_budget_response(self):
+        clock = FakeClock()
+        ledger = BudgetLedger(clock=clock)
+        ledger.set_budget("a1", 10)
+        ledger.top_up("a1", 5)
+        ledger.reserve("a1", 1_200_000, run_id="r1", ttl_seconds=60)
+        resp = ledger.budget_response("a1")
+        self.assertEqual(resp.hard_limit_cents, 15)
+        self.assertEqual(resp.locked_cents, 2)
+        self.assertEqual(resp.remaining_cents, 13)
+        self.assertEqual(resp.locked_run_id, "r1")
+        self.assertTrue(resp.locked_expires_at.startswith("2023-11-14T22:14:20"))
+
+    def test_concurrent_operations_balance(self):
+        ledger = BudgetLedger(shards=8)
+        agents = [f"agent-{i}" for i in range(16)]
+        for agent in agents:
+            ledger.set_budget(agent, 1_000)
+
+        def worker(agent):
+            for _ in range(500):
+                res = ledger.reserve(agent, 1_000_000)
+                if res is None:
+                    continue
+                ledger.settle(res, 1_000_000)
+
+        threads = [threading.Thread(target=worker, args=(agents[i % len(agents)],)) for i in range(48)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        for agent in agents:
+            snap = ledger.snapshot(agent)
+            self.assertEqual(snap.locked_microcents, 0)
+            self.assertEqual(snap.spent_microcents, 1_000 * 1_000_000)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+
+from spendguard_engine.billing import compute_cost_breakdown
+from spendguard_engine.metering import StreamingCostMeter
+from spendguard_engine.pricing import RateCard
+
+
+class TestStreamingCostMeter(unittest.TestCase):
+    def test_stops_at_exact_token(self):
+        card = RateCard(input_cents_per_1m=30, output_cents_per_1m=120)
+        # 100 input tokens = 3000 microcents; 10 output tokens = 1200 microcents.
+        meter = StreamingCostMeter(rate_card=card, input_tokens=100, reserved_microcents=4200)
+        self.assertEqual(meter.input_microcents, 3000)
+        self.assertEqual(meter.tokens_remaining(), 10)
+        self.assertTrue(meter.add_tokens(4))
+        self.assertTrue(meter.add_tokens(6))
+        self.assertFalse(meter.would_exceed(0))
+        self.assertTrue(meter.would_exceed(1))
+        self.assertFalse(meter.add_tokens(1))
+        self.assertTrue(meter.exceeded)
+        self.assertEqual(meter.exceeded_at_output_tokens, 11)
+        self.assertFalse(meter.add_tokens(1))
+        self.assertEqual(meter.exceeded_at_output_tokens, 11)
+
+    def test_upper_bound_matches_settlement(self):
+        card = RateCard(
+            input_cents_per_1m=300,
+            output_cents_per_1m=1500,
+            reasoning_output_cents_per_1m=2000,
+            context_cliff_threshold_tokens=1000,
+            context_cliff_output_multiplier=1.5,
+        )
+        meter = StreamingCostMeter(rate_card=card, input_tokens=2000, reserved_microcents=10**9)
+        meter.add_tokens(30, reasoning=True)
+        meter.add_tokens(70)
+        b = compute_cost_breakdown(
+            provider="p",
+            model="m",
+            rate_card=card,
+            input_tokens=2000,
+            output_tokens=100,
+            reasoning_tokens=30,
+        )
+        self.assertEqual(meter.upper_bound_microcents, b["totals"]["realized_microcents"])
+
+    def test_text_deltas_use_running_estimate(self):
+        card = RateCard(input_cents_per_1m=0, output_cents_per_1m=100)
+        meter = StreamingCostMeter(rate_card=card, input_tokens=0, reserved_microcents=10**6)
+        for _ in range(9):
+            meter.add_text("a")
+        # 9 chars => (9 + 2) // 3 = 3 tokens, not 9 single-char chunks.
+        self.assertEqual(meter.output_tokens, 3)
+        self.assertEqual(meter.upper_bound_microcents, 300)
+
+    def test_input_alone_can_exceed(self):
+        card = RateCard(input_cents_per_1m=100, output_cents_per_1m=100)
+        meter = StreamingCostMeter(rate_card=card, input_tokens=10, reserved_microcents=999)
+        self.assertTrue(meter.exceeded)
+        self.assertEqual(meter.exceeded_at_output_tokens, 0)
+        self.assertEqual(meter.tokens_remaining(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
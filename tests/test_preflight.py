@@ -0,0 +1,88 @@
+import os
+import unittest
+
+from spendguard_engine.billing import compute_cost_totals
+from spendguard_engine.preflight import max_affordable_output_tokens
+from spendguard_engine.pricing import RateCard
+from spendguard_engine.providers.openai_provider import clamp_openai_max_tokens
+
+CARDS = [
+    RateCard(input_cents_per_1m=30, output_cents_per_1m=120),
+    RateCard(
+        input_cents_per_1m=175,
+        output_cents_per_1m=1400,
+        cached_input_cents_per_1m=18,
+        reasoning_output_cents_per_1m=2000,
+    ),
+    RateCard(
+        input_cents_per_1m=300,
+        output_cents_per_1m=1500,
+        context_cliff_threshold_tokens=1000,
+        context_cliff_input_multiplier=2.0,
+        context_cliff_output_multiplier=1.3333,
+    ),
+]
+
+
+class TestPreflight(unittest.TestCase):
+    def test_largest_fitting_output(self):
+        for card in CARDS:
+            for input_tokens in (0, 500, 1001, 5000):
+                for budget_cents in (1, 3, 17):
+                    allowance = max_affordable_output_tokens(
+                        rate_card=card, input_tokens=input_tokens, budget_cents=budget_cents
+                    )
+                    n = allowance.max_output_tokens
+
+                    def cost(out, reasoning=0):
+                        return compute_cost_totals(
+                            rate_card=card, input_tokens=input_tokens, output_tokens=out, reasoning_tokens=reasoning
+                        ).realized_cents_ceiled
+
+                    if allowance.input_microcents > allowance.budget_microcents:
+                        self.assertEqual(n, 0)
+                    else:
+                        self.assertLessEqual(cost(n), budget_cents)
+                        self.assertLessEqual(cost(n, n), budget_cents)
+                        self.assertGreater(max(cost(n + 1), cost(n + 1, n + 1)), budget_cents)
+
+    def test_fixed_reasoning_split(self):
+        card = CARDS[1]
+        allowance = max_affordable_output_tokens(
+            rate_card=card, input_tokens=1000, budget_microcents=1_000_000, reasoning_tokens=200
+        )
+        self.assertEqual(allowance.max_reasoning_tokens, 200)
+        # 1000 * 175 input + 200 * 2000 reasoning leaves 425_000 microcents for output at 1400.
+        self.assertEqual(allowance.max_output_tokens, 200 + 425_000 // 1400)
+        realized = compute_cost_totals(
+            rate_card=card, input_tokens=1000, output_tokens=allowance.max_output_tokens, reasoning_tokens=200
+        ).realized_microcents
+        self.assertLessEqual(realized, 1_000_000)
+
+    def test_input_over_budget(self):
+        allowance = max_affordable_output_tokens(rate_card=CARDS[0], input_tokens=10**6, budget_cents=1)
+        self.assertEqual(allowance.max_output_tokens, 0)
+
+    def test_limit_and_clamp(self):
+        allowance = max_affordable_output_tokens(rate_card=CARDS[0], input_tokens=0, budget_cents=1000, limit=50_000)
+        self.assertEqual(allowance.max_output_tokens, 50_000)
+        os.environ.pop("CAP_OPENAI_MAX_COMPLETION_TOKENS", None)
+        self.assertEqual(clamp_openai_max_tokens(allowance.max_output_tokens), 16384)
+
+    def test_free_output_requires_limit(self):
+        card = RateCard(input_cents_per_1m=1, output_cents_per_1m=0)
+        with self.assertRaises(ValueError):
+            max_affordable_output_tokens(rate_card=card, input_tokens=0, budget_cents=1)
+        self.assertEqual(
+            max_affordable_output_tokens(rate_card=card, input_tokens=0, budget_cents=1, limit=7).max_output_tokens, 7
+        )
+
+    def test_requires_one_budget(self):
+        with self.assertRaises(ValueError):
+            max_affordable_output_tokens(rate_card=CARDS[0], input_tokens=0)
+        with self.assertRaises(ValueError):
+            max_affordable_output_tokens(rate_card=CARDS[0], input_tokens=0, budget_cents=1, budget_microcents=1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+import unittest
+
+from spendguard_engine.preflight import max_affordable_output_tokens
+from spendguard_engine.pricing import RateCard
+from spendguard_engine.prompt_cache import PromptPrefixIndex, prompt_blocks
+from spendguard_engine.token_estimation import estimate_tokens_anthropic, estimate_tokens_messages
+
+SYSTEM = {"role": "system", "content": "You are a careful agent. " * 400}
+TOOLS = [{"type": "function", "function": {"name": "search", "parameters": {"type": "object"}}}]
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestPromptBlocks(unittest.TestCase):
+    def test_tokens_match_estimator_and_prefixes_chain(self):
+        messages = [SYSTEM, {"role": "user", "content": "step 1"}]
+        blocks = prompt_blocks(messages, tools=TOOLS)
+        index = PromptPrefixIndex("openai")
+        self.assertEqual(index.estimate("a", blocks).input_tokens, estimate_tokens_messages(messages, tools=TOOLS))
+        longer = prompt_blocks(messages + [{"role": "user", "content": "step 2"}], tools=TOOLS)
+        self.assertEqual([b.digest for b in longer[:3]], [b.digest for b in blocks])
+        reordered = prompt_blocks([{"content": SYSTEM["content"], "role": "system"}], tools=TOOLS)
+        self.assertEqual(reordered[1].digest, blocks[1].digest)
+        self.assertNotEqual(prompt_blocks(messages)[1].digest, blocks[1].digest)
+
+        system = [{"type": "text", "text": "rules " * 500, "cache_control": {"type": "ephemeral"}}]
+        turns = [{"role": "user", "content": "hi"}]
+        anthropic = prompt_blocks(turns, system=system)
+        self.assertEqual([b.breakpoint for b in anthropic], [True, False])
+        self.assertEqual(
+            PromptPrefixIndex("anthropic").estimate("a", anthropic).input_tokens,
+            estimate_tokens_anthropic(system, turns),
+        )
+
+
+class TestPromptPrefixIndex(unittest.TestCase):
+    def test_agent_loop_prediction(self):
+        clock = _Clock()
+        index = PromptPrefixIndex("openai", clock=clock)
+        history = [SYSTEM, {"role": "user", "content": "task"}]
+        first = prompt_blocks(history)
+        self.assertEqual(index.estimate("agent", first).cached_tokens, 0)
+        index.record("agent", first)
+
+        history += [{"role": "assistant", "content": "calling tool"}, {"role": "user", "content": "tool result"}]
+        second = prompt_blocks(history)
+        estimate = index.estimate("agent", second)
+        prefix = first[0].tokens + first[1].tokens
+        self.assertEqual(estimate.cached_tokens, prefix - prefix % 128)
+        self.assertEqual(
+            estimate.usage(), {"input_tokens": estimate.input_tokens, "cached_input_tokens": prefix - prefix % 128}
+        )
+        self.assertEqual(index.estimate("other-agent", second).cached_tokens, 0)
+
+        card = RateCard(input_cents_per_1m=175, output_cents_per_1m=1400, cached_input_cents_per_1m=18)
+        cold = max_affordable_output_tokens(rate_card=card, input_tokens=estimate.input_tokens, budget_cents=1)
+        warm = max_affordable_output_tokens(rate_card=card, budget_cents=1, **estimate.usage())
+        self.assertLess(warm.input_microcents, cold.input_microcents)
+        self.assertGreater(warm.max_output_tokens, cold.max_output_tokens)
+
+        clock.now = 301
+        self.assertEqual(index.estimate("agent", second).cached_tokens, 0)
+
+    def test_short_prompts_and_breakpoints(self):
+        index = PromptPrefixIndex("openai")
+        short = prompt_blocks([{"role": "user", "content": "hello"}])
+        index.record("a", short)
+        self.assertEqual(index.estimate("a", short).cached_tokens, 0)
+
+        index = PromptPrefixIndex("anthropic")
+        turns = [{"role": "user", "content": "long context " * 600}, {"role": "user", "content": "q"}]
+        plain = prompt_blocks(turns)
+        index.record("a", plain)
+        self.assertEqual(index.estimate("a", plain).cached_tokens, 0)  # no cache_control breakpoint
+        marked = [{"role": "user", "content": [{"type": "text", "text": "long context " * 600, "cache_control": {}}]}]
+        blocks = prompt_blocks(marked + turns[1:])
+        index.record("a", blocks)
+        estimate = index.estimate("a", blocks)
+        self.assertEqual(estimate.cached_tokens, blocks[0].tokens)
+        self.assertIn("cache_read_input_tokens", estimate.usage())
+
+    def test_anthropic_moving_breakpoint(self):
+        # The usual agent loop: cache_control moves to the newest message every turn.
+        def turn(history):
+            messages = [{"role": role, "content": [{"type": "text", "text": text}]} for role, text in history]
+            messages[-1]["content"][0]["cache_control"] = {"type": "ephemeral"}
+            return prompt_blocks(messages, system="rules " * 1500)
+
+        index = PromptPrefixIndex("anthropic")
+        history = [("user", "task")]
+        first = turn(history)
+        index.record("a", first)
+        history += [("assistant", "calling tool"), ("user", "tool result")]
+        second = turn(history)
+        self.assertEqual(second[1].digest, first[1].digest)  # same block, breakpoint moved off it
+        self.assertEqual(index.estimate("a", second).cached_tokens, first[0].tokens + first[1].tokens)
+        index.record("a", second)
+        history += [("assistant", "done"), ("user", "thanks")]
+        self.assertEqual(index.estimate("a", turn(history)).cached_tokens, sum(b.tokens for b in second))
+
+    def test_memory_is_bounded(self):
+        index = PromptPrefixIndex("openai", max_agents=3, max_blocks_per_agent=4)
+        for agent in range(5):
+            index.record(str(agent), prompt_blocks([{"role": "user", "content": str(i)} for i in range(10)]))
+        self.assertEqual(len(index), 12)
+        blocks = prompt_blocks([SYSTEM] + [{"role": "user", "content": str(i)} for i in range(10)])
+        index.record("4", blocks)
+        # The shared head survives; the tail of the long prompt was evicted.
+        self.assertGreater(index.estimate("4", blocks[:2]).cached_tokens, 0)
+        with self.assertRaises(ValueError):
+            PromptPrefixIndex("unknown")
+
+
+if __name__ == "__main__":
+    unittest.main()
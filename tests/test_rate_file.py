@@ -0,0 +1,141 @@
+import os
+import stat
+import tempfile
+import unittest
+
+from spendguard_engine.billing import compute_cost_breakdown
+from spendguard_engine.compact_rates import CompactRateTable, RateRow
+from spendguard_engine.pricing import DEFAULT_RATES, RateCard
+from spendguard_engine.rate_file import (
+    _HEADER,
+    MappedRateTable,
+    encode_rate_table,
+    load_rate_file,
+    write_rate_file,
+)
+
+
+class TestRateFile(unittest.TestCase):
+    def setUp(self) -> None:
+        self._dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._dir.name, "rates.bin")
+
+    def tearDown(self) -> None:
+        self._dir.cleanup()
+
+    def test_round_trip_rates_dict(self) -> None:
+        write_rate_file(self.path, DEFAULT_RATES)
+        with load_rate_file(self.path) as table:
+            self.assertEqual(len(table), sum(len(models) for models in DEFAULT_RATES.values()))
+            self.assertEqual(table.to_rates(), DEFAULT_RATES)
+            self.assertEqual(table.to_rates(tenant="other"), {})
+
+    def test_lookup_returns_row_views_priced_like_rate_cards(self) -> None:
+        compact = CompactRateTable.from_rates(DEFAULT_RATES)
+        compact.set("acme", "openai", "gpt-4o-mini", RateCard(input_cents_per_1m=1, output_cents_per_1m=2))
+        write_rate_file(self.path, compact)
+        table = load_rate_file(self.path)
+        for provider, models in DEFAULT_RATES.items():
+            for model, card in models.items():
+                row = table.get("", provider, model)
+                self.assertIsInstance(row, RateRow)
+                self.assertEqual(row.to_rate_card(), card)
+                self.assertEqual(
+                    compute_cost_breakdown(
+                        provider=provider, model=model, rate_card=row, input_tokens=300_000, output_tokens=12_345
+                    ),
+                    compute_cost_breakdown(
+                        provider=provider, model=model, rate_card=card, input_tokens=300_000, output_tokens=12_345
+                    ),
+                )
+        self.assertEqual(table.get("acme", "openai", "gpt-4o-mini").input_cents_per_1m, 1)
+        self.assertIsNone(table.get("", "openai", "nope"))
+        self.assertIsNone(table.get("zzz", "openai", "gpt-4o-mini"))
+        self.assertEqual(sorted(table.keys()), sorted(compact.keys()))
+        self.assertEqual(table.to_compact().to_rates(tenant="acme"), compact.to_rates(tenant="acme"))
+
+    def test_close_after_pricing(self) -> None:
+        write_rate_file(self.path, DEFAULT_RATES)
+        with load_rate_file(self.path) as table:
+            row = table.get("", "openai", "gpt-4o")
+            expected = compute_cost_breakdown(
+                provider="openai", model="gpt-4o", rate_card=row, input_tokens=1000, output_tokens=100
+            )
+            del row
+        # Compiled plans cached by pricing do not keep the mapping exported.
+        self.assertEqual(
+            compute_cost_breakdown(
+                provider="openai",
+                model="gpt-4o",
+                rate_card=DEFAULT_RATES["openai"]["gpt-4o"],
+                input_tokens=1000,
+                output_tokens=100,
+            ),
+            expected,
+        )
+
+    def test_empty_table(self) -> None:
+        write_rate_file(self.path, {})
+        with load_rate_file(self.path) as table:
+            self.assertEqual(len(table), 0)
+            self.assertIsNone(table.get("", "openai", "gpt-4o"))
+
+    def test_rejects_corrupt_files(self) -> None:
+        data = bytearray(encode_rate_table(DEFAULT_RATES))
+        data[-1] ^= 0xFF
+        with open(self.path, "wb") as f:
+            f.write(data)
+        with self.assertRaisesRegex(ValueError, "checksum"):
+            MappedRateTable(self.path)
+        table = MappedRateTable(self.path, verify_checksum=False)
+        with self.assertRaisesRegex(ValueError, "checksum"):
+            table.verify()
+        table.close()
+
+        with open(self.path, "wb") as f:
+            f.write(bytes(data[:-8]))
+        with self.assertRaisesRegex(ValueError, "truncated"):
+            MappedRateTable(self.path)
+        with open(self.path, "wb") as f:
+            f.write(bytes(data[:10]))
+        with self.assertRaisesRegex(ValueError, "truncated"):
+            MappedRateTable(self.path)
+
+        with open(self.path, "wb") as f:
+            f.write(b"NOTRATES" + bytes(data[8:]))
+        with self.assertRaisesRegex(ValueError, "not a rate file"):
+            MappedRateTable(self.path)
+
+    def test_bounds_are_checked_without_the_checksum(self) -> None:
+        data = encode_rate_table(DEFAULT_RATES)
+        header = list(_HEADER.unpack_from(data, 0))
+        # keys_offset past the rows, then a string table claiming fewer strings than are used.
+        for field, value in ((9, len(data)), (5, 1)):
+            bad = list(header)
+            bad[field] = value
+            with open(self.path, "wb") as f:
+                f.write(_HEADER.pack(*bad) + data[_HEADER.size :])
+            with self.assertRaisesRegex(ValueError, "corrupt"):
+                MappedRateTable(self.path, verify_checksum=False)
+
+    def test_written_file_is_readable_by_others(self) -> None:
+        umask = os.umask(0o022)
+        try:
+            write_rate_file(self.path, DEFAULT_RATES)
+        finally:
+            os.umask(umask)
+        self.assertEqual(stat.S_IMODE(os.stat(self.path).st_mode), 0o644)
+
+    def test_rewrite_replaces_file_atomically(self) -> None:
+        write_rate_file(self.path, DEFAULT_RATES)
+        old = load_rate_file(self.path)
+        write_rate_file(self.path, {"openai": {"gpt-4o": RateCard(input_cents_per_1m=7, output_cents_per_1m=8)}})
+        # The old mapping still sees the old contents; a fresh load sees the new ones.
+        self.assertEqual(old.get("", "openai", "gpt-4o").to_rate_card(), DEFAULT_RATES["openai"]["gpt-4o"])
+        with load_rate_file(self.path) as new:
+            self.assertEqual(len(new), 1)
+        self.assertEqual(os.listdir(self._dir.name), ["rates.bin"])
+
+
+if __name__ == "__main__":
+    unittest.main()
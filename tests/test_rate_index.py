@@ -0,0 +1,63 @@
+import unittest
+
+from spendguard_engine.pricing import DEFAULT_RATES, RateCard
+from spendguard_engine.rate_index import RateIndex, normalize_model_name
+
+
+class TestRateIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = RateIndex(
+            DEFAULT_RATES,
+            aliases={"anthropic": {"claude-sonnet": "claude-3-5-sonnet-latest"}},
+        )
+
+    def test_exact_and_normalized(self):
+        r = self.index.resolve("openai", "gpt-4o")
+        self.assertEqual((r.model, r.match), ("gpt-4o", "exact"))
+        r = self.index.resolve("gemini", "models/Gemini-1.5-Flash")
+        self.assertEqual((r.model, r.match), ("gemini-1.5-flash", "exact"))
+        self.assertEqual(normalize_model_name("  models/x "), "x")
+
+    def test_snapshots(self):
+        r = self.index.resolve("openai", "gpt-4o-2024-08-06")
+        self.assertEqual((r.model, r.match), ("gpt-4o", "snapshot"))
+        r = self.index.resolve("openai", "gpt-4o-mini-2024-07-18")
+        self.assertEqual(r.model, "gpt-4o-mini")
+        r = self.index.resolve("anthropic", "claude-3-5-sonnet-20241022")
+        self.assertEqual((r.model, r.match), ("claude-3-5-sonnet-latest", "snapshot"))
+        self.assertEqual(r.rate_card, DEFAULT_RATES["anthropic"]["claude-3-5-sonnet-latest"])
+
+    def test_alias(self):
+        r = self.index.resolve("anthropic", "Claude-Sonnet")
+        self.assertEqual((r.model, r.match), ("claude-3-5-sonnet-latest", "alias"))
+
+    def test_prefix_matching_is_opt_in(self):
+        # An unknown variant is not priced as its base model unless asked for.
+        self.assertIsNone(self.index.resolve("openai", "o1-pro"))
+        self.assertIsNone(self.index.lookup("openai", "o3-mini-high"))
+
+    def test_longest_prefix_on_boundary(self):
+        index = RateIndex(DEFAULT_RATES, allow_prefix=True)
+        r = index.resolve("openai", "o3-mini-high")
+        self.assertEqual((r.model, r.match), ("o3-mini", "prefix"))
+        r = index.resolve("openai", "gpt-5.2-codex-max")
+        self.assertEqual(r.model, "gpt-5.2-codex")
+        self.assertIsNone(index.resolve("openai", "o3x"))
+        self.assertIsNone(index.resolve("nope", "gpt-4o"))
+
+    def test_unknown_alias_target(self):
+        with self.assertRaises(ValueError):
+            RateIndex(DEFAULT_RATES, aliases={"openai": {"x": "missing"}})
+
+    def test_memo_is_bounded(self):
+        index = RateIndex(
+            {"t": {f"model-{i}": RateCard(input_cents_per_1m=i, output_cents_per_1m=i) for i in range(5000)}},
+            memo_size=8,
+        )
+        for i in range(100):
+            self.assertEqual(index.lookup("t", f"model-{i}-2025-01-01").input_cents_per_1m, i)
+        self.assertEqual(len(index._memo), 8)
+
+
+if __name__ == "__main__":
+    unittest.main()
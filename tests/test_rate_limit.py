@@ -0,0 +1,234 @@
+import asyncio
+import json
+import threading
+import unittest
+
+from spendguard_engine.providers.anthropic_provider import acall_anthropic_messages, call_anthropic_messages
+from spendguard_engine.providers.errors import ProviderHTTPError
+from spendguard_engine.providers.openai_provider import acall_openai_chat, call_openai_chat, call_openai_responses
+from spendguard_engine.providers.rate_limit import RateLimit, RateLimiter
+from spendguard_engine.providers.transport import HTTPResponse
+
+MESSAGES = [{"role": "user", "content": "summarize the report"}]
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class _Transport:
+    def __init__(self, headers=None, status=200, input_tokens=30, output_tokens=10):
+        self.headers = headers or {}
+        self.status = status
+        self.usage = {"input_tokens": input_tokens, "output_tokens": output_tokens}
+        self.calls = 0
+
+    def request(self, method, url, *, body=None, headers=None, timeout=None):
+        self.calls += 1
+        body = json.dumps({"content": [], "usage": self.usage}).encode()
+        return HTTPResponse(status=self.status, body=body, headers=self.headers)
+
+
+class _RawResponse:
+    def __init__(self, headers, parsed):
+        self.headers = headers
+        self._parsed = parsed
+
+    def parse(self):
+        return self._parsed
+
+
+class _RawCreate:
+    def __init__(self, endpoint):
+        self._endpoint = endpoint
+
+    def create(self, **kwargs):
+        self._endpoint.calls.append(kwargs)
+        return _RawResponse(self._endpoint.headers, {"usage": {"prompt_tokens": 30, "completion_tokens": 10}})
+
+
+class _AsyncRawCreate(_RawCreate):
+    async def create(self, **kwargs):
+        return _RawCreate.create(self, **kwargs)
+
+
+class _OpenAIEndpoint:
+    def __init__(self, headers, raw=_RawCreate):
+        self.headers = headers
+        self.calls = []
+        self.with_raw_response = raw(self)
+
+
+class _OpenAIClient:
+    api_key = "sk"
+
+    def __init__(self, headers, raw=_RawCreate):
+        self.chat = type("Chat", (), {})()
+        self.chat.completions = _OpenAIEndpoint(headers, raw)
+        self.responses = _OpenAIEndpoint(headers, raw)
+
+
+OPENAI_HEADERS = {"x-ratelimit-limit-tokens": "30000", "x-ratelimit-remaining-tokens": "30000"}
+
+
+class TestRateLimiter(unittest.TestCase):
+    def test_requests_are_queued_in_order(self):
+        clock = _Clock()
+        limiter = RateLimiter(RateLimit(requests_per_minute=60), clock=clock, sleep=clock.sleep)
+        waits = [limiter.reserve("openai", "gpt", "k", 0)[1] for _ in range(63)]
+        self.assertEqual(waits[:60], [0.0] * 60)
+        self.assertEqual(waits[60:], [1.0, 2.0, 3.0])
+        # Keys are per (provider, model, API key).
+        self.assertEqual(limiter.reserve("openai", "gpt", "other-key", 0)[1], 0.0)
+        self.assertEqual(limiter.reserve("openai", "gpt-mini", "k", 0)[1], 0.0)
+        clock.now = 63
+        self.assertEqual(limiter.reserve("openai", "gpt", "k", 0)[1], 0.0)
+
+    def test_tokens_are_reconciled(self):
+        clock = _Clock()
+        limiter = RateLimiter(RateLimit(tokens_per_minute=6000), clock=clock, sleep=clock.sleep)
+        reservation = limiter.acquire("anthropic", "claude", "k", 5000)
+        self.assertEqual(limiter.reserve("anthropic", "claude", "k", 2000)[1], 10.0)
+        limiter.release(limiter.reserve("anthropic", "claude", "k", 0)[0])
+        limiter.reconcile(reservation, 1000)  # 4000 tokens credited back
+        _, wait = limiter.reserve("anthropic", "claude", "k", 2000)
+        self.assertEqual(wait, 0.0)
+
+    def test_adapts_from_headers(self):
+        clock = _Clock()
+        limiter = RateLimiter(clock=clock, sleep=clock.sleep)
+        self.assertEqual(limiter.reserve("openai", "gpt", "k", 10**9)[1], 0.0)  # unknown limits
+        limiter.observe(
+            "openai",
+            "gpt",
+            "k",
+            {
+                "x-ratelimit-limit-requests": "120",
+                "x-ratelimit-remaining-requests": "0",
+                "x-ratelimit-limit-tokens": "600",
+            },
+        )
+        self.assertEqual(limiter.reserve("openai", "gpt", "k", 0)[1], 0.5)
+        self.assertEqual(limiter.reserve("openai", "gpt", "k", 1200)[1], 60.0)
+        limiter.observe("openai", "gpt", "k", {"Retry-After": "90"})
+        self.assertEqual(limiter.reserve("openai", "gpt", "k2", 0)[1], 0.0)
+        self.assertGreaterEqual(limiter.reserve("openai", "gpt", "k", 0)[1], 90.0)
+
+    def test_adapter_call(self):
+        clock = _Clock()
+        limiter = RateLimiter(clock=clock, sleep=clock.sleep)
+        headers = {"anthropic-ratelimit-tokens-limit": "1200", "anthropic-ratelimit-tokens-remaining": "1200"}
+        transport = _Transport(headers=headers)
+        out = limiter.call(call_anthropic_messages, "k", "claude", None, MESSAGES, None, 200, transport=transport)
+        self.assertEqual(out["usage"]["output_tokens"], 10)
+        self.assertEqual(transport.calls, 1)
+        # The limit was learned from the response and the reservation settled to the 40 tokens used.
+        reservation, wait = limiter.reserve("anthropic", "claude", "k", 1160)
+        self.assertEqual(wait, 0.0)
+        self.assertEqual(reservation.tokens, 1160)
+        limiter.release(reservation)
+
+        self.assertNotIn("k", reservation.key)  # API keys are hashed
+
+        limiter.call(call_anthropic_messages, "k", "claude", None, MESSAGES, None, 200, transport=transport)
+        self.assertEqual(limiter.reserve("anthropic", "claude", "k", 1161)[1], 0.05)
+
+    def test_rejections_refund_tokens_and_pause(self):
+        clock = _Clock()
+        limiter = RateLimiter(RateLimit(tokens_per_minute=1000), clock=clock, sleep=clock.sleep)
+        transport = _Transport(
+            status=429,
+            headers={"anthropic-ratelimit-tokens-remaining": "0", "anthropic-ratelimit-tokens-reset": "30"},
+        )
+        with self.assertRaises(ProviderHTTPError):
+            limiter.call(call_anthropic_messages, "k", "claude", None, MESSAGES, None, 500, transport=transport)
+        self.assertEqual(limiter.reserve("anthropic", "claude", "k", 0)[1], 30.0)
+
+    def test_openai_clamps_and_learns_from_successes(self):
+        clock = _Clock()
+        limiter = RateLimiter(RateLimit(tokens_per_minute=20_000), clock=clock, sleep=clock.sleep)
+        client = _OpenAIClient(OPENAI_HEADERS)
+        out = limiter.call(call_openai_chat, client, "gpt-4o", MESSAGES, None, 10**9, False)
+        self.assertEqual(out["usage"]["completion_tokens"], 10)
+        self.assertEqual(client.chat.completions.calls[0]["max_tokens"], 16384)
+        # The reservation used the clamped max_tokens, so nothing waited on the 20k limit.
+        self.assertEqual(clock.sleeps, [])
+        # The 30k limit was learned from the successful response and the call settled to 40 tokens.
+        self.assertEqual(limiter.reserve("openai", "gpt-4o", "sk", 29_960)[1], 0.0)
+
+        limiter = RateLimiter(RateLimit(tokens_per_minute=20_000), clock=clock, sleep=clock.sleep)
+        limiter.call(call_openai_responses, client, {"model": "gpt-4o", "input": "hi"}, 10**9)
+        self.assertEqual(client.responses.calls[0]["max_output_tokens"], 16384)
+        self.assertEqual(clock.sleeps, [])
+        self.assertEqual(limiter.reserve("openai", "gpt-4o", "sk", 29_960)[1], 0.0)
+
+    def test_threads_share_the_budget(self):
+        clock = _Clock()
+        limiter = RateLimiter(RateLimit(requests_per_minute=6), clock=clock, sleep=clock.sleeps.append)
+        transport = _Transport()
+        calls = lambda: limiter.call(  # noqa: E731
+            call_anthropic_messages, "k", "claude", None, MESSAGES, None, 10, transport=transport
+        )
+        threads = [threading.Thread(target=calls) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(transport.calls, 8)
+        self.assertEqual(sorted(clock.sleeps), [10.0, 20.0])
+        with self.assertRaises(ValueError):
+            RateLimiter(max_keys=0)
+
+
+class TestAsyncRateLimiter(unittest.IsolatedAsyncioTestCase):
+    async def test_async_calls_are_spaced(self):
+        limiter = RateLimiter(RateLimit(requests_per_minute=1200))
+        sync = _Transport()
+
+        async def request(method, url, *, body=None, headers=None, timeout=None):
+            return _Transport.request(sync, method, url)
+
+        sync.request = request
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await asyncio.gather(
+            *(
+                limiter.acall(acall_anthropic_messages, "k", "claude", None, MESSAGES, None, 10, transport=sync)
+                for _ in range(1203)
+            )
+        )
+        self.assertEqual(sync.calls, 1203)
+        self.assertGreaterEqual(loop.time() - start, 0.14)
+
+    async def test_async_openai_learns_from_successes(self):
+        limiter = RateLimiter(RateLimit(tokens_per_minute=20_000))
+        client = _OpenAIClient(OPENAI_HEADERS, _AsyncRawCreate)
+        out = await limiter.acall(acall_openai_chat, client, "gpt-4o", MESSAGES, None, 10**9, False)
+        self.assertEqual(out["usage"]["prompt_tokens"], 30)
+        self.assertEqual(client.chat.completions.calls[0]["max_tokens"], 16384)
+        self.assertEqual(limiter.reserve("openai", "gpt-4o", "sk", 29_960)[1], 0.0)
+
+    async def test_cancelled_waiter_returns_its_slot(self):
+        limiter = RateLimiter(RateLimit(requests_per_minute=60))
+        for _ in range(60):
+            limiter.reserve("openai", "gpt", "k", 0)
+        waiter = asyncio.ensure_future(limiter.aacquire("openai", "gpt", "k", 0))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiter
+        _, wait = limiter.reserve("openai", "gpt", "k", 0)
+        self.assertLess(wait, 1.5)  # not 2s: the cancelled waiter's slot was returned
+
+
+if __name__ == "__main__":
+    unittest.main()
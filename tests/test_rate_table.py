@@ -0,0 +1,77 @@
+import threading
+import unittest
+
+from spendguard_engine.billing import compute_cost_breakdown
+from spendguard_engine.pricing import DEFAULT_RATES, RateCard, copy_rates, merge_rates
+from spendguard_engine.rate_table import RateTable, RateTableRef
+
+
+class TestRateTable(unittest.TestCase):
+    def test_overlay_shares_untouched_providers(self):
+        base = RateTable(DEFAULT_RATES)
+        card = RateCard(input_cents_per_1m=1, output_cents_per_1m=2)
+        new = base.overlay({"openai": {"gpt-4o": card}})
+
+        self.assertIs(new["anthropic"], base["anthropic"])
+        self.assertIsNot(new["openai"], base["openai"])
+        self.assertEqual(new.get_rate("openai", "gpt-4o"), card)
+        self.assertEqual(base.get_rate("openai", "gpt-4o"), DEFAULT_RATES["openai"]["gpt-4o"])
+        self.assertNotEqual(new.version, base.version)
+
+        expected = copy_rates(DEFAULT_RATES)
+        merge_rates(expected, {"openai": {"gpt-4o": card}})
+        self.assertEqual(new.to_rates(), expected)
+
+    def test_snapshot_is_immutable(self):
+        table = RateTable(DEFAULT_RATES)
+        with self.assertRaises(TypeError):
+            table["openai"]["gpt-4o"] = RateCard(input_cents_per_1m=1, output_cents_per_1m=1)
+
+    def test_version_is_content_hash(self):
+        a = RateTable(DEFAULT_RATES)
+        b = RateTable(copy_rates(DEFAULT_RATES))
+        self.assertEqual(a.version, b.version)
+        self.assertTrue(a.version.startswith("rt-"))
+        same = a.overlay({"openai": {"gpt-4o": DEFAULT_RATES["openai"]["gpt-4o"]}})
+        self.assertEqual(same.version, a.version)
+
+    def test_index_and_version_stamp(self):
+        table = RateTable(DEFAULT_RATES)
+        resolved = table.index.resolve("openai", "gpt-4o-2024-08-06")
+        b = compute_cost_breakdown(
+            provider="openai",
+            model=resolved.model,
+            rate_card=resolved.rate_card,
+            input_tokens=1,
+            output_tokens=1,
+            rate_version=table.version,
+        )
+        self.assertEqual(b["rate_version"], table.version)
+        self.assertNotIn(
+            "rate_version",
+            compute_cost_breakdown(
+                provider="openai", model="m", rate_card=resolved.rate_card, input_tokens=1, output_tokens=1
+            ),
+        )
+
+    def test_ref_overlays_are_not_lost(self):
+        ref = RateTableRef(RateTable(DEFAULT_RATES))
+
+        def writer(i):
+            ref.apply_overlay({"tenant": {f"m-{i}": RateCard(input_cents_per_1m=i, output_cents_per_1m=i)}})
+
+        threads = [threading.Thread(target=writer, args=(i,)) for i in range(50)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(ref.current["tenant"]), 50)
+
+        old = ref.current
+        previous = ref.swap(RateTable({}))
+        self.assertIs(previous, old)
+        self.assertEqual(len(ref.current), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
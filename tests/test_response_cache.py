@@ -0,0 +1,196 @@
+import asyncio
+import json
+import threading
+import time
+import unittest
+
+from spendguard_engine.billing import LazyCostBreakdown, compute_cost_breakdown, compute_cost_totals
+from spendguard_engine.pricing import RateCard
+from spendguard_engine.providers.anthropic_provider import (
+    acall_anthropic_messages,
+    call_anthropic_messages,
+    normalize_anthropic_usage,
+)
+from spendguard_engine.providers.cache import ResponseCache, request_fingerprint
+from spendguard_engine.providers.transport import HTTPResponse
+
+CARD = RateCard(input_cents_per_1m=300, output_cents_per_1m=1500)
+BODY = json.dumps(
+    {"content": [{"type": "text", "text": "positive"}], "usage": {"input_tokens": 40, "output_tokens": 2}}
+)
+
+
+class _CountingTransport:
+    def __init__(self):
+        self.calls = 0
+
+    def request(self, method, url, *, body=None, headers=None, timeout=None):
+        self.calls += 1
+        return HTTPResponse(status=200, body=BODY.encode())
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestFingerprint(unittest.TestCase):
+    def test_canonical(self):
+        a = request_fingerprint("openai", "m", {"input": "x", "temperature": 0})
+        self.assertEqual(a, request_fingerprint("openai", "m", {"temperature": 0, "input": "x"}))
+        self.assertNotEqual(a, request_fingerprint("openai", "m", {"input": "x", "temperature": 0}, namespace="t2"))
+        self.assertNotEqual(a, request_fingerprint("openai", "m2", {"input": "x", "temperature": 0}))
+
+    def test_adapter_fingerprint(self):
+        cache = ResponseCache()
+        messages = [{"role": "user", "content": "classify"}]
+        key = cache.fingerprint(call_anthropic_messages, "key-1", "claude", None, messages, 0, 16)
+        self.assertIsNotNone(key)
+        # Transport does not matter and sync and async calls share entries, but API keys are kept apart.
+        self.assertEqual(
+            key, cache.fingerprint(call_anthropic_messages, "key-1", "claude", None, messages, 0.0, 16, transport=None)
+        )
+        self.assertNotEqual(key, cache.fingerprint(call_anthropic_messages, "key-2", "claude", None, messages, 0, 16))
+        self.assertNotIn("key-1", key)
+        shared = ResponseCache(share_across_keys=True)
+        self.assertEqual(
+            shared.fingerprint(call_anthropic_messages, "key-1", "claude", None, messages, 0, 16),
+            shared.fingerprint(call_anthropic_messages, "key-2", "claude", None, messages, 0, 16),
+        )
+        self.assertEqual(key, cache.fingerprint(acall_anthropic_messages, "key-1", "claude", None, messages, 0, 16))
+        self.assertNotEqual(key, cache.fingerprint(call_anthropic_messages, "key-1", "claude", None, messages, 0, 32))
+        self.assertIsNone(cache.fingerprint(call_anthropic_messages, "k", "claude", None, messages, 0.7, 16))
+        self.assertIsNone(cache.fingerprint(call_anthropic_messages, "k", "claude", None, messages, None, 16))
+
+
+class TestResponseCache(unittest.TestCase):
+    def test_lru_bytes_and_ttl(self):
+        clock = _Clock()
+        cache = ResponseCache(max_bytes=40, ttl=10, clock=clock)
+        for key in ("a", "b"):
+            cache.get_or_call(key, lambda: {"v": "x" * 8})  # 16 bytes serialized
+        self.assertEqual(cache.bytes_used, 32)
+        self.assertTrue(cache.get_or_call("a", lambda: None).hit)  # "a" is now most recent
+        cache.get_or_call("c", lambda: {"v": "y" * 8})
+        self.assertEqual((len(cache), cache.evictions), (2, 1))
+        self.assertFalse(cache.get_or_call("b", lambda: {"v": "b"}).hit)
+        self.assertFalse(cache.get_or_call("big", lambda: {"v": "z" * 100}).hit)
+        self.assertFalse(cache.get_or_call("big", lambda: {"v": "z" * 100}).hit)
+        clock.now = 10
+        self.assertFalse(cache.get_or_call("a", lambda: {"v": "new"}).hit)
+
+    def test_hits_are_copies(self):
+        cache = ResponseCache()
+        cache.get_or_call("k", lambda: {"usage": {"input_tokens": 1}})
+        first = cache.get_or_call("k", lambda: None).value
+        first["usage"]["input_tokens"] = 99
+        self.assertEqual(cache.get_or_call("k", lambda: None).value, {"usage": {"input_tokens": 1}})
+
+    def test_threads_are_coalesced(self):
+        cache = ResponseCache()
+        calls = []
+
+        def slow():
+            calls.append(1)
+            time.sleep(0.2)
+            return {"ok": True}
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get_or_call("k", slow))) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(r.hit for r in results), [False] + [True] * 7)
+        self.assertEqual(cache.coalesced + cache.hits, 7)
+
+    def test_failures_are_shared_not_cached(self):
+        cache = ResponseCache()
+
+        def boom():
+            raise RuntimeError("provider down")
+
+        with self.assertRaises(RuntimeError):
+            cache.get_or_call("k", boom)
+        self.assertEqual(len(cache), 0)
+        self.assertFalse(cache.get_or_call("k", lambda: {"ok": 1}).hit)
+
+    def test_adapter_hits_bill_zero(self):
+        cache = ResponseCache()
+        transport = _CountingTransport()
+        messages = [{"role": "user", "content": "classify"}]
+        first = cache.call(call_anthropic_messages, "k", "claude", None, messages, 0, 16, transport=transport)
+        second = cache.call(call_anthropic_messages, "k", "claude", None, messages, 0, 16, transport=transport)
+        self.assertEqual(transport.calls, 1)
+        self.assertEqual((first.hit, second.hit), (False, True))
+        self.assertEqual(second.value, first.value)
+        uncached = cache.call(call_anthropic_messages, "k", "claude", None, messages, 1.0, 16, transport=transport)
+        self.assertEqual((transport.calls, uncached.hit, uncached.fingerprint), (2, False, None))
+
+        usage = normalize_anthropic_usage(second.value)
+        paid = compute_cost_breakdown(provider="anthropic", model="claude", rate_card=CARD, **usage)
+        free = compute_cost_breakdown(
+            provider="anthropic", model="claude", rate_card=CARD, response_cache_hit=second.hit, **usage
+        )
+        self.assertGreater(paid["totals"]["realized_microcents"], 0)
+        self.assertEqual(free["totals"], {"realized_microcents": 0, "realized_cents_ceiled": 0})
+        self.assertEqual((free["charges"], free["response_cache_hit"]), ([], True))
+        self.assertEqual(free["usage"]["input_tokens"], 40)
+        self.assertEqual(tuple(compute_cost_totals(rate_card=CARD, response_cache_hit=True, **usage)), (0, 0))
+        lazy = LazyCostBreakdown(provider="anthropic", model="claude", rate_card=CARD, response_cache_hit=True, **usage)
+        self.assertEqual(lazy.to_dict(), free)
+
+
+class TestAsyncResponseCache(unittest.IsolatedAsyncioTestCase):
+    async def test_tasks_are_coalesced(self):
+        cache = ResponseCache()
+        calls = []
+
+        async def slow():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return {"ok": True}
+
+        results = await asyncio.gather(*(cache.aget_or_call("k", slow) for _ in range(5)))
+        self.assertEqual(len(calls), 1)
+        self.assertEqual([r.hit for r in results], [False, True, True, True, True])
+        self.assertTrue((await cache.aget_or_call("k", slow)).hit)
+
+    async def test_cancelled_leader_hands_over(self):
+        cache = ResponseCache()
+        started = asyncio.Event()
+
+        async def slow():
+            started.set()
+            await asyncio.sleep(0.05)
+            return {"ok": True}
+
+        leader = asyncio.ensure_future(cache.aget_or_call("k", slow))
+        await started.wait()
+        follower = asyncio.ensure_future(cache.aget_or_call("k", slow))
+        await asyncio.sleep(0)
+        leader.cancel()
+        result = await follower
+        self.assertFalse(result.hit)
+        self.assertEqual(result.value, {"ok": True})
+
+    async def test_async_adapter(self):
+        cache = ResponseCache()
+        transport = _CountingTransport()
+
+        async def request(method, url, *, body=None, headers=None, timeout=None):
+            return _CountingTransport.request(transport, method, url)
+
+        transport.request = request
+        messages = [{"role": "user", "content": "classify"}]
+        for _ in range(3):
+            out = await cache.acall(acall_anthropic_messages, "k", "claude", None, messages, 0, 8, transport=transport)
+        self.assertEqual((transport.calls, out.hit), (1, True))
+
+
+if __name__ == "__main__":
+    unittest.main()
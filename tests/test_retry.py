@@ -0,0 +1,215 @@
+import asyncio
+import json
+import threading
+import time
+import unittest
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from spendguard_engine.pricing import RateCard
+from spendguard_engine.providers.anthropic_provider import call_anthropic_messages
+from spendguard_engine.providers.errors import ProviderConnectionError, ProviderHTTPError
+from spendguard_engine.providers.retry import (
+    Hedger,
+    RetryPolicy,
+    acall_with_retry,
+    call_with_retry,
+    retry_after_seconds,
+    worst_case_request_microcents,
+)
+from spendguard_engine.providers.transport import HTTPTransport
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        server = self.server
+        with server.lock:
+            server.calls += 1
+            call = server.calls
+        status, headers, delay = (200, {}, 0.0)
+        if call <= len(server.script):
+            status, headers, delay = server.script[call - 1]
+        time.sleep(delay)
+        data = json.dumps({"call": call, "usage": {"input_tokens": 1, "output_tokens": 1}}).encode()
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class TestRetryAfter(unittest.TestCase):
+    def test_header_forms(self):
+        now = 1_700_000_000.0
+        self.assertEqual(retry_after_seconds({"Retry-After": "3"}, now=now), 3.0)
+        self.assertEqual(retry_after_seconds({"retry-after-ms": "250"}, now=now), 0.25)
+        self.assertEqual(retry_after_seconds({"retry-after": formatdate(now + 10, usegmt=True)}, now=now), 10.0)
+        self.assertIsNone(retry_after_seconds({"x-ratelimit-reset-requests": "1s"}, now=now))
+        self.assertEqual(
+            retry_after_seconds({"x-ratelimit-remaining-tokens": "0", "x-ratelimit-reset-tokens": "1m2.5s"}, now=now),
+            62.5,
+        )
+        self.assertEqual(
+            retry_after_seconds(
+                {
+                    "anthropic-ratelimit-requests-remaining": "0",
+                    "anthropic-ratelimit-requests-reset": "2023-11-14T22:13:25Z",
+                },
+                now=now,
+            ),
+            5.0,
+        )
+        self.assertEqual(retry_after_seconds({"retry-after": "1", "retry-after-ms": "4000"}, now=now), 4.0)
+        self.assertIsNone(retry_after_seconds({}, now=now))
+
+
+class TestRetryPolicy(unittest.TestCase):
+    def test_backoff_is_capped_full_jitter(self):
+        policy = RetryPolicy(base_delay=1, max_delay=5)
+        self.assertEqual([policy.backoff(a, rng=lambda: 1.0) for a in (1, 2, 3, 4, 5)], [1, 2, 4, 5, 5])
+        self.assertEqual(policy.backoff(3, rng=lambda: 0.5), 2)
+
+    def test_next_delay(self):
+        policy = RetryPolicy(max_attempts=3, max_retry_after=10)
+        self.assertIsNone(policy.next_delay(1, ProviderHTTPError("x", status=400)))
+        self.assertIsNone(policy.next_delay(1, ValueError()))
+        self.assertIsNotNone(policy.next_delay(1, ProviderConnectionError("x")))
+        self.assertEqual(policy.next_delay(1, ProviderHTTPError("x", status=429, headers={"retry-after": "7"})), 7)
+        self.assertIsNone(policy.next_delay(1, ProviderHTTPError("x", status=429, headers={"retry-after": "60"})))
+        self.assertIsNone(policy.next_delay(3, ProviderHTTPError("x", status=503)))
+
+    def test_sdk_style_errors(self):
+        class APIStatusError(Exception):
+            def __init__(self):
+                self.status_code = 429
+                self.response = type("R", (), {"headers": {"retry-after-ms": "1500"}})()
+
+        self.assertEqual(RetryPolicy().next_delay(1, APIStatusError()), 1.5)
+
+
+class TestRetryAgainstStub(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self.server.daemon_threads = True
+        self.server.lock = threading.Lock()
+        self.server.calls = 0
+        self.server.script = []
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.transport = HTTPTransport(timeout=5)
+
+    def tearDown(self):
+        self.transport.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _call(self):
+        return call_anthropic_messages(
+            "key", "claude", None, [], None, 10, transport=self.transport, base_url=self.base_url
+        )
+
+    def test_429s_are_retried_with_server_delay(self):
+        self.server.script = [(429, {"Retry-After": "2"}, 0), (529, {}, 0)]
+        sleeps = []
+        out = call_with_retry(self._call, sleep=sleeps.append, rng=lambda: 0.5)
+        self.assertEqual(out["call"], 3)
+        self.assertEqual(sleeps, [2.0, 0.5])
+
+    def test_gives_up_and_raises_last_error(self):
+        self.server.script = [(429, {}, 0)] * 5
+        with self.assertRaises(ProviderHTTPError) as ctx:
+            call_with_retry(self._call, policy=RetryPolicy(max_attempts=2), sleep=lambda s: None)
+        self.assertEqual(ctx.exception.status, 429)
+        self.assertIn("Anthropic request failed", str(ctx.exception))
+        self.assertEqual(self.server.calls, 2)
+
+    def test_non_retryable_status(self):
+        self.server.script = [(400, {}, 0)]
+        with self.assertRaises(ProviderHTTPError):
+            call_with_retry(self._call, sleep=lambda s: None)
+        self.assertEqual(self.server.calls, 1)
+
+    def test_hedge_beats_slow_primary(self):
+        hedger = Hedger(min_samples=1)
+        hedger.record(0.05)
+        self.server.script = [(200, {}, 1.0)]
+        transport = HTTPTransport(timeout=5)
+        start = time.monotonic()
+        out = hedger.call(
+            lambda: call_anthropic_messages("k", "m", None, [], None, 1, transport=transport, base_url=self.base_url),
+            worst_case_microcents=100,
+            budget_microcents=100,
+        )
+        self.assertEqual(out["call"], 2)
+        self.assertLess(time.monotonic() - start, 0.9)
+        self.assertEqual(hedger.hedges_sent, 1)
+
+    def test_hedging_respects_budget(self):
+        hedger = Hedger(min_samples=1, max_hedges=3)
+        hedger.record(0.01)
+        self.assertEqual(hedger.hedges_allowed(worst_case_microcents=100, budget_microcents=250), 2)
+        self.assertEqual(hedger.hedges_allowed(worst_case_microcents=100, budget_microcents=99), 0)
+        # An unknown worst case never buys hedges.
+        self.assertEqual(hedger.hedges_allowed(worst_case_microcents=0, budget_microcents=10**9), 0)
+        self.server.script = [(200, {}, 0.2)]
+        out = hedger.call(self._call, worst_case_microcents=100, budget_microcents=99)
+        self.assertEqual(out["call"], 1)
+        self.assertEqual(hedger.hedges_sent, 0)
+
+    def test_worst_case_pricing(self):
+        card = RateCard(
+            input_cents_per_1m=300,
+            output_cents_per_1m=1500,
+            reasoning_output_cents_per_1m=2000,
+            cache_write_input_cents_per_1m=375,
+        )
+        self.assertEqual(
+            worst_case_request_microcents(card, input_tokens=1000, max_output_tokens=500), 1000 * 375 + 500 * 2000
+        )
+
+
+class TestAsyncRetryAndHedge(unittest.IsolatedAsyncioTestCase):
+    async def test_async_retry(self):
+        attempts = []
+
+        async def flaky():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise ProviderHTTPError("busy", status=503, headers={"retry-after": "0"})
+            return "ok"
+
+        self.assertEqual(await acall_with_retry(flaky), "ok")
+        self.assertEqual(len(attempts), 3)
+
+    async def test_async_hedge_cancels_loser(self):
+        hedger = Hedger(min_samples=1)
+        hedger.record(0.02)
+        started = []
+        cancelled = []
+
+        async def call():
+            index = len(started)
+            started.append(index)
+            try:
+                await asyncio.sleep(1.0 if index == 0 else 0.01)
+            except asyncio.CancelledError:
+                cancelled.append(index)
+                raise
+            return index
+
+        self.assertEqual(await hedger.acall(call, worst_case_microcents=1, budget_microcents=1), 1)
+        await asyncio.sleep(0)
+        self.assertEqual(cancelled, [0])
+        # The cancelled primary ran ~0.03s; it is recorded, so the p95 is not just the fast winners.
+        self.assertGreater(hedger.delay(), 0.025)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,215 @@
+import json
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from spendguard_engine.billing import compute_cost_breakdown
+from spendguard_engine.pricing import RateCard
+from spendguard_engine.providers.anthropic_provider import extract_anthropic_usage, stream_anthropic_messages
+from spendguard_engine.providers.gemini_provider import (
+    extract_gemini_usage,
+    normalize_gemini_usage,
+    stream_gemini_generate_content,
+)
+from spendguard_engine.providers.sse import SSEDecoder, ServerSentEvent, iter_sse_events
+from spendguard_engine.providers.transport import HTTPTransport
+
+ANTHROPIC_EVENTS = [
+    ("message_start", {"type": "message_start", "message": {"usage": {"input_tokens": 25, "output_tokens": 1}}}),
+    ("ping", {"type": "ping"}),
+    ("content_block_start", {"type": "content_block_start", "index": 0, "content_block": {"type": "text"}}),
+    ("content_block_delta", {"type": "content_block_delta", "delta": {"type": "text_delta", "text": "Hello"}}),
+    ("content_block_delta", {"type": "content_block_delta", "delta": {"type": "text_delta", "text": " world"}}),
+    ("content_block_stop", {"type": "content_block_stop", "index": 0}),
+    ("message_delta", {"type": "message_delta", "delta": {"stop_reason": "end_turn"}, "usage": {"output_tokens": 15}}),
+    ("message_stop", {"type": "message_stop"}),
+]
+
+GEMINI_CHUNKS = [
+    {"candidates": [{"content": {"parts": [{"text": "Hel"}]}}]},
+    {"candidates": [{"content": {"parts": [{"text": "lo"}]}}], "usageMetadata": {"promptTokenCount": 9}},
+    {
+        "candidates": [{"content": {"parts": [{"text": "!"}]}, "finishReason": "STOP"}],
+        "usageMetadata": {"promptTokenCount": 9, "candidatesTokenCount": 3, "totalTokenCount": 12},
+    },
+]
+
+GROUNDED_CHUNKS = [
+    {"candidates": [{"content": {"parts": [{"text": "Sunny"}]}}]},
+    {
+        "candidates": [
+            {
+                "content": {"parts": [{"text": "."}]},
+                "finishReason": "STOP",
+                "groundingMetadata": {"webSearchQueries": ["weather paris", "paris forecast"]},
+            }
+        ],
+        "usageMetadata": {"promptTokenCount": 9, "candidatesTokenCount": 2},
+    },
+]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        self.server.paths.append(self.path)
+        if "missing" in self.path:
+            self.send_response(404)
+            self.send_header("Content-Length", "9")
+            self.end_headers()
+            self.wfile.write(b"not found")
+            return
+        if self.path == "/v1/messages":
+            frames = [f"event: {name}\ndata: {json.dumps(data)}\n\n" for name, data in ANTHROPIC_EVENTS]
+        elif self.path.endswith(":streamGenerateContent?alt=sse"):
+            chunks = GROUNDED_CHUNKS if "grounded" in self.path else GEMINI_CHUNKS
+            frames = [f"data: {json.dumps(chunk)}\r\n\r\n" for chunk in chunks]
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for frame in frames:
+            data = frame.encode("utf-8")
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+
+class TestSSEDecoder(unittest.TestCase):
+    def test_spec_cases(self):
+        lines = [
+            ": comment\n",
+            "event: update\n",
+            "id: 7\n",
+            "data: first\n",
+            "data:second\n",
+            "\n",
+            "\n",
+            "retry: 100\n",
+            "data: {}\r\n",
+            "\r\n",
+            "data: trailing",
+        ]
+        self.assertEqual(
+            list(iter_sse_events(lines)),
+            [
+                ServerSentEvent(event="update", data="first\nsecond", id="7"),
+                ServerSentEvent(event="message", data="{}", id="7"),
+                ServerSentEvent(event="message", data="trailing", id="7"),
+            ],
+        )
+
+    def test_incremental(self):
+        decoder = SSEDecoder()
+        self.assertIsNone(decoder.decode(b"data: x\n"))
+        self.assertEqual(decoder.decode(b"\n"), ServerSentEvent(event="message", data="x"))
+        self.assertIsNone(decoder.flush())
+
+
+class TestStreamingAdapters(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self.server.daemon_threads = True
+        self.server.paths = []
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.transport = HTTPTransport(timeout=5)
+
+    def tearDown(self):
+        self.transport.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_anthropic_stream(self):
+        stream = stream_anthropic_messages(
+            "key", "claude", None, [], None, 100, transport=self.transport, base_url=self.base_url
+        )
+        self.assertEqual(list(stream), ["Hello", " world"])
+        self.assertTrue(stream.done)
+        self.assertEqual(stream.stop_reason, "end_turn")
+        self.assertEqual(extract_anthropic_usage(stream.usage_payload()), (25, 15))
+
+        input_tokens, output_tokens = extract_anthropic_usage(stream.usage_payload())
+        breakdown = compute_cost_breakdown(
+            provider="anthropic",
+            model="claude",
+            rate_card=RateCard(input_cents_per_1m=300, output_cents_per_1m=1500),
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+        )
+        self.assertEqual(breakdown["totals"]["realized_microcents"], 25 * 300 + 15 * 1500)
+
+        # A fully read stream hands its connection back to the pool.
+        list(
+            stream_anthropic_messages(
+                "key", "claude", None, [], None, 100, transport=self.transport, base_url=self.base_url
+            )
+        )
+        self.assertEqual(self.transport.connections_opened, 1)
+
+    def test_gemini_stream(self):
+        with stream_gemini_generate_content(
+            "key", "gemini-pro", "hi", None, 100, transport=self.transport, base_url=self.base_url
+        ) as stream:
+            self.assertEqual("".join(stream), "Hello!")
+        self.assertEqual(stream.finish_reason, "STOP")
+        self.assertEqual(extract_gemini_usage(stream.usage_payload()), (9, 3))
+        self.assertEqual(self.server.paths, ["/v1beta/models/gemini-pro:streamGenerateContent?alt=sse"])
+
+    def test_gemini_stream_keeps_grounding(self):
+        with stream_gemini_generate_content(
+            "key", "gemini-grounded", "weather?", None, 100, transport=self.transport, base_url=self.base_url
+        ) as stream:
+            self.assertEqual("".join(stream), "Sunny.")
+        usage = normalize_gemini_usage(stream.usage_payload())
+        self.assertEqual((usage.input_tokens, usage.output_tokens, usage.grounding_queries), (9, 2, 2))
+
+        with stream_gemini_generate_content(
+            "key", "gemini-pro", "hi", None, 100, transport=self.transport, base_url=self.base_url
+        ) as stream:
+            list(stream)
+        self.assertNotIn("candidates", stream.usage_payload())
+
+    def test_abandoned_stream_is_not_reused(self):
+        stream = stream_anthropic_messages(
+            "key", "claude", None, [], None, 100, transport=self.transport, base_url=self.base_url
+        )
+        self.assertEqual(next(stream), "Hello")
+        stream.close()
+        self.assertEqual(self.transport.idle_connections(), 0)
+        self.assertEqual(
+            list(
+                stream_anthropic_messages(
+                    "key", "c", None, [], None, 1, transport=self.transport, base_url=self.base_url
+                )
+            ),
+            ["Hello", " world"],
+        )
+        self.assertEqual(self.transport.connections_opened, 2)
+
+    def test_dropped_streams_return_their_slots(self):
+        transport = HTTPTransport(timeout=5, max_connections_per_host=2, pool_timeout=2)
+        for _ in range(5):
+            stream_anthropic_messages("key", "claude", None, [], None, 1, transport=transport, base_url=self.base_url)
+            stream = stream_gemini_generate_content(
+                "key", "gemini-pro", "hi", None, 1, transport=transport, base_url=self.base_url
+            )
+            self.assertEqual(next(stream), "Hel")
+            del stream
+        self.assertEqual(transport.idle_connections(), 0)
+        transport.close()
+
+    def test_http_errors(self):
+        with self.assertRaisesRegex(RuntimeError, "Gemini request failed: not found"):
+            stream_gemini_generate_content(
+                "key", "missing", "hi", None, 1, transport=self.transport, base_url=self.base_url
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
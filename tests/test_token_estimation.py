@@ -0,0 +1,106 @@
+import unittest
+
+from spendguard_engine.pricing import estimate_tokens_text
+from spendguard_engine.token_estimation import (
+    IMAGE_TOKENS,
+    MESSAGE_OVERHEAD_TOKENS,
+    REPLY_PRIMING_TOKENS,
+    TokenEstimator,
+    estimate_tokens_anthropic,
+    estimate_tokens_messages,
+    estimate_tokens_responses,
+    estimate_tokens_text_classes,
+)
+
+
+class TestTokenEstimation(unittest.TestCase):
+    def test_ascii_matches_heuristic(self):
+        for text in ("", "a", "hello", "x" * 1000):
+            self.assertEqual(estimate_tokens_text_classes(text), estimate_tokens_text(text))
+
+    def test_codepoint_classes(self):
+        self.assertEqual(estimate_tokens_text_classes("ж" * 10), 5)  # Cyrillic, 2-byte
+        self.assertEqual(estimate_tokens_text_classes("中" * 10), 10)  # CJK, 3-byte
+        self.assertEqual(estimate_tokens_text_classes("\U0001f600" * 3), 6)  # emoji, astral
+        self.assertEqual(estimate_tokens_text_classes("abcж中\U0001f600"), 1 + 1 + 1 + 2)
+
+    def test_chat_messages(self):
+        messages = [
+            {"role": "system", "content": "You are terse."},
+            {
+                "role": "user",
+                "content": [{"type": "text", "text": "hello"}, {"type": "image_url", "image_url": {"url": "data:..."}}],
+            },
+        ]
+        expected = (
+            REPLY_PRIMING_TOKENS
+            + 2 * MESSAGE_OVERHEAD_TOKENS
+            + estimate_tokens_text("system")
+            + estimate_tokens_text("You are terse.")
+            + estimate_tokens_text("user")
+            + estimate_tokens_text("hello")
+            + IMAGE_TOKENS
+        )
+        self.assertEqual(estimate_tokens_messages(messages), expected)
+
+    def test_responses_payload(self):
+        payload = {
+            "model": "gpt-5.2",
+            "instructions": "Be brief.",
+            "input": [
+                {"role": "user", "content": [{"type": "input_text", "text": "hi"}]},
+                {"type": "function_call_output", "call_id": "c1", "output": "42"},
+            ],
+        }
+        expected = (
+            REPLY_PRIMING_TOKENS
+            + MESSAGE_OVERHEAD_TOKENS
+            + estimate_tokens_text("Be brief.")
+            + MESSAGE_OVERHEAD_TOKENS
+            + estimate_tokens_text("user")
+            + estimate_tokens_text("hi")
+            + estimate_tokens_text("42")
+        )
+        self.assertEqual(estimate_tokens_responses(payload), expected)
+        self.assertEqual(
+            estimate_tokens_responses({"input": "hi"}),
+            REPLY_PRIMING_TOKENS + MESSAGE_OVERHEAD_TOKENS + 1,
+        )
+
+    def test_anthropic_blocks(self):
+        messages = [
+            {"role": "user", "content": "weather?"},
+            {
+                "role": "assistant",
+                "content": [{"type": "tool_use", "id": "t1", "name": "get_weather", "input": {"city": "Paris"}}],
+            },
+            {"role": "user", "content": [{"type": "tool_result", "tool_use_id": "t1", "content": "sunny"}]},
+        ]
+        tokens = estimate_tokens_anthropic([{"type": "text", "text": "sys"}], messages)
+        self.assertGreater(tokens, estimate_tokens_anthropic(None, messages))
+        self.assertGreaterEqual(tokens, REPLY_PRIMING_TOKENS + 4 * MESSAGE_OVERHEAD_TOKENS)
+
+    def test_long_text_is_memoized(self):
+        estimator = TokenEstimator(memo_max_entries=2)
+        system = "中" * 5_000
+        calls = []
+        original = estimator._count_text
+
+        def counting(tokenizer, text):
+            calls.append(len(text))
+            return original(tokenizer, text)
+
+        estimator._count_text = counting
+        for turn in range(3):
+            messages = [{"role": "system", "content": system}] + [{"role": "user", "content": "q" * 300}] * turn
+            estimator.messages(messages)
+        self.assertEqual(calls.count(5_000), 1)
+
+        # The memo is bounded by entries and keyed by digest, never by the prompt text itself.
+        estimator.text("ж" * 6_000)
+        self.assertEqual(len(estimator._memo), 2)
+        self.assertTrue(all(isinstance(key, bytes) and len(key) == 16 for key in estimator._memo))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+import base64
+import os
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from spendguard_engine import tokenizers
+
+from spendguard_engine.pricing import estimate_tokens_text
+from spendguard_engine.token_estimation import TokenEstimator
+from spendguard_engine.tokenizers import (
+    VOCAB_ENV,
+    BPETokenizer,
+    HeuristicTokenizer,
+    get_default_tokenizer,
+    set_default_tokenizer,
+)
+
+
+def _write_vocab(path):
+    ranks = {bytes([b]): b for b in range(256)}
+    for token in (b"he", b"ll", b"hell", b"hello", b" w", b" wor", b" world"):
+        ranks[token] = len(ranks)
+    with open(path, "wb") as f:
+        for token, rank in ranks.items():
+            f.write(base64.b64encode(token) + b" " + str(rank).encode() + b"\n")
+
+
+class TestTokenizers(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.vocab = os.path.join(self._tmp.name, "vocab.tiktoken")
+        _write_vocab(self.vocab)
+
+    def tearDown(self):
+        set_default_tokenizer(None)
+        self._tmp.cleanup()
+
+    def test_bpe_loads_lazily_and_merges(self):
+        tok = BPETokenizer(self.vocab)
+        self.assertFalse(tok.loaded)
+        self.assertEqual(tok.encode("hello world"), [259, 262])
+        self.assertTrue(tok.loaded)
+        self.assertEqual(tok.count("hello world"), 2)
+        self.assertEqual(tok.count("hex"), 2)  # "he" + "x"
+        self.assertEqual(tok.count(""), 0)
+
+    def test_segment_cache(self):
+        tok = BPETokenizer(self.vocab, cache_size=16)
+        tok.count("hello hello hello")
+        info = tok.cache_info()
+        self.assertGreater(info.hits, 0)
+        self.assertLessEqual(info.currsize, 16)
+
+    def test_batch_across_workers(self):
+        tok = BPETokenizer(self.vocab)
+        texts = ["hello world", "hex", "", "hello"] * 50
+        expected = [tok.count(t) for t in texts]
+        self.assertEqual(tok.count_batch(texts, workers=2), expected)
+        pool = tok._pool
+        self.assertEqual(tok.count_batch(texts, workers=2), expected)
+        self.assertIs(tok._pool, pool)  # worker processes (and their vocabularies) are reused
+        tok.close()
+        self.assertIsNone(tok._pool)
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            self.assertEqual(tok.count_batch(texts, executor=pool), expected)
+        self.assertEqual(HeuristicTokenizer().count_batch(["abc", "abcd"], workers=2), [1, 2])
+
+    def test_missing_file_fails_on_first_use(self):
+        tok = BPETokenizer(os.path.join(self._tmp.name, "missing"))
+        with self.assertRaises(FileNotFoundError):
+            tok.count("hello")
+
+    def test_missing_env_vocab_falls_back_to_heuristic(self):
+        set_default_tokenizer(None)
+        tokenizers._default_resolved = False
+        with mock.patch.dict(os.environ, {VOCAB_ENV: os.path.join(self._tmp.name, "missing")}):
+            self.assertIsNone(get_default_tokenizer())
+            self.assertEqual(estimate_tokens_text("hello world"), 4)
+
+    def test_default_tokenizer_feeds_estimators(self):
+        set_default_tokenizer(None)
+        self.assertIsNone(get_default_tokenizer())
+        self.assertEqual(estimate_tokens_text("hello world"), 4)
+
+        set_default_tokenizer(BPETokenizer(self.vocab))
+        self.assertEqual(estimate_tokens_text("hello world"), 2)
+        estimator = TokenEstimator()
+        long_text = "hello world" * 30
+        first = estimator.text(long_text)
+        set_default_tokenizer(None)
+        # Memoized counts are not reused across tokenizer changes.
+        self.assertNotEqual(estimator.text(long_text), first)
+
+
+if __name__ == "__main__":
+    unittest.main()
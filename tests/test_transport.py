@@ -0,0 +1,182 @@
+import json
+import os
+import socket
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from spendguard_engine.providers.anthropic_provider import call_anthropic_messages
+from spendguard_engine.providers.gemini_provider import call_gemini_generate_content
+from spendguard_engine.providers.transport import TIMEOUT_ENV, HTTPTransport, default_timeout
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        with server.lock:
+            server.requests.append((self.path, dict(self.headers), body))
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        try:
+            if self.path.startswith("/vanish"):
+                # Read the request, then reset instead of answering.
+                self.close_connection = True
+                return
+            if self.path.startswith("/slow"):
+                time.sleep(0.3)
+            status, payload = server.responses.get(self.path.split("?")[0], (200, {"ok": True}))
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+            if self.path.startswith("/drop"):
+                # Advertise keep-alive, then close anyway (like a server-side idle timeout).
+                self.close_connection = True
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+
+class TestHTTPTransport(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self.server.daemon_threads = True
+        self.server.lock = threading.Lock()
+        self.server.requests = []
+        self.server.responses = {}
+        self.server.in_flight = 0
+        self.server.max_in_flight = 0
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.transport = HTTPTransport(timeout=5)
+
+    def tearDown(self):
+        self.transport.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_connections_are_kept_alive_and_reused(self):
+        for _ in range(5):
+            resp = self.transport.request("POST", f"{self.base_url}/x", body=b"{}")
+            self.assertEqual(resp.status, 200)
+            self.assertEqual(resp.json(), {"ok": True})
+            self.assertEqual(resp.headers["content-type"], "application/json")
+        self.assertEqual(self.transport.connections_opened, 1)
+        self.assertEqual(self.transport.idle_connections(), 1)
+
+    def test_stale_connection_is_retried_once(self):
+        self.transport.request("POST", f"{self.base_url}/drop", body=b"{}")
+        time.sleep(0.05)
+        resp = self.transport.request("POST", f"{self.base_url}/x", body=b"{}")
+        self.assertTrue(resp.ok)
+        self.assertEqual(self.transport.connections_opened, 2)
+
+    def test_sent_post_is_not_resent(self):
+        self.transport.request("POST", f"{self.base_url}/x", body=b"{}")
+        with self.assertRaises(ConnectionError):
+            self.transport.request("POST", f"{self.base_url}/vanish", body=b"{}")
+        self.assertEqual([path for path, _, _ in self.server.requests].count("/vanish"), 1)
+        self.assertTrue(self.transport.request("POST", f"{self.base_url}/x", body=b"{}").ok)
+
+    def test_idle_connections_are_evicted(self):
+        now = [0.0]
+        transport = HTTPTransport(timeout=5, idle_timeout=10, clock=lambda: now[0])
+        transport.request("POST", f"{self.base_url}/x", body=b"{}")
+        now[0] = 5
+        transport.request("POST", f"{self.base_url}/x", body=b"{}")
+        self.assertEqual(transport.connections_opened, 1)
+        now[0] = 20
+        transport.request("POST", f"{self.base_url}/x", body=b"{}")
+        self.assertEqual(transport.connections_opened, 2)
+        now[0] = 40
+        self.assertEqual(transport.evict_idle(), 1)
+        self.assertEqual(transport.idle_connections(), 0)
+
+    def test_per_host_connection_limit(self):
+        transport = HTTPTransport(timeout=5, max_connections_per_host=2)
+        threads = [
+            threading.Thread(target=transport.request, args=("POST", f"{self.base_url}/slow"), kwargs={"body": b""})
+            for _ in range(5)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(self.server.requests), 5)
+        self.assertLessEqual(self.server.max_in_flight, 2)
+        self.assertLessEqual(transport.connections_opened, 2)
+        transport.close()
+
+    def test_pool_timeout(self):
+        transport = HTTPTransport(timeout=5, max_connections_per_host=1, pool_timeout=0.05)
+        slow = threading.Thread(target=transport.request, args=("POST", f"{self.base_url}/slow"), kwargs={"body": b""})
+        slow.start()
+        time.sleep(0.1)
+        with self.assertRaises(TimeoutError):
+            transport.request("POST", f"{self.base_url}/x", body=b"")
+        slow.join()
+        transport.close()
+
+    def test_request_timeout(self):
+        with self.assertRaises(TimeoutError):
+            self.transport.request("POST", f"{self.base_url}/slow", body=b"", timeout=0.05)
+
+    def test_default_timeout_from_env(self):
+        old = os.environ.pop(TIMEOUT_ENV, None)
+        try:
+            self.assertEqual(default_timeout(), 60.0)
+            os.environ[TIMEOUT_ENV] = "2.5"
+            self.assertEqual(default_timeout(), 2.5)
+        finally:
+            os.environ.pop(TIMEOUT_ENV, None)
+            if old is not None:
+                os.environ[TIMEOUT_ENV] = old
+
+    def test_anthropic_adapter_uses_transport(self):
+        self.server.responses["/v1/messages"] = (200, {"content": [], "usage": {"input_tokens": 3}})
+        out = call_anthropic_messages(
+            "key", "claude", "sys", [{"role": "user", "content": "hi"}], None, 10,
+            transport=self.transport, base_url=self.base_url,
+        )  # fmt: skip
+        self.assertEqual(out["usage"], {"input_tokens": 3})
+        path, headers, body = self.server.requests[-1]
+        self.assertEqual(path, "/v1/messages")
+        self.assertEqual(headers["x-api-key"], "key")
+        self.assertEqual(json.loads(body)["system"], "sys")
+
+        self.server.responses["/v1/messages"] = (429, {"error": "slow down"})
+        with self.assertRaisesRegex(RuntimeError, "Anthropic request failed: .*slow down"):
+            call_anthropic_messages(
+                "key", "claude", None, [], None, 10, transport=self.transport, base_url=self.base_url
+            )
+
+    def test_gemini_adapter_uses_transport(self):
+        self.server.responses["/v1beta/models/gemini-pro:generateContent"] = (200, {"candidates": []})
+        out = call_gemini_generate_content(
+            "key", "gemini-pro", "hi", 0.5, 10, transport=self.transport, base_url=self.base_url
+        )
+        self.assertEqual(out, {"candidates": []})
+        _, headers, body = self.server.requests[-1]
+        self.assertEqual(headers["x-goog-api-key"], "key")
+        self.assertEqual(json.loads(body)["generationConfig"], {"maxOutputTokens": 10, "temperature": 0.5})
+
+    def test_connection_errors_become_runtime_errors(self):
+        probe = socket.socket()
+        probe.bind(("127.0.0.1", 0))
+        closed_url = f"http://127.0.0.1:{probe.getsockname()[1]}"
+        probe.close()
+        with self.assertRaisesRegex(RuntimeError, "Gemini request failed"):
+            call_gemini_generate_content("key", "m", "hi", None, 10, transport=self.transport, base_url=closed_url)
+
+
+if __name__ == "__main__":
+    unittest.main()
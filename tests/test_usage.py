@@ -0,0 +1,147 @@
+import unittest
+from types import SimpleNamespace
+
+from spendguard_engine.billing import LazyCostBreakdown, compute_cost_breakdown, compute_cost_totals
+from spendguard_engine.pricing import RateCard
+from spendguard_engine.providers.anthropic_provider import normalize_anthropic_usage
+from spendguard_engine.providers.gemini_provider import normalize_gemini_usage
+from spendguard_engine.providers.openai_provider import normalize_openai_usage
+from spendguard_engine.usage import NormalizedUsage
+
+CARD = RateCard(
+    input_cents_per_1m=100,
+    output_cents_per_1m=400,
+    cached_input_cents_per_1m=10,
+    reasoning_output_cents_per_1m=800,
+    cache_write_input_cents_per_1m=125,
+    cache_read_input_cents_per_1m=10,
+    grounding_cents_per_1k_queries=3500,
+    web_search_cents_per_call=1,
+)
+
+
+class TestNormalizedUsage(unittest.TestCase):
+    def test_splats_into_billing(self):
+        usage = NormalizedUsage(input_tokens=1000, output_tokens=500, reasoning_tokens=200, tool_calls={"x_call": 1})
+        self.assertEqual(dict(usage)["tool_calls"], {"x_call": 1})
+        breakdown = compute_cost_breakdown(provider="p", model="m", rate_card=CARD, **usage)
+        expected = compute_cost_breakdown(
+            provider="p", model="m", rate_card=CARD, input_tokens=1000, output_tokens=500, reasoning_tokens=200
+        )
+        self.assertEqual(breakdown["totals"], expected["totals"])
+        self.assertEqual(
+            compute_cost_totals(rate_card=CARD, **usage).realized_microcents, 1000 * 100 + 300 * 400 + 200 * 800
+        )
+        self.assertEqual(
+            LazyCostBreakdown(provider="p", model="m", rate_card=CARD, **usage)["totals"], breakdown["totals"]
+        )
+        with self.assertRaises(KeyError):
+            usage["provider"]
+        with self.assertRaises(AttributeError):
+            usage.extra = 1
+
+
+class TestProviderNormalizers(unittest.TestCase):
+    def test_openai_chat_sdk_object(self):
+        response = SimpleNamespace(
+            usage=SimpleNamespace(
+                prompt_tokens=1000,
+                completion_tokens=300,
+                prompt_tokens_details=SimpleNamespace(cached_tokens=600),
+                completion_tokens_details=SimpleNamespace(reasoning_tokens=100),
+            ),
+            choices=[SimpleNamespace(message=SimpleNamespace(tool_calls=[SimpleNamespace(type="function")] * 2))],
+        )
+        self.assertEqual(
+            normalize_openai_usage(response),
+            NormalizedUsage(
+                input_tokens=1000,
+                output_tokens=300,
+                cached_input_tokens=600,
+                reasoning_tokens=100,
+                tool_calls={"function_call": 2},
+            ),
+        )
+        self.assertIsNone(normalize_openai_usage(SimpleNamespace(usage=None)))
+
+    def test_openai_responses_dict(self):
+        response = {
+            "output": [
+                {"type": "web_search_call", "status": "completed"},
+                {"type": "reasoning"},
+                {"type": "web_search_call"},
+                {"type": "file_search_call"},
+                {"type": "message"},
+            ],
+            "usage": {
+                "input_tokens": 2000,
+                "input_tokens_details": {"cached_tokens": 500},
+                "output_tokens": 800,
+                "output_tokens_details": {"reasoning_tokens": 300},
+            },
+        }
+        usage = normalize_openai_usage(response)
+        self.assertEqual(usage.tool_calls, {"web_search_call": 2, "file_search_call": 1})
+        self.assertEqual((usage.input_tokens, usage.cached_input_tokens, usage.reasoning_tokens), (2000, 500, 300))
+        breakdown = compute_cost_breakdown(provider="openai", model="m", rate_card=CARD, **usage)
+        names = [c["name"] for c in breakdown["charges"]]
+        self.assertIn("tool_web_search_call", names)
+        self.assertIn("output_tokens_reasoning", names)
+
+    def test_anthropic_cache_tokens_are_added_back(self):
+        payload = {
+            "usage": {
+                "input_tokens": 50,
+                "cache_creation_input_tokens": 1000,
+                "cache_read_input_tokens": 4000,
+                "output_tokens": 200,
+                "server_tool_use": {"web_search_requests": 3},
+            }
+        }
+        usage = normalize_anthropic_usage(payload)
+        self.assertEqual(
+            usage,
+            NormalizedUsage(
+                input_tokens=5050,
+                output_tokens=200,
+                cache_write_input_tokens=1000,
+                cache_read_input_tokens=4000,
+                tool_calls={"web_search_call": 3},
+            ),
+        )
+        totals = compute_cost_totals(rate_card=CARD, **usage).realized_microcents
+        self.assertEqual(totals, 50 * 100 + 1000 * 125 + 4000 * 10 + 200 * 400 + 3 * 1_000_000)
+        self.assertIsNone(normalize_anthropic_usage({}))
+
+    def test_gemini_thoughts_and_grounding(self):
+        payload = {
+            "candidates": [
+                {"groundingMetadata": {"webSearchQueries": ["a", "b"]}},
+                {"groundingMetadata": {}},
+                "junk",
+            ],
+            "usageMetadata": {
+                "promptTokenCount": 900,
+                "toolUsePromptTokenCount": 100,
+                "cachedContentTokenCount": 400,
+                "candidatesTokenCount": 150,
+                "thoughtsTokenCount": 50,
+                "totalTokenCount": 1200,
+            },
+        }
+        self.assertEqual(
+            normalize_gemini_usage(payload),
+            NormalizedUsage(
+                input_tokens=1000,
+                output_tokens=200,
+                cached_input_tokens=400,
+                reasoning_tokens=50,
+                grounding_queries=2,
+            ),
+        )
+        self.assertEqual(normalize_gemini_usage({"usageMetadata": {}}), NormalizedUsage())
+        self.assertIsNone(normalize_gemini_usage({"candidates": []}))
+
+
+if __name__ == "__main__":
+    unittest.main()